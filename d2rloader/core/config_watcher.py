@@ -0,0 +1,120 @@
+import os
+from typing import TYPE_CHECKING
+
+from loguru import logger
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal
+
+from d2rloader.core.storage_sqlite import is_database
+
+if TYPE_CHECKING:
+    from d2rloader.core.state import D2RLoaderState
+
+# change events within this many milliseconds are handled at once
+WATCH_DEBOUNCE_MS = 100
+
+
+class ConfigWatcher(QObject):
+    """Watches the accounts and settings files for changes made by other programs.
+
+    Our own writes are recognized by their digest and ignored. External changes
+    of the accounts are applied to the current accounts and emitted as a list
+    of :class:`~d2rloader.core.store.accounts.AccountChange`.
+    """
+
+    accounts_changed: Signal = Signal(list)
+    settings_changed: Signal = Signal(list)
+
+    def __init__(self, parent: QObject, state: "D2RLoaderState") -> None:
+        super().__init__(parent)
+        self._state: D2RLoaderState = state
+        self._watcher: QFileSystemWatcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._schedule)
+        # files are replaced atomically which removes them from the watcher -
+        # the directories are watched to notice them again
+        self._watcher.directoryChanged.connect(self._directory_changed)
+        # path -> (inode, mtime, size) of the watched files
+        self._stats: dict[str, tuple[int, int, int] | None] = {}
+
+        self._timer: QTimer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(WATCH_DEBOUNCE_MS)
+        self._timer.timeout.connect(self._check)
+
+        self.update_paths()
+
+    @property
+    def accounts_path(self) -> str | None:
+        path = self._state.settings.data.accounts_path
+        # databases are changed in place and not watched
+        if not path or is_database(path):
+            return None
+        return path
+
+    @property
+    def settings_path(self) -> str:
+        return str(self._state.storage.SETTINGS_PATH)
+
+    def update_paths(self):
+        """Watches the current accounts and settings files"""
+        paths = {os.path.abspath(self.settings_path)}
+        if self.accounts_path is not None:
+            paths.add(os.path.abspath(self.accounts_path))
+        directories = {os.path.dirname(path) for path in paths}
+        self._stats = {path: self._stats.get(path, _stat(path)) for path in paths}
+
+        watched = set(self._watcher.files()) | set(self._watcher.directories())
+        wanted = {path for path in paths | directories if os.path.exists(path)}
+        if watched - wanted:
+            self._watcher.removePaths(list(watched - wanted))
+        if wanted - watched:
+            self._watcher.addPaths(list(wanted - watched))
+
+    def _schedule(self, _: str):
+        self._timer.start()
+
+    def _directory_changed(self, directory: str):
+        # the directories also contain the log, the instances and temporary
+        # files - only changes of the watched files are checked
+        changed = False
+        for path, stat in self._stats.items():
+            if os.path.dirname(path) != directory:
+                continue
+            current = _stat(path)
+            if current != stat:
+                self._stats[path] = current
+                changed = True
+        if changed:
+            self._timer.start()
+
+    def _check(self):
+        self.update_paths()
+        self._stats = {path: _stat(path) for path in self._stats}
+
+        storage = self._state.storage
+        if storage.changed_externally(self.settings_path):
+            changed = self._state.settings.reload()
+            if changed:
+                logger.info(f"Settings changed externally: {', '.join(changed)}")
+                self.settings_changed.emit(changed)
+            if "accounts_path" in changed:
+                self.update_paths()
+                self._reload_accounts()
+                return
+
+        accounts_path = self.accounts_path
+        if accounts_path is not None and storage.changed_externally(accounts_path):
+            self._reload_accounts()
+
+    def _reload_accounts(self):
+        changes = self._state.accounts.reload()
+        if changes:
+            logger.info(f"Accounts changed externally: {len(changes)} change(s)")
+            self.accounts_changed.emit(changes)
+
+
+def _stat(path: str) -> tuple[int, int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,192 @@
+import os
+import select
+import threading
+from collections.abc import Callable
+from time import time
+
+import psutil
+from loguru import logger
+
+from d2rloader.models.account import Account
+
+# psutil.wait_procs can't be woken up - newly tracked instances are picked up
+# after at most this many seconds
+WAIT_PROCS_TIMEOUT = 1.0
+
+
+class _TrackedInstance:
+    def __init__(
+        self,
+        pid: int,
+        account: Account,
+        process: psutil.Process,
+        create_time: float,
+        pidfd: int | None,
+    ) -> None:
+        self.pid: int = pid
+        self.account: Account = account
+        self.process: psutil.Process = process
+        self.create_time: float = create_time
+        self.pidfd: int | None = pidfd
+
+
+class ExitWatcher:
+    """Waits for all tracked instances to exit in a single background thread.
+
+    On Linux every instance gets a pidfd which becomes readable once the process
+    exits, so the thread just blocks in ``poll`` until something happens. On other
+    platforms the instances are waited for in batches with ``psutil.wait_procs``.
+    The callback is called from the watcher thread with the account, the pid, the
+    exit code (-1 if unknown) and the runtime in seconds.
+    """
+
+    def __init__(self, callback: Callable[[Account, int, int, float], None]) -> None:
+        self._callback: Callable[[Account, int, int, float], None] = callback
+        self._lock: threading.Lock = threading.Lock()
+        self._tracked: dict[int, _TrackedInstance] = {}
+        # pidfds of untracked instances - only closed by the watcher thread
+        self._stale_pidfds: list[int] = []
+        self._thread: threading.Thread | None = None
+        self._use_pidfd: bool = hasattr(os, "pidfd_open") and hasattr(select, "poll")
+        self._changed: threading.Event = threading.Event()
+        self._wakeup_fds: tuple[int, int] | None = (
+            os.pipe() if self._use_pidfd else None
+        )
+
+    @property
+    def tracked(self) -> dict[int, Account]:
+        with self._lock:
+            return {pid: item.account for pid, item in self._tracked.items()}
+
+    def track(self, pid: int, account: Account) -> bool:
+        try:
+            process = psutil.Process(pid)
+            create_time = process.create_time()
+        except psutil.Error as e:
+            logger.warning(f"Can't watch pid {pid} of {account.displayname}: {e}")
+            return False
+
+        pidfd = None
+        if self._use_pidfd:
+            try:
+                pidfd = os.pidfd_open(pid)
+            except OSError as e:
+                logger.warning(f"Can't watch pid {pid} of {account.displayname}: {e}")
+                return False
+
+        with self._lock:
+            previous = self._tracked.pop(pid, None)
+            if previous is not None and previous.pidfd is not None:
+                self._stale_pidfds.append(previous.pidfd)
+            self._tracked[pid] = _TrackedInstance(
+                pid, account, process, create_time, pidfd
+            )
+            self._start_thread()
+
+        logger.debug(f"Watching pid {pid} of {account.displayname} for exit")
+        self._wakeup()
+        return True
+
+    def untrack(self, pid: int):
+        with self._lock:
+            item = self._tracked.pop(pid, None)
+            if item is None:
+                return
+            if item.pidfd is not None:
+                self._stale_pidfds.append(item.pidfd)
+        self._wakeup()
+
+    def _start_thread(self):
+        if self._thread is not None:
+            return
+        target = self._run_pidfd if self._use_pidfd else self._run_wait_procs
+        self._thread = threading.Thread(target=target, name="exit-watcher", daemon=True)
+        self._thread.start()
+
+    def _wakeup(self):
+        if self._wakeup_fds is not None:
+            os.write(self._wakeup_fds[1], b"\0")
+        else:
+            self._changed.set()
+
+    def _run_pidfd(self):
+        assert self._wakeup_fds is not None
+        wakeup_fd = self._wakeup_fds[0]
+        poller = select.poll()
+        poller.register(wakeup_fd, select.POLLIN)
+        registered: dict[int, int] = {}  # pidfd -> pid
+
+        while True:
+            with self._lock:
+                stale = self._stale_pidfds
+                self._stale_pidfds = []
+                current = {
+                    item.pidfd: pid
+                    for pid, item in self._tracked.items()
+                    if item.pidfd is not None
+                }
+
+            for pidfd in stale:
+                if registered.pop(pidfd, None) is not None:
+                    poller.unregister(pidfd)
+                os.close(pidfd)
+            for pidfd in current.keys() - registered.keys():
+                poller.register(pidfd, select.POLLIN)
+            registered = current
+
+            for fd, _ in poller.poll():
+                if fd == wakeup_fd:
+                    os.read(wakeup_fd, 4096)
+                    continue
+
+                with self._lock:
+                    item = self._tracked.pop(registered[fd], None)
+                poller.unregister(fd)
+                del registered[fd]
+                if item is not None:
+                    self._exited(item, _reap_pidfd(fd))
+                os.close(fd)
+
+    def _run_wait_procs(self):
+        while True:
+            with self._lock:
+                processes = [item.process for item in self._tracked.values()]
+
+            if not processes:
+                self._changed.wait()
+                self._changed.clear()
+                continue
+
+            self._changed.clear()
+            gone, _ = psutil.wait_procs(processes, timeout=WAIT_PROCS_TIMEOUT)
+            for process in gone:
+                with self._lock:
+                    item = self._tracked.pop(process.pid, None)
+                if item is not None:
+                    returncode = getattr(process, "returncode", None)
+                    self._exited(item, returncode if returncode is not None else -1)
+
+    def _exited(self, item: _TrackedInstance, exit_code: int):
+        runtime = max(0.0, time() - item.create_time)
+        logger.info(
+            f"Instance of {item.account.displayname} (pid {item.pid}) exited with "
+            f"code {exit_code} after {runtime:.0f}s"
+        )
+        try:
+            self._callback(item.account, item.pid, exit_code, runtime)
+        except Exception as e:
+            logger.error(f"Exit callback for pid {item.pid} failed: {e}")
+
+
+def _reap_pidfd(pidfd: int) -> int:
+    """Returns the exit code of the process or -1 if it isn't our child"""
+    try:
+        result = os.waitid(os.P_PIDFD, pidfd, os.WEXITED | os.WNOHANG)
+    except (ChildProcessError, OSError, AttributeError):
+        return -1
+    if result is None:
+        return -1
+    if result.si_code == os.CLD_EXITED:
+        return result.si_status
+    # killed by a signal
+    return -result.si_status
@@ -0,0 +1,408 @@
+import contextlib
+import hashlib
+import os
+import sqlite3
+import stat
+from collections.abc import Iterator
+from pathlib import Path
+from time import time_ns
+from typing import NamedTuple
+
+from loguru import logger
+
+from d2rloader.core.platform_linux.prefix import (
+    PRIVATE_DIRS,
+    TEMPLATES_DIR,
+    is_private,
+    reflink,
+)
+
+# the index of the hashed files is kept next to the prefixes
+DEDUP_INDEX = ".dedup.sqlite"
+# files which wine/Proton don't change once they are installed into a prefix
+IMMUTABLE_SUFFIXES = frozenset(
+    (
+        ".acm",
+        ".ax",
+        ".cpl",
+        ".dll",
+        ".drv",
+        ".exe",
+        ".fon",
+        ".nls",
+        ".ocx",
+        ".otf",
+        ".sys",
+        ".tlb",
+        ".ttc",
+        ".ttf",
+        ".vxd",
+    )
+)
+# rows written to the index at once
+BATCH_SIZE = 1000
+_WRITE_BITS = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+
+
+class DedupReport(NamedTuple):
+    files: int  # immutable files in the prefixes
+    hashed: int  # files hashed by this run, the others were indexed already
+    duplicate_files: int  # identical files which aren't linked yet
+    duplicate_bytes: int
+    linkable_files: int  # duplicates which can be replaced with a link
+    linkable_bytes: int
+    reflink: bool  # False if only read-only files can be hardlinked
+    linked_files: int = 0  # files replaced with a link by this run
+    linked_bytes: int = 0
+
+
+def is_immutable(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in IMMUTABLE_SUFFIXES
+
+
+class PrefixDeduplicator:
+    """Finds identical files in the wineprefixes and replaces them with links.
+
+    Only immutable files (DLLs, fonts, ...) are considered, registry hives and
+    ``drive_c/users`` are never touched. Size, mtime and hash of every file are
+    kept in an SQLite index: a file is only hashed again if it changed and only
+    if another file of the same size exists. Nothing is kept in memory besides
+    the current batch of files.
+
+    Files are replaced with reflinks if the filesystem supports them (the
+    prefixes still have their own copy). Otherwise only files which are
+    read-only already are hardlinked, like ``PrefixCloner`` does - wine rewrites
+    its writable files (e.g. the DLLs in ``system32``) in place when it updates
+    a prefix.
+    """
+
+    def __init__(self, wineprefix: str | os.PathLike[str]) -> None:
+        self.root: Path = Path(wineprefix)
+        self.index_path: Path = Path(self.root, DEDUP_INDEX)
+        # None until the filesystem has been probed
+        self._reflink: bool | None = None
+
+    def prefixes(self) -> Iterator[Path]:
+        """The account prefixes and the template prefixes"""
+        for parent in (self.root, Path(self.root, TEMPLATES_DIR)):
+            try:
+                entries = sorted(os.scandir(parent), key=lambda e: e.name)
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False) and not entry.name.startswith(
+                    "."
+                ):
+                    yield Path(entry.path)
+
+    def supports_reflink(self) -> bool:
+        """Returns True if the filesystem of the prefixes supports reflinks"""
+        if self._reflink is None:
+            os.makedirs(self.root, exist_ok=True)
+            probe = os.path.join(self.root, ".d2rloader-reflink")
+            try:
+                with open(probe, "wb") as fp:
+                    fp.write(b"\0")
+                self._reflink = reflink(probe, f"{probe}.clone")
+            except OSError:
+                self._reflink = False
+            finally:
+                for path in (probe, f"{probe}.clone"):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(path)
+        return self._reflink
+
+    def scan(self) -> DedupReport:
+        """Updates the index and returns the duplicates without changing them"""
+        return self._run(link=False)
+
+    def deduplicate(self) -> DedupReport:
+        """Updates the index and replaces the duplicates with links"""
+        report = self._run(link=True)
+        logger.info(
+            f"Replaced {report.linked_files} duplicate file(s) with links, "
+            f"{report.linked_bytes / 2**20:.1f} MiB reclaimed"
+        )
+        return report
+
+    def _run(self, link: bool) -> DedupReport:
+        with self._connect() as db:
+            files, hashed = self._update_index(db)
+            duplicate_files = duplicate_bytes = linkable_files = linkable_bytes = 0
+            linked_files = linked_bytes = 0
+            for size, dev, sha256, inodes in self._groups(db):
+                duplicate_files += inodes - 1
+                duplicate_bytes += size * (inodes - 1)
+                linkable = self._linkable(db, size, dev, sha256, inodes)
+                linkable_files += linkable
+                linkable_bytes += linkable * size
+                if link and linkable:
+                    linked = self._link_group(db, size, dev, sha256)
+                    linked_files += linked
+                    linked_bytes += linked * size
+        return DedupReport(
+            files,
+            hashed,
+            duplicate_files,
+            duplicate_bytes,
+            linkable_files,
+            linkable_bytes,
+            self.supports_reflink(),
+            linked_files,
+            linked_bytes,
+        )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        os.makedirs(self.root, exist_ok=True)
+        db = sqlite3.connect(self.index_path)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, "
+                "dev INTEGER NOT NULL, "
+                "ino INTEGER NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "mtime_ns INTEGER NOT NULL, "
+                "sha256 TEXT, "
+                # "dev:ino" of the file this one is a reflink of
+                "clone_of TEXT, "
+                "scan INTEGER NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS files_size ON files(dev, size, sha256)"
+            )
+            yield db
+        finally:
+            db.close()
+
+    def _walk(self) -> Iterator[tuple[str, os.stat_result]]:
+        for prefix in self.prefixes():
+            stack = [os.fspath(prefix)]
+            while stack:
+                directory = stack.pop()
+                try:
+                    entries = os.scandir(directory)
+                except OSError as e:
+                    logger.warning(f"Skipping {directory}: {e}")
+                    continue
+                with entries:
+                    for entry in entries:
+                        relpath = os.path.relpath(entry.path, prefix)
+                        if entry.is_symlink():
+                            continue
+                        if entry.is_dir():
+                            if relpath not in PRIVATE_DIRS:
+                                stack.append(entry.path)
+                        elif (
+                            entry.is_file()
+                            and is_immutable(entry.name)
+                            and not is_private(relpath)
+                        ):
+                            yield entry.path, entry.stat()
+
+    def _update_index(self, db: sqlite3.Connection):
+        scan = time_ns()
+        files = 0
+        batch: list[tuple[str, int, int, int, int, int]] = []
+        for path, st in self._walk():
+            files += 1
+            batch.append((path, st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, scan))
+            if len(batch) >= BATCH_SIZE:
+                self._upsert(db, batch)
+                batch.clear()
+        self._upsert(db, batch)
+
+        with db:
+            # deleted files
+            db.execute("DELETE FROM files WHERE scan != ?", (scan,))
+
+        hashed = self._hash_candidates(db)
+        logger.debug(f"Indexed {files} file(s), hashed {hashed}")
+        return files, hashed
+
+    def _upsert(
+        self, db: sqlite3.Connection, rows: list[tuple[str, int, int, int, int, int]]
+    ):
+        # the hash is kept as long as the file didn't change
+        with db:
+            db.executemany(
+                "INSERT INTO files (path, dev, ino, size, mtime_ns, scan) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET "
+                "sha256 = CASE WHEN size = excluded.size "
+                "AND mtime_ns = excluded.mtime_ns THEN sha256 END, "
+                "clone_of = CASE WHEN size = excluded.size "
+                "AND mtime_ns = excluded.mtime_ns THEN clone_of END, "
+                "dev = excluded.dev, ino = excluded.ino, size = excluded.size, "
+                "mtime_ns = excluded.mtime_ns, scan = excluded.scan",
+                rows,
+            )
+
+    def _hash_candidates(self, db: sqlite3.Connection):
+        """Hashes the files which have the size of another file"""
+        with db:
+            db.execute("DROP TABLE IF EXISTS temp.pending")
+            db.execute(
+                "CREATE TEMP TABLE pending AS "
+                "SELECT path, dev, ino, size, mtime_ns FROM files "
+                "WHERE sha256 IS NULL AND size > 0 AND (dev, size) IN ("
+                "SELECT dev, size FROM files GROUP BY dev, size "
+                "HAVING COUNT(DISTINCT ino) > 1) "
+                "ORDER BY dev, ino"
+            )
+
+        hashed = 0
+        last_rowid = 0
+        # hardlinked files are only hashed once
+        inode: tuple[int, int, str] | None = None
+        while True:
+            rows = db.execute(
+                "SELECT rowid, path, dev, ino, size, mtime_ns FROM temp.pending "
+                "WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, BATCH_SIZE),
+            ).fetchall()
+            if not rows:
+                break
+
+            updates: list[tuple[str, str]] = []
+            removed: list[tuple[str]] = []
+            for last_rowid, path, dev, ino, size, mtime_ns in rows:
+                if inode is not None and inode[:2] == (dev, ino):
+                    sha256 = inode[2]
+                else:
+                    sha256 = _hash_file(path, size, mtime_ns)
+                    hashed += 1
+                if sha256 is None:
+                    # changed or removed since it was indexed - the next scan
+                    # picks it up again
+                    removed.append((path,))
+                    continue
+                inode = (dev, ino, sha256)
+                updates.append((sha256, path))
+
+            with db:
+                db.executemany("UPDATE files SET sha256 = ? WHERE path = ?", updates)
+                db.executemany("DELETE FROM files WHERE path = ?", removed)
+
+        with db:
+            db.execute("DROP TABLE temp.pending")
+        return hashed
+
+    def _groups(self, db: sqlite3.Connection) -> Iterator[tuple[int, int, str, int]]:
+        """Yields size, device, hash and number of distinct files of every
+        group of identical files"""
+        last: tuple[int, int, str] = (-1, -1, "")
+        while True:
+            rows = db.execute(
+                "SELECT dev, size, sha256, "
+                "COUNT(DISTINCT COALESCE(clone_of, dev || ':' || ino)) AS inodes "
+                "FROM files WHERE sha256 IS NOT NULL AND (dev, size, sha256) > (?, ?, ?) "
+                "GROUP BY dev, size, sha256 ORDER BY dev, size, sha256 LIMIT ?",
+                (*last, BATCH_SIZE),
+            ).fetchall()
+            if not rows:
+                return
+            for dev, size, sha256, inodes in rows:
+                if inodes > 1:
+                    yield size, dev, sha256, inodes
+            last = rows[-1][:3]
+
+    def _linkable(
+        self, db: sqlite3.Connection, size: int, dev: int, sha256: str, inodes: int
+    ):
+        """Returns the number of files of the group which can be replaced with
+        a link"""
+        if self.supports_reflink():
+            return inodes - 1
+        # the same rule as _link_group: hardlinks only between read-only files
+        rows = db.execute(
+            "SELECT path, ino FROM files "
+            "WHERE dev = ? AND size = ? AND sha256 = ? ORDER BY ino, path",
+            (dev, size, sha256),
+        ).fetchall()
+        keeper, keeper_ino = rows[0]
+        if not _is_read_only(keeper):
+            return 0
+        # the mode belongs to the inode - checking one of its paths is enough
+        checked: dict[int, bool] = {}
+        for path, ino in rows[1:]:
+            if ino != keeper_ino and ino not in checked:
+                checked[ino] = _is_read_only(path)
+        return sum(checked.values())
+
+    def _link_group(self, db: sqlite3.Connection, size: int, dev: int, sha256: str):
+        rows = db.execute(
+            "SELECT path, ino, mtime_ns, clone_of FROM files "
+            "WHERE dev = ? AND size = ? AND sha256 = ? ORDER BY ino, path",
+            (dev, size, sha256),
+        ).fetchall()
+        keeper, keeper_ino, keeper_mtime, _ = rows[0]
+        keeper_id = f"{dev}:{keeper_ino}"
+        if _stat_changed(keeper, size, keeper_mtime):
+            return 0
+        keeper_read_only = _is_read_only(keeper)
+
+        linked = 0
+        updates: list[tuple[int, int, str | None, str]] = []
+        for path, ino, mtime_ns, clone_of in rows[1:]:
+            if ino == keeper_ino or clone_of == keeper_id:
+                continue
+            if _stat_changed(path, size, mtime_ns):
+                continue
+
+            tmp = f"{path}.d2rloader-dedup"
+            try:
+                if self.supports_reflink() and reflink(keeper, tmp):
+                    os.replace(tmp, path)
+                    st = os.stat(path)
+                    updates.append((st.st_ino, st.st_mtime_ns, keeper_id, path))
+                else:
+                    self._reflink = False
+                    if not (keeper_read_only and _is_read_only(path)):
+                        continue
+                    os.link(keeper, tmp)
+                    os.replace(tmp, path)
+                    updates.append((keeper_ino, keeper_mtime, None, path))
+            except OSError as e:
+                logger.warning(f"Couldn't replace {path}: {e}")
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(tmp)
+                continue
+            linked += 1
+
+        with db:
+            db.executemany(
+                "UPDATE files SET ino = ?, mtime_ns = ?, clone_of = ? WHERE path = ?",
+                updates,
+            )
+        return linked
+
+
+def _hash_file(path: str, size: int, mtime_ns: int) -> str | None:
+    """Returns the sha256 of the file or None if it changed since it was
+    indexed"""
+    try:
+        with open(path, "rb") as fp:
+            digest = hashlib.file_digest(fp, "sha256").hexdigest()
+    except OSError:
+        return None
+    if _stat_changed(path, size, mtime_ns):
+        return None
+    return digest
+
+
+def _stat_changed(path: str, size: int, mtime_ns: int):
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except OSError:
+        return True
+    return st.st_size != size or st.st_mtime_ns != mtime_ns
+
+
+def _is_read_only(path: str):
+    try:
+        return not os.stat(path).st_mode & _WRITE_BITS
+    except OSError:
+        return False
@@ -0,0 +1,345 @@
+import errno
+import fcntl
+import os
+import re
+import shutil
+import stat
+import subprocess
+import threading
+from collections import Counter
+from pathlib import Path
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from d2rloader.models.account import Account
+
+if TYPE_CHECKING:
+    from d2rloader.core.state import D2RLoaderState
+
+# the template prefixes are kept next to the prefixes of the accounts
+TEMPLATES_DIR = ".templates"
+# written into a template once it has been built completely
+TEMPLATE_MARKER = ".d2rloader-template"
+# ioctl sharing the extents of two files on btrfs, xfs, bcachefs, ... (linux/fs.h)
+FICLONE = 0x40049409
+# errors of the clone/link calls meaning "not supported by the filesystem"
+_UNSUPPORTED = frozenset(
+    (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.EPERM)
+)
+# directories which every prefix gets its own copy of
+PRIVATE_DIRS = (os.path.join("drive_c", "users"),)
+# written into the prefix on every launch - replaced by the clone
+LAUNCH_FILES = frozenset(("start.sh", "umu.log"))
+
+
+def is_initialized(prefix: str | os.PathLike[str]) -> bool:
+    """Returns True if wine already created the prefix"""
+    return os.path.exists(os.path.join(prefix, "system.reg"))
+
+
+def is_private(relpath: str) -> bool:
+    """Returns True for the files which are never shared between prefixes: the
+    registry hives and the user directories"""
+    if os.sep not in relpath and relpath.endswith(".reg"):
+        return True
+    return any(
+        relpath == private or relpath.startswith(private + os.sep)
+        for private in PRIVATE_DIRS
+    )
+
+
+def reflink(src: str, dst: str) -> bool:
+    """Copies src to dst by sharing its extents, returns False if the
+    filesystem doesn't support it"""
+    with open(src, "rb") as src_fp, open(dst, "wb") as dst_fp:
+        try:
+            fcntl.ioctl(dst_fp.fileno(), FICLONE, src_fp.fileno())
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            supported = False
+        else:
+            supported = True
+    if not supported:
+        os.unlink(dst)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+class PrefixCloner:
+    """Clones a prefix file by file.
+
+    Files are reflinked if the filesystem supports it (copy on write - every
+    prefix still has its own files), read-only files are hardlinked and the
+    remaining files are copied. Registry hives and the user directories are
+    never hardlinked. Absolute symlinks into the source are changed to point
+    into the clone.
+    """
+
+    def __init__(self, source: Path, target: Path) -> None:
+        self.source: Path = source
+        self.target: Path = target
+        self.stats: Counter[str] = Counter()
+        self._reflink: bool = True
+        self._hardlink: bool = True
+
+    def clone(self):
+        """Clones the source into a temporary directory and moves it to the
+        target once it is complete"""
+        tmp = self.target.with_name(f".{self.target.name}.clone-{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        try:
+            self._clone_tree(tmp)
+            # replaces the target if it is an empty directory
+            os.rename(tmp, self.target)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return self.stats
+
+    def _clone_tree(self, root: Path):
+        source = os.fspath(self.source)
+        os.makedirs(root)
+        # iterative walk - prefixes are deeply nested
+        stack = [""]
+        while stack:
+            reldir = stack.pop()
+            with os.scandir(os.path.join(source, reldir)) as entries:
+                for entry in entries:
+                    relpath = os.path.join(reldir, entry.name)
+                    if reldir == "" and entry.name == TEMPLATE_MARKER:
+                        continue
+                    dst = os.path.join(root, relpath)
+                    if entry.is_symlink():
+                        os.symlink(self._link_target(entry.path), dst)
+                        self.stats["symlink"] += 1
+                    elif entry.is_dir():
+                        os.mkdir(dst)
+                        stack.append(relpath)
+                    elif entry.is_file():
+                        self._clone_file(entry, relpath, dst)
+
+    def _clone_file(self, entry: os.DirEntry[str], relpath: str, dst: str):
+        if self._reflink:
+            if reflink(entry.path, dst):
+                self.stats["reflink"] += 1
+                return
+            self._reflink = False
+
+        read_only = not entry.stat().st_mode & (
+            stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+        )
+        if self._hardlink and read_only and not is_private(relpath):
+            try:
+                os.link(entry.path, dst)
+                self.stats["hardlink"] += 1
+                return
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                self._hardlink = False
+
+        shutil.copy2(entry.path, dst)
+        self.stats["copy"] += 1
+
+    def _link_target(self, link: str):
+        return _retarget(os.readlink(link), self.source, self.target)
+
+
+class PrefixManager:
+    """Creates the prefixes of the accounts from a template prefix.
+
+    Building a prefix with umu takes minutes, so a template is built once per
+    Proton version and new prefixes are cloned from it.
+    """
+
+    def __init__(self, state: "D2RLoaderState") -> None:
+        self._state: D2RLoaderState = state
+        # launches run concurrently - the template is only built once
+        self._lock: threading.Lock = threading.Lock()
+        # and every prefix is only created once
+        self._prefix_locks: dict[Path, threading.Lock] = {}
+        self._prefix_locks_lock: threading.Lock = threading.Lock()
+
+    @property
+    def templates_path(self):
+        return Path(self._state.settings.data.wineprefix, TEMPLATES_DIR)
+
+    def template_path(self, protonpath: str):
+        name = os.path.basename(protonpath.rstrip(os.sep)) or "default"
+        return Path(self.templates_path, re.sub(r"[^\w.-]+", "_", name))
+
+    def _prefix_lock(self, prefix: Path):
+        with self._prefix_locks_lock:
+            return self._prefix_locks.setdefault(prefix, threading.Lock())
+
+    def initialize_prefix(self, account: Account, protonpath: str, umu_run: Path):
+        """Creates the prefix of the account unless it has been created
+        already - cloned from the template or built by umu if templates are
+        disabled. Returns True if the prefix got created."""
+        if self._state.settings.data.prefix_template:
+            return self.ensure_prefix(account, protonpath, umu_run)
+
+        prefix = Account.wineprefix_account(self._state.settings.data, account)
+        with self._prefix_lock(prefix):
+            if is_initialized(prefix):
+                return False
+            logger.info(f"Building the prefix {prefix} ({protonpath})...")
+            started = monotonic()
+            os.makedirs(prefix, exist_ok=True)
+            if not self._build(prefix, protonpath, umu_run):
+                return False
+            logger.info(f"Built {prefix} in {monotonic() - started:.0f}s")
+            return True
+
+    def ensure_prefix(self, account: Account, protonpath: str, umu_run: Path):
+        """Clones the template into the prefix of the account unless it has
+        been created already. Returns True if the prefix got cloned."""
+        if not self._state.settings.data.prefix_template:
+            return False
+
+        prefix = Account.wineprefix_account(self._state.settings.data, account)
+        with self._prefix_lock(prefix):
+            return self._clone_template(prefix, protonpath, umu_run)
+
+    def _clone_template(self, prefix: Path, protonpath: str, umu_run: Path):
+        if is_initialized(prefix):
+            return False
+        leftovers = _list_dir(prefix)
+        if not leftovers <= LAUNCH_FILES:
+            logger.warning(f"Not cloning into {prefix} - it isn't empty")
+            return False
+
+        template = self.ensure_template(protonpath, umu_run)
+        if template is None:
+            return False
+
+        started = monotonic()
+        try:
+            for name in leftovers:
+                os.unlink(os.path.join(prefix, name))
+            stats = PrefixCloner(template, prefix).clone()
+        except OSError as e:
+            logger.error(f"Couldn't clone the template into {prefix}: {e}")
+            return False
+
+        logger.info(
+            f"Cloned {prefix} from {template} in {monotonic() - started:.1f}s "
+            f"({', '.join(f'{count} {kind}' for kind, count in stats.items())})"
+        )
+        return True
+
+    def move_prefix(self, source: Path, target: Path):
+        """Moves the prefix of a renamed account instead of creating a new
+        one. Returns True if the prefix got moved."""
+        if source == target or not is_initialized(source):
+            return False
+        # never move the prefix of Steam or anything else outside the root
+        root = os.path.realpath(self._state.settings.data.wineprefix)
+        for path in (source, target):
+            if os.path.dirname(os.path.realpath(path)) != root:
+                logger.warning(f"Not moving {source} to {target} - not in {root}")
+                return False
+
+        first, second = sorted((source, target))
+        with self._prefix_lock(first), self._prefix_lock(second):
+            leftovers = _list_dir(target)
+            if not leftovers <= LAUNCH_FILES:
+                logger.warning(f"Not moving {source} to {target} - it isn't empty")
+                return False
+            try:
+                for name in leftovers:
+                    os.unlink(os.path.join(target, name))
+                # replaces the target if it is an empty directory
+                os.rename(source, target)
+                relinked = _retarget_links(target, source)
+            except OSError as e:
+                logger.error(f"Couldn't move {source} to {target}: {e}")
+                return False
+
+        logger.info(f"Moved {source} to {target} ({relinked} symlink(s) changed)")
+        return True
+
+    def ensure_template(self, protonpath: str, umu_run: Path):
+        """Returns the template of the Proton version and builds it first if
+        necessary - returns None if it couldn't be built"""
+        template = self.template_path(protonpath)
+        with self._lock:
+            if os.path.exists(os.path.join(template, TEMPLATE_MARKER)):
+                return template
+
+            # left over from an interrupted build
+            shutil.rmtree(template, ignore_errors=True)
+            os.makedirs(template)
+
+            logger.info(f"Building the template prefix {template} ({protonpath})...")
+            started = monotonic()
+            if not self._build(template, protonpath, umu_run):
+                shutil.rmtree(template, ignore_errors=True)
+                return None
+
+            with open(os.path.join(template, TEMPLATE_MARKER), "w") as f:
+                f.write(f"{protonpath}\n")
+            logger.info(f"Built the template prefix in {monotonic() - started:.0f}s")
+            return template
+
+    def _build(self, prefix: Path, protonpath: str, umu_run: Path):
+        """Lets umu create the prefix, returns False if that failed"""
+        output = subprocess.run(
+            [umu_run, ""],
+            capture_output=True,
+            env={
+                **os.environ,
+                "WINEARCH": "win64",
+                "WINEDEBUG": "-all",
+                "WINEPREFIX": f"{prefix}",
+                "PROTONPATH": protonpath,
+            },
+        )
+        if output.returncode != 0 or not is_initialized(prefix):
+            logger.error(
+                f"Couldn't build the prefix {prefix}: "
+                f"{output.stderr.decode(errors='replace').strip()}"
+            )
+            return False
+        return True
+
+
+def _retarget(target: str, source: str | Path, dest: str | Path):
+    """Changes an absolute symlink target inside source to point into dest"""
+    source = os.fspath(source)
+    if os.path.isabs(target) and (
+        target == source or target.startswith(source + os.sep)
+    ):
+        return os.fspath(dest) + target[len(source) :]
+    return target
+
+
+def _retarget_links(root: Path, source: Path):
+    """Changes the absolute symlinks into source of the moved prefix to point
+    into the new location, returns the number of changed symlinks"""
+    changed = 0
+    stack = [os.fspath(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_symlink():
+                    target = os.readlink(entry.path)
+                    new_target = _retarget(target, source, root)
+                    if new_target != target:
+                        os.unlink(entry.path)
+                        os.symlink(new_target, entry.path)
+                        changed += 1
+                elif entry.is_dir():
+                    stack.append(entry.path)
+    return changed
+
+
+def _list_dir(path: Path):
+    try:
+        return set(os.listdir(path))
+    except FileNotFoundError:
+        return set()
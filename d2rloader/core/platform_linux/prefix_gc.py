@@ -0,0 +1,118 @@
+import os
+import shutil
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from loguru import logger
+
+from d2rloader.core.platform_linux.procscan import normalize_prefix
+
+# removed prefixes are moved here if they are archived instead of deleted
+ARCHIVE_DIR = ".archive"
+
+
+class Orphan(NamedTuple):
+    path: Path
+    size: int  # bytes freed by removing the prefix
+
+
+def disk_usage(path: str | os.PathLike[str]) -> int:
+    """Returns the disk space freed by removing the directory.
+
+    The directory is walked one entry at a time. Hardlinked files are only
+    counted if all their links are inside the directory - the files shared
+    with other prefixes by the deduplication aren't freed.
+    """
+    size = 0
+    # inode -> links which haven't been seen yet
+    links: dict[tuple[int, int], int] = {}
+    stack = [os.fspath(path)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError as e:
+            logger.warning(f"Skipping {e.filename}: {e.strerror}")
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif st.st_nlink > 1:
+                    inode = (st.st_dev, st.st_ino)
+                    remaining = links.get(inode, st.st_nlink) - 1
+                    links[inode] = remaining
+                    if remaining > 0:
+                        continue
+                size += st.st_blocks * 512
+    return size
+
+
+class PrefixCollector:
+    """Finds the prefixes which don't belong to an account anymore.
+
+    Prefixes are named after the account, so deleting or renaming an account
+    leaves its prefix behind. Entries starting with a dot (templates, shader
+    cache, indexes, archive, ...) are never collected.
+    """
+
+    def __init__(self, wineprefix: str | os.PathLike[str]) -> None:
+        self.root: Path = Path(wineprefix)
+
+    @property
+    def archive_path(self):
+        return Path(self.root, ARCHIVE_DIR)
+
+    def find(self, keep: Iterable[str | os.PathLike[str]]) -> Iterator[Path]:
+        """Yields the prefixes which aren't in keep"""
+        kept = {normalize_prefix(path) for path in keep}
+        try:
+            entries = sorted(os.scandir(self.root), key=lambda e: e.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if (
+                not entry.name.startswith(".")
+                and entry.is_dir(follow_symlinks=False)
+                and normalize_prefix(entry.path) not in kept
+            ):
+                yield Path(entry.path)
+
+    def orphans(self, keep: Iterable[str | os.PathLike[str]]) -> list[Orphan]:
+        """Returns the prefixes which aren't in keep and their size"""
+        return [Orphan(path, disk_usage(path)) for path in self.find(keep)]
+
+    def archive(self, paths: Iterable[Path]):
+        """Moves the prefixes into the archive, returns the number of moved
+        prefixes"""
+        os.makedirs(self.archive_path, exist_ok=True)
+        suffix = datetime.now().strftime("%Y%m%d-%H%M%S")
+        archived = 0
+        for path in paths:
+            target = Path(self.archive_path, f"{path.name}-{suffix}")
+            try:
+                os.rename(path, target)
+            except OSError as e:
+                logger.error(f"Couldn't archive {path}: {e}")
+                continue
+            logger.info(f"Archived {path} to {target}")
+            archived += 1
+        return archived
+
+    def delete(self, paths: Iterable[Path]):
+        """Deletes the prefixes, returns the number of deleted prefixes"""
+        deleted = 0
+        for path in paths:
+            try:
+                shutil.rmtree(path)
+            except OSError as e:
+                logger.error(f"Couldn't delete {path}: {e}")
+                continue
+            logger.info(f"Deleted {path}")
+            deleted += 1
+        return deleted
@@ -0,0 +1,83 @@
+import functools
+from typing import TYPE_CHECKING
+
+from loguru import logger
+from PySide6.QtCore import QObject, QThreadPool, Signal
+
+from d2rloader.core.worker import Worker, WorkerSignals
+from d2rloader.models.account import Account, AuthMethod
+
+if TYPE_CHECKING:
+    from d2rloader.core.platform_linux.umu import UmuManager
+    from d2rloader.core.store.settings import SettingService
+
+
+class PrefixInitQueue(QObject):
+    """Prepares the prefixes of new accounts in the background.
+
+    Creating a prefix and bootstrapping Proton takes minutes - doing it right
+    after an account got added makes its first launch as fast as any other.
+    At most ``max_concurrency`` prefixes are prepared at the same time.
+    """
+
+    # uid, description, step, steps
+    progress: Signal = Signal(str, str, int, int)
+    # uid, prefix is ready
+    finished: Signal = Signal(str, bool)
+
+    def __init__(
+        self, parent: QObject, umu_manager: "UmuManager", settings: "SettingService"
+    ) -> None:
+        super().__init__(parent)
+        self._umu_manager: UmuManager = umu_manager
+        self._settings: SettingService = settings
+        self._threadpool: QThreadPool = QThreadPool(self)
+        # uid -> signals of the worker, kept alive until the result is delivered
+        self._pending: dict[str, WorkerSignals] = {}
+
+    @property
+    def max_concurrency(self) -> int:
+        return max(1, self._settings.data.max_concurrent_prefix_inits)
+
+    def is_pending(self, uid: str):
+        return uid in self._pending
+
+    def enqueue(self, accounts: list[Account]) -> list[Account]:
+        """Queues the accounts whose prefix isn't being prepared already"""
+        self._threadpool.setMaxThreadCount(self.max_concurrency)
+        queued: list[Account] = []
+        for account in accounts:
+            if account.auth_method == AuthMethod.Steam or account.uid in self._pending:
+                continue
+
+            worker = Worker(self._prepare, account)
+            worker.signals.success.connect(
+                functools.partial(self._on_finished, account.uid)
+            )
+            worker.signals.error.connect(functools.partial(self._on_error, account.uid))
+            self._pending[account.uid] = worker.signals
+            self._threadpool.start(worker)
+            queued.append(account)
+
+        if queued:
+            logger.info(f"Queued the preparation of {len(queued)} prefix(es)")
+        return queued
+
+    def _prepare(self, account: Account):
+        def progress(description: str, step: int, steps: int):
+            logger.info(f"{account.displayname} ({step}/{steps}): {description}...")
+            self.progress.emit(account.uid, description, step, steps)
+
+        ready = self._umu_manager.prepare(account, progress)
+        if ready:
+            logger.info(f"The prefix of {account.displayname} is ready")
+        return ready
+
+    def _on_finished(self, uid: str, ready: bool):
+        self._pending.pop(uid, None)
+        self.finished.emit(uid, bool(ready))
+
+    def _on_error(self, uid: str, err: tuple[Exception, str]):
+        logger.error(f"Couldn't prepare the prefix of {uid}: {err[0]}")
+        logger.debug(err[1])
+        self._on_finished(uid, False)
@@ -1,42 +1,47 @@
+import functools
 from pathlib import Path
-from time import sleep
+from time import monotonic, sleep
 from typing import TYPE_CHECKING
 
 import psutil
 from loguru import logger
-from PySide6.QtCore import QObject, QThreadPool, Signal
+from PySide6.QtCore import QObject
 
 from d2rloader.constants import CONFIG_BASE_DIR, WINDOW_TITLE_FORMAT
 from d2rloader.core.exception import ProcessingError
+from d2rloader.core.platform_linux.procscan import (
+    INSTANCE_ROOT_NAME,
+    ProcessEntry,
+    find_ancestor,
+    find_prefix_instances,
+    normalize_prefix,
+    process_table,
+)
+from d2rloader.core.platform_linux.procwatch import ProcessWatcher
 from d2rloader.core.platform_linux.umu import UmuManager
 from d2rloader.core.platform_linux.utils import (
-    get_window_by_title,
+    get_window_snapshot,
+    rename_window,
     run_wine_cmd,
-    set_window_title,
+    wait_for_window,
 )
-from d2rloader.core.worker import Worker
-from d2rloader.models.account import Account
+from d2rloader.core.process_base import BaseProcessManager
+from d2rloader.core.worker import Worker, WorkerSignals
+from d2rloader.models.account import Account, AuthMethod
 
 if TYPE_CHECKING:
     from d2rloader.core.state import D2RLoaderState
 
 
-class ProcessManager(QObject):
-    process_finished: Signal = Signal(bool, Account, int)
-    process_error: Signal = Signal(Account, str)
+class ProcessManager(BaseProcessManager):
+    resolves_steam_pid: bool = True
 
     def __init__(self, parent: QObject, appstate: "D2RLoaderState") -> None:
-        super().__init__()
-        self._state: "D2RLoaderState" = appstate
+        super().__init__(parent, appstate)
         self.umu_manager: UmuManager = UmuManager(self._state)
-        self.threadpool = QThreadPool()
-        self.threadpool: QThreadPool = QThreadPool()
-
-    def start(self, account: Account):
-        worker = Worker(self._start_instance, account)
-        worker.signals.error.connect(self._handle_worker_error)
-        worker.signals.success.connect(self._handle_worker_success)
-        self.threadpool.start(worker)
+        self.process_watcher: ProcessWatcher = ProcessWatcher()
+        # keep the signals of the prefix moves alive until they are done
+        self._move_signals: set[WorkerSignals] = set()
 
     def kill(self, pid: int):
         logger.info(f"Killing instance with pid: {pid}")
@@ -45,38 +50,87 @@ class ProcessManager(QObject):
             child.kill()
         parent.kill()
 
-    def find_active_instances(self, accounts: list[Account]) -> dict[int, Account]:
+    def _scan_active_instances(self, accounts: list[Account]) -> dict[int, Account]:
         instances: dict[int, Account] = {}
+        prefixes: dict[str, list[Account]] = {}
+        for account in accounts:
+            prefix = normalize_prefix(
+                Account.wineprefix_account(self._state.settings.data, account)
+            )
+            prefixes.setdefault(prefix, []).append(account)
+
+        # one pass over /proc - works without a window title or an X server
+        table = process_table()
+        unique = {
+            prefix: group[0] for prefix, group in prefixes.items() if len(group) == 1
+        }
+        for prefix, pid in find_prefix_instances(table, unique).items():
+            logger.info(f"Running instance found: {unique[prefix].displayname}")
+            instances[pid] = unique[prefix]
+
+        # accounts sharing a prefix (Steam) can only be told apart by the window
+        shared = [a for group in prefixes.values() if len(group) > 1 for a in group]
+        if shared:
+            instances.update(self._scan_window_titles(table, shared))
+
+        return instances
+
+    def _scan_window_titles(
+        self, table: dict[int, ProcessEntry], accounts: list[Account]
+    ) -> dict[int, Account]:
+        instances: dict[int, Account] = {}
+        snapshot = get_window_snapshot()
         for account in accounts:
             title = WINDOW_TITLE_FORMAT.format(
                 account.displayname, account.region.value
             )
-            window_id, window_pid = get_window_by_title(title)
+            window_id, window_pid = snapshot.get_by_title(title)
             if window_id is None or window_pid is None:
                 continue
 
-            p_parents = psutil.Process(int(window_pid)).parents()
-            pid = None
-            for p in p_parents:
-                if p.name() == "srt-bwrap":
-                    pid = p.pid
-                    break
-
+            pid = find_ancestor(table, int(window_pid), INSTANCE_ROOT_NAME)
             if pid is not None:
                 logger.info(f"Running instance found: {title}")
                 instances[pid] = account
 
         return instances
 
-    def _handle_worker_error(self, err: tuple[Exception, str]):
-        logger.debug(err)
-        msg, *_ = err[0].args
-        logger.error(f"Could not start instance due to: {msg}")
-        self.process_error.emit(None, msg)
+    def move_wineprefix(self, previous: Account, account: Account) -> bool:
+        # Steam accounts share the prefix of the Steam client
+        if AuthMethod.Steam in (previous.auth_method, account.auth_method):
+            return False
+        if (
+            previous.profile_normalized == account.profile_normalized
+            and previous.email_normalized == account.email_normalized
+        ):
+            return False
+        source = Account.wineprefix_account(self._state.settings.data, previous)
+        target = Account.wineprefix_account(self._state.settings.data, account)
+        if source == target:
+            return False
+        running = self._state.instances.running_wineprefixes()
+        if normalize_prefix(source) in {normalize_prefix(p) for p in running}:
+            logger.warning(f"Not moving {source} - the game is running in it")
+            return False
+
+        # retargeting the symlinks walks the whole prefix
+        worker = Worker(self.umu_manager.prefix_manager.move_prefix, source, target)
+        self._move_signals.add(worker.signals)
+        worker.signals.error.connect(
+            functools.partial(self._on_move_error, source, target)
+        )
+        worker.signals.finished.connect(
+            functools.partial(self._move_signals.discard, worker.signals)
+        )
+        self.threadpool.start(worker)
+        return True
 
-    def _handle_worker_success(self, result: tuple[bool, Account | None, int]):
-        logger.debug(f"Instance started: {result}")
-        self.process_finished.emit(result[0], result[1], result[2])
+    def _on_move_error(self, source: Path, target: Path, err: tuple[Exception, str]):
+        logger.error(f"Couldn't move {source} to {target}: {err[0]}")
+        logger.debug(err[1])
+
+    def _get_wineprefix(self, account: Account) -> str | None:
+        return str(Account.wineprefix_account(self._state.settings.data, account))
 
     def _start_instance(self, account: Account):
         if not Path(self._state.settings.data.game_path, "D2R.exe").exists():
@@ -86,71 +140,65 @@ class ProcessManager(QObject):
 
         pid: int | None = self.umu_manager.start(account)
 
-        if pid and self._is_d2r_started(pid):
-            self._rename_window_title(pid, account)
+        if account.auth_method == AuthMethod.Steam:
+            # steam -applaunch hands the launch over to the Steam client and
+            # exits right away - the instance is found by its prefix instead
+            instance = self._wait_for_prefix_instance(account)
+            if instance is None:
+                return None, account, 0
+            pid, d2r_pid = instance
+            self._rename_window_title(d2r_pid, account)
+        elif pid:
+            d2r_pid = self._wait_for_d2r_exe(pid)
+            if d2r_pid is not None:
+                self._rename_window_title(d2r_pid, account)
 
         return None, account, pid
 
-    def _is_d2r_started(self, parent_pid: int):
-        parent = psutil.Process(parent_pid)
-        pid = None
-        timeout = 30  # abort after 30 seconds
-        counter = 0
+    def _wait_for_prefix_instance(self, account: Account, timeout: float = 60.0):
+        """Returns the pid of the instance and of D2R.exe running in the prefix
+        of the account as soon as it appears"""
+        prefix = normalize_prefix(
+            Account.wineprefix_account(self._state.settings.data, account)
+        )
+        deadline = monotonic() + timeout
+        delay = 0.25
         while True:
-            pid = self._get_d2r_exe_pid(None, parent)
-            if pid is not None:
-                logger.debug("D2R.exe process found!")
-                break
-            sleep(0.5)
-
-            counter += 0.5
-            if counter == timeout:
-                logger.error("D2R.exe not found after looking for it for 30 seconds")
-                break
-
-        return pid is not None
-
-    def _get_d2r_exe_pid(
-        self, parent_pid: int | None, process: psutil.Process | None = None
-    ):
-        if parent_pid is None and process is None:
-            return None
-
-        if parent_pid and process:
-            return None
-
-        if parent_pid is not None:
-            parent = psutil.Process(parent_pid)
-        elif process is not None:
-            parent = process
+            table = process_table()
+            for pid, entry in table.items():
+                if entry.prefix == prefix:
+                    root = find_ancestor(table, pid, INSTANCE_ROOT_NAME)
+                    return (root if root is not None else pid), pid
+
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                logger.error(
+                    f"D2R.exe not found in {prefix} after looking for it for "
+                    f"{timeout} seconds"
+                )
+                return None
+            sleep(min(delay, remaining))
+            delay = min(delay * 2, 2.0)
+
+    def _wait_for_d2r_exe(self, parent_pid: int, timeout: float = 30.0):
+        pid = self.process_watcher.wait_for_child(parent_pid, "Main", timeout)
+        if pid is None:
+            logger.error(
+                f"D2R.exe not found after looking for it for {timeout} seconds"
+            )
         else:
-            return None
-
-        for child in parent.children(recursive=True):
-            if child.name() == "Main":
-                return child
-        return None
+            logger.debug(f"D2R.exe process found! (pid {pid})")
+        return pid
 
-    def _rename_window_title(self, pid: int, account: Account):
+    def _rename_window_title(self, d2r_pid: int, account: Account):
         # Once Wine Wayland is stable enough to be mainstream we gotta switch to the
         # method below
-        process = self._get_d2r_exe_pid(pid)
-        if process is None:
-            logger.error(f"Couldn't set window title for pid {pid}. No process found.")
-            return
-
         window_title = WINDOW_TITLE_FORMAT.format(
             account.displayname, account.region.value
         )
-        sleep(1)
-        set_window_title(process.pid, window_title)
-
-    def _rename_window_title_wine(self, pid: int, account: Account):
-        process = self._get_d2r_exe_pid(pid)
-        if process is None:
-            logger.error(f"Couldn't set window title for pid {pid}. No process found.")
-            return
+        rename_window(d2r_pid, window_title)
 
+    def _rename_window_title_wine(self, d2r_pid: int, account: Account):
         window_title = WINDOW_TITLE_FORMAT.format(
             account.displayname, account.region.value
         )
@@ -160,7 +208,11 @@ class ProcessManager(QObject):
             "--rename-window",
             window_title,
         ]
-        sleep(1)
+        if wait_for_window(d2r_pid) is None:
+            logger.error(
+                f"Couldn't set window title for pid {d2r_pid}. No window found."
+            )
+            return
         output = run_wine_cmd(
             cmd, Account.wineprefix_account(self._state.settings.data, account)
         )
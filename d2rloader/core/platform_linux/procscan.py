@@ -0,0 +1,102 @@
+import os
+from collections.abc import Container
+from typing import NamedTuple
+
+from d2rloader.core.platform_linux.procwatch import read_proc_stat
+
+# names of the game's main process - Wine renames it to "Main" via prctl
+D2R_PROCESS_NAMES = ("Main", "D2R.exe")
+# the Steam Linux Runtime container which is started by umu for every instance
+INSTANCE_ROOT_NAME = "srt-bwrap"
+# umu/Proton run the game with WINEPREFIX=<prefix>/pfx
+PROTON_PREFIX_DIR = "pfx"
+
+
+class ProcessEntry(NamedTuple):
+    ppid: int
+    name: str
+    prefix: str | None
+
+
+def normalize_prefix(prefix: str | os.PathLike[str]) -> str:
+    """Returns the prefix the way the loader names it: symlinks are resolved
+    and the ``pfx`` directory of umu/Proton is stripped"""
+    prefix = os.path.realpath(prefix)
+    if os.path.basename(prefix) == PROTON_PREFIX_DIR:
+        prefix = os.path.dirname(prefix)
+    return prefix
+
+
+def read_proc_environ(pid: int, key: str) -> str | None:
+    try:
+        with open(f"/proc/{pid}/environ", "rb") as fp:
+            environ = fp.read()
+    except OSError:
+        return None
+
+    needle = f"{key}=".encode()
+    for entry in environ.split(b"\0"):
+        if entry.startswith(needle):
+            return entry[len(needle) :].decode(errors="replace")
+    return None
+
+
+def process_table(
+    names: Container[str] = D2R_PROCESS_NAMES,
+) -> dict[int, ProcessEntry]:
+    """One pass over /proc building a pid -> (ppid, name, prefix) table.
+
+    Reading the environment of every process is expensive, so ``WINEPREFIX`` is
+    only read for the processes whose name is in ``names``.
+    """
+    table: dict[int, ProcessEntry] = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+
+        pid = int(entry.name)
+        stat = read_proc_stat(pid)
+        if stat is None:
+            continue
+
+        ppid, name = stat
+        prefix = None
+        if name in names:
+            prefix = read_proc_environ(pid, "WINEPREFIX")
+            if prefix is not None:
+                prefix = normalize_prefix(prefix)
+        table[pid] = ProcessEntry(ppid, name, prefix)
+    return table
+
+
+def find_ancestor(
+    table: dict[int, ProcessEntry], pid: int, name: str, max_depth: int = 64
+) -> int | None:
+    for _ in range(max_depth):
+        entry = table.get(pid)
+        if entry is None or entry.ppid <= 1:
+            return None
+        pid = entry.ppid
+        parent = table.get(pid)
+        if parent is not None and parent.name == name:
+            return pid
+    return None
+
+
+def find_prefix_instances(
+    table: dict[int, ProcessEntry], prefixes: Container[str]
+) -> dict[str, int]:
+    """Maps the wine prefixes to the pid of the instance running in them.
+
+    The pid is the one of the ``srt-bwrap`` container if the game runs inside
+    one, otherwise the pid of the game itself.
+    """
+    instances: dict[str, int] = {}
+    for pid, entry in table.items():
+        if entry.prefix is None or entry.prefix not in prefixes:
+            continue
+        if entry.prefix in instances:
+            continue
+        root = find_ancestor(table, pid, INSTANCE_ROOT_NAME)
+        instances[entry.prefix] = root if root is not None else pid
+    return instances
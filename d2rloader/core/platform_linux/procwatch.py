@@ -0,0 +1,273 @@
+import errno
+import os
+import select
+import socket
+import struct
+import threading
+from time import monotonic
+
+from loguru import logger
+
+# see linux/connector.h and linux/cn_proc.h
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+NLMSG_DONE = 3
+PROC_CN_MCAST_LISTEN = 1
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_COMM = 0x00000200
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_CN_MSG = struct.Struct("=IIIIHH")
+_PROC_EVENT_HEADER = struct.Struct("=IIQ")
+_PROC_EVENT_IDS = struct.Struct("=II")
+
+
+def read_proc_stat(pid: int) -> tuple[int, str] | None:
+    """Returns (ppid, comm) of a process or None if it doesn't exist anymore"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as fp:
+            stat = fp.read()
+    except OSError:
+        return None
+
+    # the comm might contain spaces and parentheses itself
+    comm_start = stat.find(b"(")
+    comm_end = stat.rfind(b")")
+    fields = stat[comm_end + 2 :].split()
+    if comm_start < 0 or len(fields) < 2:
+        return None
+    return int(fields[1]), stat[comm_start + 1 : comm_end].decode(errors="replace")
+
+
+def read_proc_comm(pid: int) -> str | None:
+    try:
+        with open(f"/proc/{pid}/comm", "rb") as fp:
+            return fp.read().rstrip(b"\n").decode(errors="replace")
+    except OSError:
+        return None
+
+
+def is_descendant(pid: int, ancestor: int, max_depth: int = 64) -> bool:
+    for _ in range(max_depth):
+        stat = read_proc_stat(pid)
+        if stat is None or stat[0] <= 1:
+            return False
+        if stat[0] == ancestor:
+            return True
+        pid = stat[0]
+    return False
+
+
+class _Waiter:
+    def __init__(self, parent_pid: int, name: str) -> None:
+        self.parent_pid: int = parent_pid
+        self.name: str = name
+        self.pid: int | None = None
+        self.found: threading.Event = threading.Event()
+
+
+class ProcessWatcher:
+    """Notifies waiting launch workers as soon as a named child process appears.
+
+    With the required privileges (CAP_NET_ADMIN) the kernel's proc connector is
+    used to get exec and comm change events pushed. Otherwise ``/proc`` is
+    scanned incrementally with an exponential backoff while a pidfd of the parent
+    aborts the wait as soon as the parent exits.
+    """
+
+    def __init__(self) -> None:
+        self._lock: threading.Lock = threading.Lock()
+        self._waiters: set[_Waiter] = set()
+        self._netlink: socket.socket | None = None
+        self._netlink_checked: bool = False
+
+    def wait_for_child(self, parent_pid: int, name: str, timeout: float) -> int | None:
+        if self._connect_netlink():
+            return self._wait_netlink(parent_pid, name, timeout)
+        return self._wait_scan(parent_pid, name, timeout)
+
+    def _connect_netlink(self) -> bool:
+        with self._lock:
+            if self._netlink_checked:
+                return self._netlink is not None
+            self._netlink_checked = True
+
+            try:
+                sock = socket.socket(
+                    socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR
+                )
+                sock.bind((os.getpid(), CN_IDX_PROC))
+                op = struct.pack("=I", PROC_CN_MCAST_LISTEN)
+                cn_msg = _CN_MSG.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(op), 0)
+                header = _NLMSGHDR.pack(
+                    _NLMSGHDR.size + len(cn_msg) + len(op),
+                    NLMSG_DONE,
+                    0,
+                    0,
+                    os.getpid(),
+                )
+                sock.send(header + cn_msg + op)
+            except (OSError, AttributeError) as e:
+                logger.debug(f"Proc connector not available ({e}) - scanning /proc")
+                return False
+
+            self._netlink = sock
+            threading.Thread(target=self._listen_netlink, daemon=True).start()
+            logger.debug("Listening for process events via the proc connector")
+            return True
+
+    def _listen_netlink(self):
+        sock = self._netlink
+        assert sock is not None
+        offset = _NLMSGHDR.size + _CN_MSG.size
+        while True:
+            try:
+                data = sock.recv(4096)
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    # events got dropped - keep listening
+                    logger.trace(f"Proc connector recv failed: {e}")
+                    continue
+                logger.warning(f"Proc connector failed ({e}) - scanning /proc")
+                with self._lock:
+                    # wait_for_child falls back to scanning /proc
+                    self._netlink = None
+                sock.close()
+                return
+
+            if len(data) < offset + _PROC_EVENT_HEADER.size + _PROC_EVENT_IDS.size:
+                continue
+
+            what, _, _ = _PROC_EVENT_HEADER.unpack_from(data, offset)
+            if what not in (PROC_EVENT_EXEC, PROC_EVENT_COMM):
+                continue
+
+            pid, tgid = _PROC_EVENT_IDS.unpack_from(
+                data, offset + _PROC_EVENT_HEADER.size
+            )
+            # only the main thread names the process
+            if pid == tgid:
+                self._process_event(tgid)
+
+    def _process_event(self, pid: int):
+        with self._lock:
+            waiters = list(self._waiters)
+        if not waiters:
+            return
+
+        comm = read_proc_comm(pid)
+        for waiter in waiters:
+            if comm == waiter.name and is_descendant(pid, waiter.parent_pid):
+                waiter.pid = pid
+                waiter.found.set()
+
+    def _wait_netlink(self, parent_pid: int, name: str, timeout: float):
+        waiter = _Waiter(parent_pid, name)
+        with self._lock:
+            self._waiters.add(waiter)
+
+        try:
+            # the process might have been started before we were listening
+            pid = self._find_descendant(parent_pid, name)
+            if pid is not None:
+                return pid
+
+            deadline = monotonic() + timeout
+            while (remaining := deadline - monotonic()) > 0:
+                if waiter.found.wait(min(remaining, 1.0)):
+                    return waiter.pid
+                if self._netlink is None:
+                    return self._wait_scan(parent_pid, name, deadline - monotonic())
+                if not _is_running(parent_pid):
+                    logger.debug(f"Parent {parent_pid} exited before {name} appeared")
+                    return None
+            return None
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def _wait_scan(self, parent_pid: int, name: str, timeout: float):
+        pidfd = _pidfd_open(parent_pid)
+        known: dict[int, int] = {}
+        descendants: set[int] = set()
+        deadline = monotonic() + timeout
+        delay = 0.02
+        try:
+            while True:
+                pid = self._scan(parent_pid, name, known, descendants)
+                if pid is not None:
+                    return pid
+
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    return None
+
+                wait = min(delay, remaining)
+                delay = min(delay * 2, 0.5)
+                if pidfd is None:
+                    select.select([], [], [], wait)
+                elif select.select([pidfd], [], [], wait)[0]:
+                    logger.debug(f"Parent {parent_pid} exited before {name} appeared")
+                    return None
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+
+    def _scan(
+        self, parent_pid: int, name: str, known: dict[int, int], descendants: set[int]
+    ) -> int | None:
+        """One incremental pass over /proc.
+
+        Only processes which haven't been seen before are read; the comm is
+        re-read for the descendants of ``parent_pid`` only since it changes when
+        the game names its main thread.
+        """
+        pids = {int(entry) for entry in os.listdir("/proc") if entry.isdigit()}
+
+        for pid in known.keys() - pids:
+            del known[pid]
+            descendants.discard(pid)
+
+        new_pids = sorted(pids - known.keys())
+        for pid in new_pids:
+            stat = read_proc_stat(pid)
+            known[pid] = stat[0] if stat is not None else 0
+
+        # parents usually have lower pids but pids wrap around - repeat until
+        # nothing changes
+        changed = True
+        while changed:
+            changed = False
+            for pid in new_pids:
+                if pid in descendants:
+                    continue
+                ppid = known.get(pid)
+                if ppid == parent_pid or ppid in descendants:
+                    descendants.add(pid)
+                    changed = True
+
+        for pid in descendants:
+            if read_proc_comm(pid) == name:
+                return pid
+        return None
+
+    def _find_descendant(self, parent_pid: int, name: str) -> int | None:
+        return self._scan(parent_pid, name, {}, set())
+
+
+def _pidfd_open(pid: int) -> int | None:
+    try:
+        return os.pidfd_open(pid)
+    except (OSError, AttributeError):
+        return None
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as fp:
+            stat = fp.read()
+    except OSError:
+        return False
+    # exited but not yet reaped processes are zombies ("Z")
+    return stat[stat.rfind(b")") + 2 : stat.rfind(b")") + 3] != b"Z"
@@ -0,0 +1,108 @@
+import contextlib
+import fcntl
+import os
+import shutil
+from collections.abc import Iterable
+from pathlib import Path
+
+from loguru import logger
+
+# the shared cache is kept next to the prefixes of the accounts
+SHADER_CACHE_DIR = ".shadercache"
+# pipeline state caches written into the prefix by DXVK and vkd3d-proton
+STATE_CACHE_FILES = ("D2R.dxvk-cache", "vkd3d-proton.cache")
+
+
+class ShaderCache:
+    """The shader cache shared by all prefixes.
+
+    The shader caches of the GPU drivers support being used by several
+    processes at once, so every instance writes into the shared ``driver``
+    directory directly.
+
+    The pipeline state caches of DXVK and vkd3d-proton only support a single
+    writer - every prefix keeps writing its own state cache. The largest one is
+    published into the shared ``state`` directory and copied into the prefixes
+    which have a smaller one (or none at all) before the game is started.
+    Files are replaced atomically and an exclusive lock serializes the
+    publishing of the concurrent launches.
+    """
+
+    def __init__(self, wineprefix: str | os.PathLike[str]) -> None:
+        self.path: Path = Path(wineprefix, SHADER_CACHE_DIR)
+
+    @property
+    def driver_path(self):
+        return Path(self.path, "driver")
+
+    @property
+    def state_path(self):
+        return Path(self.path, "state")
+
+    @contextlib.contextmanager
+    def _locked(self):
+        os.makedirs(self.driver_path, exist_ok=True)
+        os.makedirs(self.state_path, exist_ok=True)
+        with open(Path(self.path, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def publish(self, prefix: str | os.PathLike[str]):
+        """Replaces the shared state caches with the ones of the prefix if
+        they are larger. Returns the number of published files."""
+        published = 0
+        with self._locked():
+            for name in STATE_CACHE_FILES:
+                if _copy_if_larger(Path(prefix, name), Path(self.state_path, name)):
+                    published += 1
+        if published:
+            logger.debug(f"Published {published} state cache(s) of {prefix}")
+        return published
+
+    def warm(self, prefix: str | os.PathLike[str]):
+        """Copies the shared state caches into the prefix if they are larger
+        than its own. Must not be called while the game is running in the
+        prefix. Returns the number of copied files."""
+        copied = 0
+        with self._locked():
+            for name in STATE_CACHE_FILES:
+                if _copy_if_larger(Path(self.state_path, name), Path(prefix, name)):
+                    copied += 1
+        if copied:
+            logger.debug(f"Copied {copied} state cache(s) into {prefix}")
+        return copied
+
+    def warm_all(self, prefixes: Iterable[str | os.PathLike[str]]):
+        """Publishes the largest state caches of the prefixes and copies them
+        into all of them. Returns the number of warmed prefixes."""
+        prefixes = [prefix for prefix in prefixes if os.path.isdir(prefix)]
+        for prefix in prefixes:
+            self.publish(prefix)
+        return sum(1 for prefix in prefixes if self.warm(prefix))
+
+
+def _copy_if_larger(src: Path, dst: Path):
+    try:
+        size = os.stat(src).st_size
+    except FileNotFoundError:
+        return False
+    try:
+        if os.stat(dst).st_size >= size:
+            return False
+    except FileNotFoundError:
+        pass
+
+    # readers see either the old or the new file, never a partial copy
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}")
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except OSError as e:
+        logger.warning(f"Couldn't copy {src} to {dst}: {e}")
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+        return False
+    return True
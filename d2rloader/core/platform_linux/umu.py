@@ -1,6 +1,8 @@
 import os
 import subprocess
+import threading
 import urllib.request
+from collections.abc import Callable
 from pathlib import Path
 from shutil import which
 from typing import TYPE_CHECKING
@@ -10,6 +12,8 @@ from loguru import logger
 from d2rloader.constants import CONFIG_BASE_DIR, D2RREG_URL, D2RREG_VERSION
 from d2rloader.core.exception import ProcessingError
 from d2rloader.core.game_settings import GameSetting
+from d2rloader.core.platform_linux.prefix import PrefixManager, is_initialized
+from d2rloader.core.platform_linux.shadercache import ShaderCache
 from d2rloader.core.platform_linux.utils import run_wine_cmd
 from d2rloader.models.account import Account, AuthMethod
 
@@ -24,9 +28,12 @@ START_SCRIPT = """
 
 # Environment variables
 export __GL_SHADER_DISK_CACHE="1" # avoid recompiling shaders each time
-export __GL_SHADER_DISK_CACHE_PATH="{WINEPREFIX}" # shaders cache path
+export __GL_SHADER_DISK_CACHE_PATH="{SHADER_CACHE_PATH}" # shaders cache path
+export __GL_SHADER_DISK_CACHE_SKIP_CLEANUP="1" # don't limit the cache size
+export MESA_SHADER_CACHE_DIR="{SHADER_CACHE_PATH}"
 export STAGING_SHARED_MEMORY="1" # https://gitlab.winehq.org/wine/wine-staging/-/wikis/Configuration/Environment-Variables#Shared_Memory
 export DXVK_STATE_CACHE_PATH="{WINEPREFIX}"
+export VKD3D_SHADER_CACHE_PATH="{WINEPREFIX}"
 export DXVK_LOG_LEVEL="error" # only log errors
 export DXVK_NVAPIHACK="0"
 export DXVK_ENABLE_NVAPI="1"
@@ -61,6 +68,9 @@ class UmuManager:
 
     def __init__(self, state: "D2RLoaderState") -> None:
         self._state: D2RLoaderState = state
+        # launches run concurrently - make sure d2rreg.exe is only fetched once
+        self._d2rreg_lock: threading.Lock = threading.Lock()
+        self.prefix_manager: PrefixManager = PrefixManager(state)
 
     @property
     def steam(self):
@@ -93,6 +103,15 @@ class UmuManager:
             return self._state.settings.data.protonpath
         return "UMU-Latest"
 
+    def get_shader_cache_path(self, account: Account):
+        if self._state.settings.data.shared_shader_cache:
+            return self.shader_cache.driver_path
+        return self.get_wineprefix_account(account)
+
+    @property
+    def shader_cache(self):
+        return ShaderCache(self._state.settings.data.wineprefix)
+
     def get_start_script_log_path(self, account: Account):
         return Path(self.get_wineprefix_account(account), "umu.log")
 
@@ -100,6 +119,14 @@ class UmuManager:
         return Path(self.get_wineprefix_account(account), "start.sh")
 
     def start(self, account: Account):
+        if account.auth_method != AuthMethod.Steam:
+            # waits for the preparation of the prefix if it is still running
+            self.prefix_manager.initialize_prefix(
+                account, self.get_protonpath_account(account), self.umu_run
+            )
+            if self._state.settings.data.shared_shader_cache:
+                self._warm_shader_cache(account)
+
         game_settings = self._state.game_settings.get_game_settings(account)
         params: list[str] = ["-address", account.region.value]
         if account.auth_method == AuthMethod.Password:
@@ -132,6 +159,43 @@ class UmuManager:
         else:
             return self._start(account, game_settings, params)
 
+    def prepare(
+        self, account: Account, progress: Callable[[str, int, int], None] | None = None
+    ):
+        """Does the work of the first launch in advance: creates the prefix,
+        warms its shader cache and fetches d2rreg.exe. ``progress`` is called
+        with the description, number and count of every step."""
+        steps: list[tuple[str, Callable[[], object]]] = [
+            (
+                "Creating the wineprefix",
+                lambda: self.prefix_manager.initialize_prefix(
+                    account, self.get_protonpath_account(account), self.umu_run
+                ),
+            ),
+        ]
+        if self._state.settings.data.shared_shader_cache:
+            steps.append(
+                ("Warming the shader cache", lambda: self._warm_shader_cache(account))
+            )
+        if account.auth_method == AuthMethod.Token:
+            steps.append(("Fetching d2rreg.exe", self._check_d2rreg))
+
+        for number, (description, step) in enumerate(steps, 1):
+            if progress is not None:
+                progress(description, number, len(steps))
+            step()
+        return is_initialized(self.get_wineprefix_account(account))
+
+    def _warm_shader_cache(self, account: Account):
+        # publish the state caches of the last run, then start with the
+        # largest state caches of all prefixes
+        prefix = self.get_wineprefix_account(account)
+        try:
+            self.shader_cache.publish(prefix)
+            self.shader_cache.warm(prefix)
+        except OSError as e:
+            logger.warning(f"Couldn't update the shader cache of {prefix}: {e}")
+
     def _update_web_token_value(self, account: Account):
         logger.debug(f"Updating WEB_TOKEN value for account: {account.profile_name}")
 
@@ -152,6 +216,10 @@ class UmuManager:
         return output.stdout
 
     def _check_d2rreg(self):
+        with self._d2rreg_lock:
+            self._download_d2rreg()
+
+    def _download_d2rreg(self):
         if (
             not os.path.exists(os.path.join(CONFIG_BASE_DIR, "d2rreg.exe"))
             or self._state.settings.data.d2rreg_version != D2RREG_VERSION
@@ -170,11 +238,13 @@ class UmuManager:
     def _render_start_script(self, account: Account, params: list[str]):
         logger.debug(f"Using WINEPREFIX: {self.get_wineprefix_account(account)}")
         logger.debug(f"Using PROTONPATH: {self.get_protonpath_account(account)}")
+        logger.debug(f"Using SHADER_CACHE_PATH: {self.get_shader_cache_path(account)}")
         logger.debug(f"Using GAME_PATH: {self._state.settings.data.game_path}")
         logger.debug(f"Using UMU_RUN: {self.umu_run}")
         logger.debug(f"Using PARAMS: {self._log_params(params)}")
         return START_SCRIPT.format(
             WINEPREFIX=self.get_wineprefix_account(account),
+            SHADER_CACHE_PATH=self.get_shader_cache_path(account),
             PROTONPATH=self.get_protonpath_account(account),
             GAME_PATH=self._state.settings.data.game_path,
             UMU_RUN=self.umu_run,
@@ -1,9 +1,44 @@
 import os
 import subprocess
+import threading
 from pathlib import Path
+from time import monotonic, sleep
 
 from loguru import logger
 
+from d2rloader.core.platform_linux.x11 import get_x11_backend
+
+# window lookups done in quick succession (e.g. find the window of a pid and
+# rename it) can share a snapshot which is this many seconds old
+WINDOW_SNAPSHOT_MAX_AGE = 0.05
+
+
+class WindowSnapshot:
+    """A single window listing indexed by window title and pid."""
+
+    def __init__(self, windows: list[tuple[str, str, str]]):
+        self.created: float = monotonic()
+        self.by_title: dict[str, tuple[str, str]] = {}
+        self.by_pid: dict[str, tuple[str, str]] = {}
+
+        for window_id, window_pid, window_title in windows:
+            self.by_title.setdefault(window_title, (window_id, window_pid))
+            self.by_pid.setdefault(window_pid, (window_id, window_pid))
+
+    @property
+    def age(self):
+        return monotonic() - self.created
+
+    def get_by_title(self, title: str):
+        return self.by_title.get(title, (None, None))
+
+    def get_by_pid(self, pid: int | str):
+        return self.by_pid.get(str(pid), (None, None))
+
+
+_snapshot: WindowSnapshot | None = None
+_snapshot_lock = threading.Lock()
+
 
 def get_window_list() -> list[str]:
     try:
@@ -13,47 +48,137 @@ def get_window_list() -> list[str]:
             .strip()
             .splitlines()
         )
-    except subprocess.CalledProcessError as e:
-        logger.error("Couldn't call 'wmctrl -lp'", e)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        logger.error(f"Couldn't call 'wmctrl -lp': {e}")
         return []
     return windows
 
 
-def get_window_by_title(title: str):
-    windows = get_window_list()
-    if len(windows) < 1:
-        return (None, None)
-
+def parse_window_list(windows: list[str]) -> list[tuple[str, str, str]]:
+    """Parses the output of ``wmctrl -lp`` into (window id, pid, title)"""
+    parsed: list[tuple[str, str, str]] = []
     for wm_id in windows:
-        window_id, _, window_pid, _, window_title = wm_id.split(sep=None, maxsplit=4)
-        if title == window_title:
-            return (window_id, window_pid)
+        # window id, desktop, pid, client machine, title (might be empty)
+        parts = wm_id.split(sep=None, maxsplit=4)
+        if len(parts) < 4:
+            continue
+        window_title = parts[4] if len(parts) == 5 else ""
+        parsed.append((parts[0], parts[2], window_title))
+    return parsed
 
-    return (None, None)
 
+def list_windows() -> list[tuple[str, str, str]]:
+    backend = get_x11_backend()
+    if backend is not None:
+        try:
+            return backend.list_windows()
+        except Exception as e:
+            logger.error(f"Couldn't list windows via X11 ({e}) - using wmctrl")
+    return parse_window_list(get_window_list())
 
-def get_window_by_pid(pid: int):
-    windows = get_window_list()
-    if len(windows) < 1:
-        return (None, None)
 
-    str_pid = str(pid)
-    for wm_id in windows:
-        if str_pid in wm_id:
-            window_id, _, window_pid, _, _ = wm_id.split(sep=" ", maxsplit=4)
-            return (window_id, window_pid)
+def get_window_snapshot(max_age: float = 0.0):
+    """Returns a snapshot of all windows.
+
+    The previous snapshot is reused if it isn't older than ``max_age`` seconds.
+    """
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.age > max_age:
+            _snapshot = WindowSnapshot(list_windows())
+        return _snapshot
+
 
-    logger.debug(f"No windows found for pid {pid}")
-    return (None, None)
+def invalidate_window_snapshot():
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
 
 
-def set_window_title(pid: int, title: str):
-    window_id, _ = get_window_by_pid(pid)
+def get_window_by_title(title: str, max_age: float = 0.0):
+    return get_window_snapshot(max_age).get_by_title(title)
+
+
+def get_window_by_pid(pid: int, max_age: float = WINDOW_SNAPSHOT_MAX_AGE):
+    window_id, window_pid = get_window_snapshot(max_age).get_by_pid(pid)
+    if window_id is None:
+        logger.debug(f"No windows found for pid {pid}")
+    return (window_id, window_pid)
+
+
+def set_window_title(pid: int, title: str, max_age: float = WINDOW_SNAPSHOT_MAX_AGE):
+    window_id, _ = get_window_by_pid(pid, max_age)
     if window_id is None:
         return
 
+    set_window_title_by_id(window_id, title)
+
+
+def set_window_title_by_id(window_id: str, title: str):
     logger.debug(f"Updating title for window id '{window_id}' to '{title}'")
-    subprocess.Popen(["wmctrl", "-i", "-r", window_id, "-N", title])  # pyright: ignore[reportUnusedCallResult]
+    backend = get_x11_backend()
+    if backend is None or not backend.set_title(window_id, title):
+        subprocess.Popen(["wmctrl", "-i", "-r", window_id, "-N", title])  # pyright: ignore[reportUnusedCallResult]
+    # the title index is outdated now
+    invalidate_window_snapshot()
+
+
+def wait_for_window(pid: int, timeout: float = 30.0):
+    """Returns the id of the first window of ``pid`` as soon as it appears"""
+    backend = get_x11_backend()
+    if backend is not None:
+        try:
+            return backend.wait_for_window(pid, timeout)
+        except Exception as e:
+            logger.error(f"Couldn't wait for window via X11 ({e}) - using wmctrl")
+
+    # no X11 events available - poll with an exponential backoff instead
+    deadline = monotonic() + timeout
+    delay = 0.05
+    while True:
+        window_id, _ = get_window_snapshot().get_by_pid(pid)
+        if window_id is not None:
+            return window_id
+
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return None
+        sleep(min(delay, remaining))
+        delay = min(delay * 2, 1.0)
+
+
+def rename_window(pid: int, title: str, timeout: float = 30.0, grace: float = 10.0):
+    """Renames the window of ``pid`` as soon as it has been mapped.
+
+    D2R might set its own title shortly after the window appeared, therefore the
+    title is watched for another ``grace`` seconds and set again if it changed.
+    """
+    window_id = wait_for_window(pid, timeout)
+    if window_id is None:
+        logger.error(f"No window found for pid {pid} after {timeout} seconds")
+        return False
+
+    backend = get_x11_backend()
+    if backend is not None:
+        guard = backend.guard_title
+    else:
+        set_window_title_by_id(window_id, title)
+        guard = _guard_title_wmctrl
+
+    # don't block the launch while the title is being watched
+    threading.Thread(target=guard, args=(window_id, title, grace), daemon=True).start()
+    return True
+
+
+def _guard_title_wmctrl(window_id: str, title: str, grace: float):
+    deadline = monotonic() + grace
+    delay = 0.25
+    while (remaining := deadline - monotonic()) > 0:
+        sleep(min(delay, remaining))
+        delay = min(delay * 2, 2.0)
+        current_id, _ = get_window_snapshot().get_by_title(title)
+        if current_id != window_id:
+            set_window_title_by_id(window_id, title)
 
 
 def run_wine_cmd(cmd: list[Path | str], wineprefix: str | Path):
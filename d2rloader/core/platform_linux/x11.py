@@ -0,0 +1,254 @@
+import os
+import select
+import threading
+from time import monotonic
+from typing import Any
+
+from loguru import logger
+
+try:
+    from Xlib import X, Xatom
+    from Xlib import display as xdisplay
+    from Xlib import error as xerror
+except ImportError:
+    xdisplay = None
+
+
+def format_window_id(window_id: int):
+    # same format as used by wmctrl
+    return f"0x{window_id:08x}"
+
+
+class X11WindowBackend:
+    """Reads and renames windows over a persistent X11 connection.
+
+    The EWMH properties ``_NET_CLIENT_LIST``, ``_NET_WM_PID`` and ``_NET_WM_NAME``
+    are read directly from the X server instead of spawning ``wmctrl``.
+    """
+
+    def __init__(self, display_name: str | None = None):
+        if xdisplay is None:
+            raise RuntimeError("python-xlib is not installed")
+
+        self.display: Any = xdisplay.Display(display_name)
+        self.root: Any = self.display.screen().root
+        # python-xlib connections must not be used by multiple threads at once
+        self._lock: threading.Lock = threading.Lock()
+
+        self.NET_CLIENT_LIST: int = self.display.intern_atom("_NET_CLIENT_LIST")
+        self.NET_WM_PID: int = self.display.intern_atom("_NET_WM_PID")
+        self.NET_WM_NAME: int = self.display.intern_atom("_NET_WM_NAME")
+        self.UTF8_STRING: int = self.display.intern_atom("UTF8_STRING")
+
+    def list_windows(self) -> list[tuple[str, str, str]]:
+        """Returns a list of (window id, pid, title) of all managed windows"""
+        windows: list[tuple[str, str, str]] = []
+        with self._lock:
+            for window_id in self._client_list():
+                window = self.display.create_resource_object("window", window_id)
+                try:
+                    pid = self._get_pid(window)
+                    title = self._get_title(window)
+                except xerror.XError:
+                    # the window got destroyed in the meantime
+                    continue
+                windows.append((format_window_id(window_id), str(pid or 0), title))
+        return windows
+
+    def set_title(self, window_id: str, title: str):
+        with self._lock:
+            window = self.display.create_resource_object("window", int(window_id, 16))
+            try:
+                self._set_title(self.display, window, title)
+            except xerror.XError as e:
+                logger.error(f"Couldn't set title of window {window_id}: {e}")
+                return False
+        return True
+
+    def wait_for_window(self, pid: int, timeout: float) -> str | None:
+        """Blocks until a window owned by ``pid`` appears or ``timeout`` passes.
+
+        Instead of polling, a dedicated connection listens for changes of the
+        ``_NET_CLIENT_LIST`` property of the root window and of the
+        ``_NET_WM_PID`` property of windows which got mapped before it was set.
+        """
+        display = self._open_event_display()
+        try:
+            root = display.screen().root
+            root.change_attributes(event_mask=X.PropertyChangeMask)
+            display.sync()
+
+            seen: set[int] = set()
+            watched: set[int] = set()
+            deadline = monotonic() + timeout
+            while True:
+                window_id = self._find_new_window(display, root, pid, seen, watched)
+                if window_id is not None:
+                    return format_window_id(window_id)
+
+                if not self._wait_for_property(
+                    display, (self.NET_CLIENT_LIST, self.NET_WM_PID), deadline
+                ):
+                    return None
+        finally:
+            display.close()
+
+    def guard_title(self, window_id: str, title: str, duration: float):
+        """Sets the title and re-applies it if the game changes it again.
+
+        D2R might set its own window title shortly after the window got mapped,
+        so changes of the title are watched for ``duration`` seconds.
+        """
+        display = self._open_event_display()
+        try:
+            window = display.create_resource_object("window", int(window_id, 16))
+            window.change_attributes(event_mask=X.PropertyChangeMask)
+            self._set_title(display, window, title)
+
+            deadline = monotonic() + duration
+            while self._wait_for_property(
+                display, (self.NET_WM_NAME, Xatom.WM_NAME), deadline
+            ):
+                if self._get_title(window) != title:
+                    logger.debug(f"Window title of {window_id} changed - resetting")
+                    self._set_title(display, window, title)
+        except xerror.XError as e:
+            logger.error(f"Couldn't set title of window {window_id}: {e}")
+            return False
+        finally:
+            display.close()
+        return True
+
+    def close(self):
+        with self._lock:
+            self.display.close()
+
+    def _open_event_display(self) -> Any:
+        # events are received per connection - waiting on a separate connection
+        # keeps the shared one free for other threads
+        return xdisplay.Display(self.display.get_display_name())
+
+    def _wait_for_property(
+        self, display: Any, atoms: tuple[int, ...], deadline: float
+    ) -> bool:
+        """Waits for a PropertyNotify event for one of the atoms"""
+        while True:
+            while display.pending_events():
+                event = display.next_event()
+                if event.type == X.PropertyNotify and event.atom in atoms:
+                    return True
+
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                return False
+            select.select([display], [], [], remaining)
+
+    def _find_new_window(
+        self, display: Any, root: Any, pid: int, seen: set[int], watched: set[int]
+    ) -> int | None:
+        """Returns the window of pid. Windows of other processes are added to
+        seen, the ones without a pid are checked again once it's set."""
+        prop = root.get_full_property(self.NET_CLIENT_LIST, Xatom.WINDOW)
+        if prop is None:
+            return None
+
+        for window_id in prop.value:
+            if window_id in seen:
+                continue
+            window = display.create_resource_object("window", window_id)
+            if window_id not in watched:
+                # Wine maps its windows before it sets their pid - watched
+                # before the pid is read to not miss it being set in between
+                watched.add(window_id)
+                window.change_attributes(
+                    event_mask=X.PropertyChangeMask, onerror=xerror.CatchError()
+                )
+            try:
+                window_pid = self._get_pid(window)
+            except xerror.XError:
+                # destroyed in the meantime
+                seen.add(window_id)
+                continue
+            if window_pid == pid:
+                return int(window_id)
+            if window_pid is not None:
+                seen.add(window_id)
+        return None
+
+    def _set_title(self, display: Any, window: Any, title: str):
+        # requests without a reply report their errors asynchronously - catch
+        # them and raise them once the requests have been processed
+        catcher = xerror.CatchError()
+        window.change_property(
+            self.NET_WM_NAME,
+            self.UTF8_STRING,
+            8,
+            title.encode("utf-8"),
+            onerror=catcher,
+        )
+        window.set_wm_name(title, onerror=catcher)
+        display.sync()
+        error = catcher.get_error()
+        if error is not None:
+            raise error
+
+    def _client_list(self) -> list[int]:
+        prop = self.root.get_full_property(self.NET_CLIENT_LIST, Xatom.WINDOW)
+        if prop is None:
+            return []
+        return list(prop.value)
+
+    def _get_pid(self, window: Any) -> int | None:
+        prop = window.get_full_property(self.NET_WM_PID, Xatom.CARDINAL)
+        if prop is None or len(prop.value) == 0:
+            return None
+        return int(prop.value[0])
+
+    def _get_title(self, window: Any) -> str:
+        prop = window.get_full_property(self.NET_WM_NAME, self.UTF8_STRING)
+        if prop is not None and prop.value:
+            value = prop.value
+            if isinstance(value, bytes):
+                return value.decode("utf-8", errors="replace")
+            return str(value)
+
+        prop = window.get_full_property(Xatom.WM_NAME, X.AnyPropertyType)
+        if prop is None or not prop.value:
+            return ""
+        value = prop.value
+        if isinstance(value, bytes):
+            return value.decode("latin-1")
+        return str(value)
+
+
+_backend: X11WindowBackend | None = None
+_backend_checked = False
+_backend_lock = threading.Lock()
+
+
+def get_x11_backend() -> X11WindowBackend | None:
+    """Returns the shared X11 connection or None if it's not available.
+
+    The connection is only attempted once - if python-xlib is missing or no X
+    server is reachable the callers fall back to wmctrl.
+    """
+    global _backend, _backend_checked
+    with _backend_lock:
+        if _backend_checked:
+            return _backend
+        _backend_checked = True
+
+        if xdisplay is None:
+            logger.debug("python-xlib not installed - falling back to wmctrl")
+            return None
+
+        if not os.environ.get("DISPLAY"):
+            logger.debug("DISPLAY not set - falling back to wmctrl")
+            return None
+
+        try:
+            _backend = X11WindowBackend()
+        except Exception as e:
+            logger.warning(f"Couldn't connect to the X server ({e}) - using wmctrl")
+            _backend = None
+        return _backend
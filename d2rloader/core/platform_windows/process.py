@@ -9,11 +9,11 @@ if TYPE_CHECKING:
 
 import psutil
 from loguru import logger
-from PySide6.QtCore import QObject, QThreadPool, Signal
+from PySide6.QtCore import QObject
 
 from d2rloader.constants import UPDATE_HANDLE, WINDOW_TITLE_FORMAT
 from d2rloader.core.exception import ProcessingError
-from d2rloader.core.worker import Worker
+from d2rloader.core.process_base import BaseProcessManager
 from d2rloader.models.account import Account, AuthMethod
 from d2rloader.models.setting import Setting
 
@@ -32,27 +32,21 @@ from .utils import (
 )
 
 
-class ProcessManager(QObject):
-    process_finished: Signal = Signal(bool, Account, int)
-    process_error: Signal = Signal(Account, str)
-
+class ProcessManager(BaseProcessManager):
     def __init__(self, parent: QObject, appstate: "D2RLoaderState") -> None:
-        super().__init__()
-        self._state: "D2RLoaderState" = appstate
-        self.threadpool = QThreadPool()
+        super().__init__(parent, appstate)
         self.handle: HandleManager = HandleManager(self._state.settings.data)
-        self.threadpool: QThreadPool = QThreadPool()
+
+    @property
+    def max_concurrent_launches(self) -> int:
+        # The WEB_TOKEN/REGION registry keys and the instance handle are shared
+        # between all instances - launches have to be done one after another.
+        return 1
 
     def kill(self, pid: int):
         kill_process_by_pid(pid)
 
-    def start(self, account: Account):
-        worker = Worker(self._start_instance, account)
-        worker.signals.error.connect(self._handle_worker_error)
-        worker.signals.success.connect(self._handle_worker_success)
-        self.threadpool.start(worker)
-
-    def find_active_instances(self, accounts: list[Account]):
+    def _scan_active_instances(self, accounts: list[Account]):
         instances: dict[int, Account] = {}
         for account in accounts:
             title = WINDOW_TITLE_FORMAT.format(
@@ -64,18 +58,6 @@ class ProcessManager(QObject):
                 instances[pid] = account
         return instances
 
-    def _handle_worker_error(self, err: tuple[ProcessingError | Exception, str]):
-        if isinstance(err[0], ProcessingError):
-            msg, *_ = err[0].args
-        else:
-            msg = err[1]
-        logger.error(f"Could not start instance due to: {err}")
-        self.process_error.emit(None, msg)
-
-    def _handle_worker_success(self, result: tuple[bool, Account | None, int]):
-        logger.success("Instance started successfully")
-        self.process_finished.emit(result[0], result[1], result[2])
-
     def _start_instance(self, account: Account):
         cmd = os.path.join(self._state.settings.data.game_path, "D2R.exe")
         if account.auth_method == AuthMethod.Steam:
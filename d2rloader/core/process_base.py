@@ -0,0 +1,166 @@
+import abc
+import functools
+import itertools
+from typing import TYPE_CHECKING
+
+from loguru import logger
+from PySide6.QtCore import QObject, QThreadPool, Signal
+
+from d2rloader.core.exception import ProcessingError
+from d2rloader.core.exit_watcher import ExitWatcher
+from d2rloader.core.worker import Worker, WorkerSignals
+from d2rloader.models.account import Account, AuthMethod
+
+if TYPE_CHECKING:
+    from d2rloader.core.state import D2RLoaderState
+
+
+class _ProcessManagerMeta(type(QObject), abc.ABCMeta):
+    pass
+
+
+class BaseProcessManager(QObject, metaclass=_ProcessManagerMeta):
+    """Launch pipeline shared by the platform specific process managers.
+
+    Every call to :meth:`start` gets its own launch id which is passed along with
+    the ``process_finished`` and ``process_error`` signals so that the results can
+    be routed back to whoever started the launch. Up to
+    :attr:`max_concurrent_launches` launches are processed at the same time.
+    """
+
+    # launch_id, logged_in, account, pid
+    process_finished: Signal = Signal(int, bool, Account, int)
+    # launch_id, account, message
+    process_error: Signal = Signal(int, Account, str)
+    # account, pid, exit code, runtime in seconds
+    instance_exited: Signal = Signal(Account, int, int, float)
+    # True if _start_instance returns the pid of the game for Steam launches -
+    # the pid of "steam -applaunch" exits right away
+    resolves_steam_pid: bool = False
+
+    def __init__(self, parent: QObject, appstate: "D2RLoaderState") -> None:
+        super().__init__()
+        self._state: "D2RLoaderState" = appstate
+        self._launch_ids: itertools.count[int] = itertools.count(1)
+        self._launches: dict[int, Account] = {}
+        # keep the worker signals alive until the result has been delivered
+        self._launch_signals: dict[int, WorkerSignals] = {}
+        self.threadpool: QThreadPool = QThreadPool()
+        self.threadpool.setMaxThreadCount(self.max_concurrent_launches)
+        self.exit_watcher: ExitWatcher = ExitWatcher(self.instance_exited.emit)
+        self.instance_exited.connect(self._on_instance_exited)
+
+    @property
+    def max_concurrent_launches(self) -> int:
+        return max(1, self._state.settings.data.max_concurrent_launches)
+
+    @property
+    def launches(self) -> dict[int, Account]:
+        """Returns the launches which are currently in flight"""
+        return dict(self._launches)
+
+    def start(self, account: Account) -> int:
+        launch_id = next(self._launch_ids)
+        self._launches[launch_id] = account
+
+        worker = Worker(self._start_instance, account)
+        self._launch_signals[launch_id] = worker.signals
+        worker.signals.error.connect(
+            functools.partial(self._handle_worker_error, launch_id)
+        )
+        worker.signals.success.connect(
+            functools.partial(self._handle_worker_success, launch_id)
+        )
+        # the setting might have been changed in the meantime
+        self.threadpool.setMaxThreadCount(self.max_concurrent_launches)
+        logger.debug(f"Queueing launch #{launch_id} for {account.displayname}")
+        self.threadpool.start(worker)
+        return launch_id
+
+    @abc.abstractmethod
+    def kill(self, pid: int):
+        """Kills the instance and its child processes"""
+
+    def track(self, pid: int, account: Account):
+        """Emits ``instance_exited`` once the instance with ``pid`` exits"""
+        self.exit_watcher.track(pid, account)
+
+    def find_active_instances(self, accounts: list[Account]) -> dict[int, Account]:
+        """Reattaches to the instances which are still running.
+
+        The instance registry is checked first - only the accounts without a
+        running registered instance are scanned for.
+        """
+        registry = self._state.instances
+        instances, candidates = registry.verify(accounts)
+
+        if candidates:
+            # accounts sharing a prefix might find the registered instances
+            scanned = {
+                pid: account
+                for pid, account in self._scan_active_instances(candidates).items()
+                if pid not in instances
+            }
+            for pid, account in scanned.items():
+                registry.add(
+                    account.uid, pid, self._get_wineprefix(account), commit=False
+                )
+            if scanned:
+                registry.save()
+            instances.update(scanned)
+
+        for pid, account in instances.items():
+            self.track(pid, account)
+        return instances
+
+    @abc.abstractmethod
+    def _scan_active_instances(self, accounts: list[Account]) -> dict[int, Account]:
+        """Looks for running instances of the accounts which aren't registered"""
+
+    def move_wineprefix(self, previous: Account, account: Account) -> bool:
+        """Moves the wineprefix of a renamed account in the background,
+        returns True if the move got started"""
+        return False
+
+    def _get_wineprefix(self, account: Account) -> str | None:
+        return None
+
+    @abc.abstractmethod
+    def _start_instance(self, account: Account) -> tuple[bool | None, Account, int]:
+        """Launches the account, runs on a worker thread. Returns whether the
+        account got logged in, the account and the pid of the instance"""
+
+    def _handle_worker_error(
+        self, launch_id: int, err: tuple[ProcessingError | Exception, str]
+    ):
+        account = self._launches.pop(launch_id, None)
+        self._launch_signals.pop(launch_id, None)
+        logger.debug(err)
+        if err[0].args:
+            msg, *_ = err[0].args
+        else:
+            msg = err[1]
+        logger.error(f"Could not start instance due to: {msg}")
+        self.process_error.emit(launch_id, account, str(msg))
+
+    def _handle_worker_success(
+        self, launch_id: int, result: tuple[bool, Account | None, int]
+    ):
+        self._launches.pop(launch_id, None)
+        self._launch_signals.pop(launch_id, None)
+        logger.debug(f"Instance started (launch #{launch_id}): {result}")
+        if (
+            result[1] is not None
+            and result[2]
+            and (self.resolves_steam_pid or result[1].auth_method != AuthMethod.Steam)
+        ):
+            self._state.instances.add(
+                result[1].uid, result[2], self._get_wineprefix(result[1])
+            )
+            self.track(result[2], result[1])
+        self.process_finished.emit(launch_id, bool(result[0]), result[1], result[2])
+
+    def _on_instance_exited(
+        self, account: Account, pid: int, exit_code: int, runtime: float
+    ):
+        self._state.instances.remove(account.uid, pid)
@@ -0,0 +1,269 @@
+import os
+import sys
+import threading
+from array import array
+from time import monotonic
+from typing import TYPE_CHECKING, NamedTuple
+
+import psutil
+from PySide6.QtCore import QObject, Signal
+
+if TYPE_CHECKING:
+    from d2rloader.core.process_base import BaseProcessManager
+    from d2rloader.core.store.settings import SettingService
+
+# number of samples kept per instance (5 minutes at the default interval)
+HISTORY_SIZE = 300
+# the process tree of an instance is refreshed every n samples
+TREE_REFRESH_INTERVAL = 10
+
+
+class RingBuffer:
+    """Fixed-size ring buffer backed by a preallocated ``array``"""
+
+    def __init__(self, size: int, typecode: str = "d") -> None:
+        self._data: array[float] = array(typecode, [0]) * size
+        self._size: int = size
+        self._index: int = 0
+        self._count: int = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, value: float):
+        self._data[self._index] = value
+        self._index = (self._index + 1) % self._size
+        if self._count < self._size:
+            self._count += 1
+
+    @property
+    def last(self) -> float:
+        if self._count == 0:
+            return 0
+        return self._data[self._index - 1]
+
+    def values(self) -> list[float]:
+        """Returns the values from the oldest to the newest"""
+        if self._count < self._size:
+            return self._data[: self._count].tolist()
+        return (self._data[self._index :] + self._data[: self._index]).tolist()
+
+
+class ResourceSample(NamedTuple):
+    time: float
+    cpu_percent: float
+    rss: int
+    io_bytes: int
+    threads: int
+
+
+class InstanceHistory:
+    def __init__(self, pid: int, size: int = HISTORY_SIZE) -> None:
+        self.pid: int = pid
+        self.time: RingBuffer = RingBuffer(size)
+        self.cpu_percent: RingBuffer = RingBuffer(size)
+        self.rss: RingBuffer = RingBuffer(size, "Q")
+        self.io_bytes: RingBuffer = RingBuffer(size, "Q")
+        self.threads: RingBuffer = RingBuffer(size, "L")
+        # pid -> consumed cpu seconds of the processes in the tree at the last sample
+        self.processes: dict[int, float] = {}
+        self.sampled_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def latest(self) -> ResourceSample | None:
+        if len(self.time) == 0:
+            return None
+        return ResourceSample(
+            self.time.last,
+            self.cpu_percent.last,
+            int(self.rss.last),
+            int(self.io_bytes.last),
+            int(self.threads.last),
+        )
+
+
+class ResourceSampler(QObject):
+    """Samples the resource usage of all instances known to the process manager.
+
+    Every ``sample_interval`` seconds the process trees of the instances are read
+    in a background thread and the CPU usage, the RSS, the IO bytes and the
+    thread count are appended to per instance ring buffers. A ``sample_interval``
+    of 0 pauses the sampling.
+    """
+
+    sampled: Signal = Signal()
+
+    def __init__(
+        self, process_manager: "BaseProcessManager", settings: "SettingService"
+    ) -> None:
+        super().__init__()
+        self._process_manager: BaseProcessManager = process_manager
+        self._settings: SettingService = settings
+        self._lock: threading.Lock = threading.Lock()
+        self._histories: dict[int, InstanceHistory] = {}
+        self._samples: int = 0
+        self._stop: threading.Event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def interval(self) -> float:
+        return max(0.0, self._settings.data.sample_interval)
+
+    def history(self, pid: int) -> InstanceHistory | None:
+        with self._lock:
+            return self._histories.get(pid)
+
+    def latest(self, pid: int) -> ResourceSample | None:
+        history = self.history(pid)
+        if history is None:
+            return None
+        with self._lock:
+            return history.latest()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="resource-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            interval = self.interval
+            if interval <= 0:
+                # paused - check again if the setting got changed
+                self._stop.wait(1.0)
+                continue
+
+            started = monotonic()
+            self.sample()
+            self._stop.wait(max(0.0, interval - (monotonic() - started)))
+
+    def sample(self):
+        pids = self._process_manager.exit_watcher.tracked.keys()
+        with self._lock:
+            for pid in self._histories.keys() - pids:
+                del self._histories[pid]
+            new_pids = pids - self._histories.keys()
+            for pid in new_pids:
+                self._histories[pid] = InstanceHistory(pid)
+            histories = list(self._histories.values())
+
+        if new_pids or self._samples % TREE_REFRESH_INTERVAL == 0:
+            self._refresh_trees(histories)
+        self._samples += 1
+
+        for history in histories:
+            now = monotonic()
+            elapsed = now - history.sampled_at if history.sampled_at else 0.0
+            history.sampled_at = now
+
+            cpu_percent = 0.0
+            rss = io_bytes = threads = 0
+            for pid, last_cpu_time in list(history.processes.items()):
+                usage = _read_usage(pid)
+                if usage is None:
+                    del history.processes[pid]
+                    continue
+
+                cpu_time, process_rss, process_io, process_threads = usage
+                if elapsed > 0 and last_cpu_time >= 0:
+                    cpu_percent += (cpu_time - last_cpu_time) / elapsed * 100
+                history.processes[pid] = cpu_time
+                rss += process_rss
+                io_bytes += process_io
+                threads += process_threads
+
+            with self._lock:
+                history.time.append(now)
+                history.cpu_percent.append(max(0.0, cpu_percent))
+                history.rss.append(rss)
+                history.io_bytes.append(io_bytes)
+                history.threads.append(threads)
+
+        if histories:
+            self.sampled.emit()
+
+    def _refresh_trees(self, histories: list[InstanceHistory]):
+        # one pass over all processes for all instances instead of calling
+        # Process.children() per instance
+        children: dict[int, list[int]] = {}
+        for process in psutil.process_iter(["ppid"]):
+            ppid = process.info["ppid"]
+            if ppid is not None:
+                children.setdefault(ppid, []).append(process.pid)
+
+        for history in histories:
+            tree: list[int] = [history.pid]
+            for pid in tree:
+                tree.extend(children.get(pid, ()))
+            # new processes get a cpu time of -1 so that their first sample is
+            # only used as the baseline
+            history.processes = {pid: history.processes.get(pid, -1.0) for pid in tree}
+
+
+def _read_usage(pid: int) -> tuple[float, int, int, int] | None:
+    """Returns (cpu seconds, rss, io bytes, threads) or None if the process is gone"""
+    if _CLOCK_TICKS is not None:
+        return _read_proc_usage(pid)
+
+    try:
+        process = psutil.Process(pid)
+        with process.oneshot():
+            cpu_times = process.cpu_times()
+            rss = process.memory_info().rss
+            threads = process.num_threads()
+            try:
+                io = process.io_counters()
+                io_bytes = io.read_bytes + io.write_bytes
+            except (psutil.AccessDenied, AttributeError):
+                io_bytes = 0
+    except psutil.Error:
+        return None
+    return cpu_times.user + cpu_times.system, rss, io_bytes, threads
+
+
+def _read_proc_usage(pid: int) -> tuple[float, int, int, int] | None:
+    # psutil would read stat, statm and status for the same values - one read of
+    # /proc/<pid>/stat is enough
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as fp:
+            stat = fp.read()
+    except OSError:
+        return None
+
+    assert _CLOCK_TICKS is not None
+    fields = stat[stat.rfind(b")") + 2 :].split()
+    cpu_time = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    threads = int(fields[17])
+    rss = int(fields[21]) * _PAGE_SIZE
+
+    io_bytes = 0
+    try:
+        with open(f"/proc/{pid}/io", "rb") as fp:
+            for line in fp:
+                if line.startswith((b"read_bytes:", b"write_bytes:")):
+                    io_bytes += int(line.split()[1])
+    except OSError:
+        # not readable for processes of other users
+        pass
+    return cpu_time, rss, io_bytes, threads
+
+
+def _sysconf(name: str) -> int | None:
+    try:
+        return os.sysconf(name)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+_CLOCK_TICKS: int | None = _sysconf("SC_CLK_TCK") if sys.platform == "linux" else None
+_PAGE_SIZE: int = _sysconf("SC_PAGE_SIZE") or 4096
@@ -0,0 +1,190 @@
+import enum
+import itertools
+from collections import deque
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from loguru import logger
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from d2rloader.models.account import Account
+
+if TYPE_CHECKING:
+    from d2rloader.core.process import ProcessManager
+    from d2rloader.core.store.settings import SettingService
+
+
+class LaunchStatus(enum.Enum):
+    Queued = enum.auto()
+    Starting = enum.auto()
+    Started = enum.auto()
+    Failed = enum.auto()
+    Cancelled = enum.auto()
+
+
+class LaunchEntry:
+    def __init__(self, entry_id: int, account: Account) -> None:
+        self.id: int = entry_id
+        self.account: Account = account
+        self.status: LaunchStatus = LaunchStatus.Queued
+        self.launch_id: int | None = None
+        self.pid: int | None = None
+        self.error: str | None = None
+        self.enqueued_at: float = monotonic()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+
+    @property
+    def queue_wait(self) -> float | None:
+        """Seconds the entry waited in the queue before it was handed over"""
+        if self.started_at is None:
+            return None
+        return self.started_at - self.enqueued_at
+
+    @property
+    def launch_latency(self) -> float | None:
+        """Seconds from handing the entry over until the launch finished"""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def __repr__(self) -> str:
+        return (
+            f"LaunchEntry(id={self.id}, account={self.account.displayname}, "
+            f"status={self.status.name})"
+        )
+
+
+class LaunchScheduler(QObject):
+    """Starts a batch of accounts on top of ``ProcessManager.start``.
+
+    At most ``max_concurrency`` scheduled launches are in flight at the same time
+    and two launches are spawned at least ``stagger`` seconds apart so that
+    Battle.net doesn't throttle the logins.
+    """
+
+    entry_queued: Signal = Signal(LaunchEntry)
+    entry_started: Signal = Signal(LaunchEntry)
+    entry_finished: Signal = Signal(LaunchEntry)
+    queue_changed: Signal = Signal()
+
+    def __init__(
+        self, process_manager: "ProcessManager", settings: "SettingService"
+    ) -> None:
+        super().__init__()
+        self._process_manager: ProcessManager = process_manager
+        self._settings: SettingService = settings
+        self._entry_ids: itertools.count[int] = itertools.count(1)
+        self._queue: deque[LaunchEntry] = deque()
+        self._running: dict[int, LaunchEntry] = {}
+        self._last_spawn: float | None = None
+
+        self._timer: QTimer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._dispatch)
+
+        self._process_manager.process_finished.connect(self._on_process_finished)
+        self._process_manager.process_error.connect(self._on_process_error)
+
+    @property
+    def max_concurrency(self) -> int:
+        return min(
+            max(1, self._settings.data.max_concurrent_launches),
+            self._process_manager.max_concurrent_launches,
+        )
+
+    @property
+    def stagger(self) -> float:
+        return max(0.0, self._settings.data.launch_stagger)
+
+    @property
+    def queue(self) -> list[LaunchEntry]:
+        """Returns the entries which are still waiting to be launched"""
+        return list(self._queue)
+
+    @property
+    def running(self) -> list[LaunchEntry]:
+        return list(self._running.values())
+
+    def enqueue(self, accounts: list[Account]) -> list[LaunchEntry]:
+        entries: list[LaunchEntry] = []
+        for account in accounts:
+            entry = LaunchEntry(next(self._entry_ids), account)
+            self._queue.append(entry)
+            entries.append(entry)
+            self.entry_queued.emit(entry)
+
+        logger.info(f"Queued {len(entries)} launch(es)")
+        self.queue_changed.emit()
+        self._dispatch()
+        return entries
+
+    def cancel(self, entry_id: int) -> bool:
+        for entry in self._queue:
+            if entry.id == entry_id:
+                self._queue.remove(entry)
+                self._finish(entry, LaunchStatus.Cancelled)
+                self.queue_changed.emit()
+                return True
+        return False
+
+    def cancel_all(self):
+        while self._queue:
+            self._finish(self._queue.popleft(), LaunchStatus.Cancelled)
+        self._timer.stop()
+        self.queue_changed.emit()
+
+    def _dispatch(self):
+        while self._queue and len(self._running) < self.max_concurrency:
+            now = monotonic()
+            if self._last_spawn is not None:
+                remaining = self.stagger - (now - self._last_spawn)
+                if remaining > 0:
+                    self._timer.start(int(remaining * 1000))
+                    return
+
+            entry = self._queue.popleft()
+            entry.status = LaunchStatus.Starting
+            entry.started_at = now
+            entry.launch_id = self._process_manager.start(entry.account)
+            self._running[entry.launch_id] = entry
+            self._last_spawn = now
+            logger.debug(
+                f"Launching {entry.account.displayname} after waiting "
+                f"{entry.queue_wait:.2f}s in queue"
+            )
+            self.entry_started.emit(entry)
+            self.queue_changed.emit()
+
+    def _finish(self, entry: LaunchEntry, status: LaunchStatus):
+        entry.status = status
+        entry.finished_at = monotonic()
+        if status != LaunchStatus.Cancelled:
+            logger.info(
+                f"Launch of {entry.account.displayname} {status.name.lower()} - "
+                f"queue wait: {entry.queue_wait:.2f}s, "
+                f"launch: {entry.launch_latency:.2f}s"
+            )
+        self.entry_finished.emit(entry)
+
+    def _on_process_finished(
+        self, launch_id: int, logged_in: bool, account: Account | None, pid: int
+    ):
+        entry = self._running.pop(launch_id, None)
+        if entry is None:
+            return
+
+        entry.pid = pid
+        self._finish(entry, LaunchStatus.Started)
+        self.queue_changed.emit()
+        self._dispatch()
+
+    def _on_process_error(self, launch_id: int, account: Account | None, msg: str):
+        entry = self._running.pop(launch_id, None)
+        if entry is None:
+            return
+
+        entry.error = msg
+        self._finish(entry, LaunchStatus.Failed)
+        self.queue_changed.emit()
+        self._dispatch()
@@ -8,23 +8,35 @@ from PySide6.QtCore import QObject
 from PySide6.QtNetwork import QNetworkAccessManager
 
 from d2rloader.constants import CONFIG_BASE_DIR
+from d2rloader.core.config_watcher import ConfigWatcher
 from d2rloader.core.game_settings import GameSettingsService
 from d2rloader.core.plugins.loader import register_plugins
 from d2rloader.core.process import ProcessManager
+from d2rloader.core.sampler import ResourceSampler
+from d2rloader.core.scheduler import LaunchScheduler
 from d2rloader.core.storage import StorageService
 from d2rloader.core.store.accounts import AccountService
+from d2rloader.core.store.instances import InstanceService
 from d2rloader.core.store.settings import SettingService
 
+if sys.platform == "linux":
+    from d2rloader.core.platform_linux.prefix_queue import PrefixInitQueue
+
 
 class D2RLoaderState:
     process_manager: ProcessManager | None = None
+    launch_scheduler: LaunchScheduler | None = None
+    resource_sampler: ResourceSampler | None = None
     network_manager: QNetworkAccessManager | None = None
+    config_watcher: ConfigWatcher | None = None
+    prefix_init_queue: "PrefixInitQueue | None" = None
 
     def __init__(self):
         self.storage: StorageService = StorageService()
         self.settings: SettingService = SettingService(self.storage)
         self._setup_logger()
         self.accounts: AccountService = AccountService(self.storage, self.settings)
+        self.instances: InstanceService = InstanceService(self.storage)
         self.game_settings: GameSettingsService = GameSettingsService(
             self.settings.data
         )
@@ -36,10 +48,20 @@ class D2RLoaderState:
 
     def register_process_manager(self, parent: QObject):
         self.process_manager = ProcessManager(parent, self)
+        self.launch_scheduler = LaunchScheduler(self.process_manager, self.settings)
+        self.resource_sampler = ResourceSampler(self.process_manager, self.settings)
+        self.resource_sampler.start()
+        if sys.platform == "linux":
+            self.prefix_init_queue = PrefixInitQueue(
+                parent, self.process_manager.umu_manager, self.settings
+            )
 
     def register_network_manager(self, parent: QObject):
         self.network_manager = QNetworkAccessManager(parent)
 
+    def register_config_watcher(self, parent: QObject):
+        self.config_watcher = ConfigWatcher(parent, self)
+
     def register_plugin_manager(self):
         pm = register_plugins(self.settings.data.plugins_path)
         return pm
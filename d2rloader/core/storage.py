@@ -1,12 +1,25 @@
+import atexit
 import enum
+import functools
+import hashlib
+import json
 import os
 import pathlib
+import stat
+import sys
+import tempfile
+import threading
+import typing
+from time import monotonic, time_ns
 from typing import Any
 
-from pydantic import TypeAdapter
+from loguru import logger
+from pydantic import BaseModel, TypeAdapter
 
 from d2rloader.constants import CONFIG_BASE_DIR
+from d2rloader.core.storage_sqlite import AccountDatabase, is_database
 from d2rloader.models.account import Account
+from d2rloader.models.instance import Instance
 from d2rloader.models.setting import Setting
 
 
@@ -14,36 +27,177 @@ class StorageType(enum.Enum):
     Account = enum.auto()
     Setting = enum.auto()
     Plugin = enum.auto()
+    Instance = enum.auto()
+
+
+# saves within this many seconds are coalesced into one write
+WRITE_DELAY = 0.5
+# number of parsed files kept by StorageService.load
+PARSE_CACHE_SIZE = 8
+# files modified this shortly before they were read are always hashed again as
+# their mtime might not change if they get modified again (racy timestamps)
+RACY_INTERVAL_NS = 2_000_000_000
+
+
+class _PendingWrite:
+    def __init__(
+        self,
+        content: Any = None,
+        type: StorageType | None = None,
+        adapter: TypeAdapter[Any] | None = None,
+        replace: bool = True,
+        rotate: bool = False,
+    ) -> None:
+        self.content: Any = content
+        self.type: StorageType | None = type
+        self.adapter: TypeAdapter[Any] | None = adapter
+        # False if only lines are appended to the existing file
+        self.replace: bool = replace
+        # keep the previous file as <name>.1
+        self.rotate: bool = rotate
+        self.lines: list[bytes] = []
+        self.due: float = monotonic() + WRITE_DELAY
+
+
+class _ParsedFile:
+    def __init__(
+        self,
+        stat: os.stat_result,
+        sha256: str,
+        adapter: TypeAdapter[Any],
+        value: Any,
+    ) -> None:
+        self.mtime_ns: int = stat.st_mtime_ns
+        self.size: int = stat.st_size
+        self.sha256: str = sha256
+        self.adapter: TypeAdapter[Any] = adapter
+        # the validated content, only copies of it are handed out
+        self.value: Any = value
+        self.read_ns: int = time_ns()
+
+    def is_unchanged(self, stat: os.stat_result) -> bool:
+        return (
+            stat.st_mtime_ns == self.mtime_ns
+            and stat.st_size == self.size
+            and self.read_ns - self.mtime_ns > RACY_INTERVAL_NS
+        )
 
 
 class StorageService:
+    """Loads and saves the json files of the loader.
+
+    Saves are written behind: the content is marked as dirty and written by a
+    background thread once no other save for the same file happened for
+    ``WRITE_DELAY`` seconds. Pending writes are flushed before the file is
+    loaded again and at exit. Files are replaced atomically so that a crash in
+    the middle of a write never leaves a truncated file behind.
+
+    Loaded files are kept in a parse cache keyed by their path, mtime, size and
+    sha256, so loading an unchanged file again returns copies of the already
+    validated models (see :meth:`invalidate`). Saved models are put into the
+    cache as well, so loading a file after saving it doesn't parse it again.
+
+    Accounts paths ending in ``.db``, ``.sqlite`` or ``.sqlite3`` are stored in
+    an SQLite database instead (see :meth:`database`).
+    """
+
     SETTINGS_PATH: pathlib.Path = pathlib.Path(CONFIG_BASE_DIR, "settings.json")
+    INSTANCES_PATH: pathlib.Path = pathlib.Path(CONFIG_BASE_DIR, "instances.json")
     DEFAULT_STORAGE_ADAPTER: dict[
-        StorageType, TypeAdapter[None | list[Account]] | TypeAdapter[Setting]
+        StorageType,
+        TypeAdapter[None | list[Account]]
+        | TypeAdapter[Setting]
+        | TypeAdapter[dict[str, Instance]],
     ] = {
         StorageType.Account: TypeAdapter(list[Account]),
         StorageType.Setting: TypeAdapter(Setting),
+        StorageType.Instance: TypeAdapter(dict[str, Instance]),
     }
 
+    def __init__(self) -> None:
+        self._pending: dict[pathlib.Path, _PendingWrite] = {}
+        self._condition: threading.Condition = threading.Condition()
+        # serializes the actual writes of the writer thread and flush()
+        self._write_lock: threading.Lock = threading.Lock()
+        self._writer: threading.Thread | None = None
+        self._databases: dict[str, AccountDatabase] = {}
+        self._parsed: dict[pathlib.Path, _ParsedFile] = {}
+        # the writer thread puts the saved files into the parse cache
+        self._parsed_lock: threading.Lock = threading.Lock()
+        # sha256 of the content last loaded from or written to the files
+        self._digests: dict[pathlib.Path, str] = {}
+        atexit.register(self.flush)
+
+    def database(self, path: str | None) -> AccountDatabase | None:
+        """Returns the database if the accounts path is an SQLite database"""
+        if not is_database(path):
+            return None
+        assert path is not None
+        key = os.path.abspath(path)
+        if key not in self._databases:
+            logger.debug(f"Opening accounts database {key}")
+            self._databases[key] = AccountDatabase(key)
+        return self._databases[key]
+
     def load(
         self,
         type: StorageType,
         adapter: TypeAdapter[Any] | None = None,
         path: str | None = None,
     ):
+        database = self.database(path) if type == StorageType.Account else None
+        if database is not None:
+            return database.load()
+
         settings = self._get_path(type, path)
+        self.flush(settings)
+        if adapter is None:
+            adapter = self.DEFAULT_STORAGE_ADAPTER[type]
+
         try:
-            content = settings.read_text("UTF8")
+            stat = settings.stat()
+            cached = self._get_parsed(settings)
+            if cached is not None and cached.adapter is not adapter:
+                cached = None
+            if cached is not None and cached.is_unchanged(stat):
+                return copy_parsed(cached.value)
+            content = settings.read_bytes()
         except FileNotFoundError:
+            self.invalidate(settings)
+            self._digests.pop(settings, None)
             return None
 
         if not content:
             return None
 
-        if adapter is not None:
-            return adapter.validate_json(content)
+        sha256 = self._digests[settings] = hashlib.sha256(content).hexdigest()
+        if cached is not None and cached.sha256 == sha256:
+            logger.trace(f"{settings} is unchanged - using the parsed content")
+            value = cached.value
+        else:
+            value = adapter.validate_json(content)
+        self._remember(settings, _ParsedFile(stat, sha256, adapter, value))
+        return copy_parsed(value)
+
+    def _get_parsed(self, path: pathlib.Path) -> _ParsedFile | None:
+        with self._parsed_lock:
+            return self._parsed.get(path)
+
+    def _remember(self, path: pathlib.Path, parsed: _ParsedFile):
+        # the most recently loaded files are kept
+        with self._parsed_lock:
+            self._parsed.pop(path, None)
+            self._parsed[path] = parsed
+            while len(self._parsed) > PARSE_CACHE_SIZE:
+                del self._parsed[next(iter(self._parsed))]
 
-        return self.DEFAULT_STORAGE_ADAPTER[type].validate_json(content)
+    def invalidate(self, path: str | os.PathLike[str] | None = None):
+        """Drops the parsed content of the file (or of all files) from the cache"""
+        with self._parsed_lock:
+            if path is None:
+                self._parsed.clear()
+            else:
+                self._parsed.pop(pathlib.Path(path), None)
 
     def save(
         self,
@@ -51,17 +205,209 @@ class StorageService:
         type: StorageType,
         adapter: TypeAdapter[Any] | None = None,
         path: str | None = None,
+        sync: bool = False,
     ):
+        database = self.database(path) if type == StorageType.Account else None
+        if database is not None:
+            database.replace(content or [])
+            return
+
         settings = self._get_path(type, path)
-        os.makedirs(os.path.dirname(settings), exist_ok=True)
-        with open(settings, "wb") as fp:
-            fp.write(self.get_storage_content_json(content, type, adapter))
+        # the caller keeps changing the models - the snapshot is written and
+        # put into the parse cache
+        content = copy_parsed(content)
+        with self._condition:
+            # re-insert to keep the pending writes in the order of their last save
+            self._pending.pop(settings, None)
+            self._pending[settings] = _PendingWrite(content, type, adapter)
+            self._start_writer()
+            self._condition.notify()
+
+        if sync:
+            self.flush(settings)
+
+    def append(self, path: str, *records: dict[str, Any]) -> int:
+        """Appends the records as json lines and returns the number of bytes.
+
+        The records are written at once.
+        """
+        journal = pathlib.Path(path)
+        lines = [
+            json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+            for record in records
+        ]
+        with self._condition:
+            write = self._pending.get(journal)
+            if write is None:
+                write = self._pending[journal] = _PendingWrite(replace=False)
+            write.lines.extend(lines)
+            self._start_writer()
+            self._condition.notify()
+        return sum(len(line) for line in lines)
+
+    def truncate(self, path: str, rotate: bool = False):
+        """Empties the file once all saves queued before are written"""
+        with self._condition:
+            self._pending.pop(pathlib.Path(path), None)
+            self._pending[pathlib.Path(path)] = _PendingWrite(b"", rotate=rotate)
+            self._start_writer()
+            self._condition.notify()
+
+    def load_lines(self, path: str) -> list[dict[str, Any]]:
+        """Loads a json lines file - incomplete or invalid lines are skipped"""
+        journal = pathlib.Path(path)
+        self.flush(journal)
+        try:
+            content = journal.read_bytes()
+        except FileNotFoundError:
+            return []
+
+        records: list[dict[str, Any]] = []
+        for number, line in enumerate(content.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping invalid line {number} in {journal}")
+        return records
+
+    def digest(self, path: str) -> str | None:
+        """Returns the sha256 of the file once the pending saves are written"""
+        file = pathlib.Path(path)
+        self.flush(file)
+        return self._disk_digest(file)
+
+    def _disk_digest(self, file: pathlib.Path) -> str | None:
+        try:
+            cached = self._get_parsed(file)
+            if cached is not None and cached.is_unchanged(file.stat()):
+                return cached.sha256
+            return hashlib.sha256(file.read_bytes()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def changed_externally(self, path: str | os.PathLike[str]) -> bool:
+        """True if the file differs from what was last loaded or saved by us.
+
+        The file on disk is compared without writing the pending saves first.
+        A pending save of a file which got changed externally is a conflict -
+        it's discarded so that the external change isn't overwritten.
+        """
+        file = pathlib.Path(path)
+        # the writer thread must not replace the file while it's compared
+        with self._write_lock:
+            if self._disk_digest(file) == self._digests.get(file):
+                return False
+            with self._condition:
+                write = self._pending.get(file)
+                if write is not None and write.replace:
+                    del self._pending[file]
+                    logger.warning(
+                        f"{file} was changed externally - discarding the pending save"
+                    )
+        return True
+
+    def flush(self, path: pathlib.Path | None = None):
+        """Writes the pending saves immediately.
+
+        If ``path`` is given, only the saves queued up to the one of ``path`` are
+        written - saves are always written in the order they were queued.
+        """
+        with self._write_lock:
+            with self._condition:
+                paths = list(self._pending.keys())
+                if path is not None:
+                    paths = paths[: paths.index(path) + 1] if path in paths else []
+                pending = [(p, self._pending.pop(p)) for p in paths]
+
+            for settings, write in pending:
+                self._write(settings, write)
+
+    def _start_writer(self):
+        if self._writer is not None:
+            return
+        self._writer = threading.Thread(
+            target=self._run_writer, name="storage-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _run_writer(self):
+        while True:
+            with self._condition:
+                while not self._has_due_writes():
+                    timeout = None
+                    if self._pending:
+                        timeout = min(w.due for w in self._pending.values())
+                        timeout = max(0.0, timeout - monotonic())
+                    self._condition.wait(timeout)
+
+            # everything queued before a due save is written along with it
+            with self._write_lock:
+                with self._condition:
+                    now = monotonic()
+                    paths = list(self._pending.keys())
+                    last_due = max(
+                        (i for i, p in enumerate(paths) if self._pending[p].due <= now),
+                        default=-1,
+                    )
+                    # flush() might have written them in the meantime
+                    due = [(p, self._pending.pop(p)) for p in paths[: last_due + 1]]
+
+                for settings, write in due:
+                    self._write(settings, write)
+
+    def _has_due_writes(self):
+        now = monotonic()
+        return any(w.due <= now for w in self._pending.values())
+
+    def _write(self, settings: pathlib.Path, write: _PendingWrite):
+        self.invalidate(settings)
+        sha256: str | None = None
+        try:
+            if write.rotate and settings.exists():
+                os.replace(settings, f"{settings}.1")
+
+            if not write.replace:
+                append_lines(settings, write.lines)
+            else:
+                if isinstance(write.content, bytes):
+                    content = write.content
+                else:
+                    content = self.get_storage_content_json(
+                        write.content, write.type, write.adapter
+                    )
+                content += b"".join(write.lines)
+                # known before the file is replaced so that watchers can tell
+                # our own writes apart
+                sha256 = self._digests[settings] = hashlib.sha256(content).hexdigest()
+                atomic_write(settings, content)
+            logger.trace(f"Saved {settings}")
+        except Exception as e:
+            logger.error(f"Couldn't save {settings}: {e}")
+            return
+
+        if (
+            sha256 is not None
+            and write.type is not None
+            and not isinstance(write.content, bytes)
+            and not write.lines
+        ):
+            # the snapshot taken by save() is what loading the file would return
+            adapter = write.adapter or self.DEFAULT_STORAGE_ADAPTER[write.type]
+            try:
+                stat = settings.stat()
+            except OSError:
+                return
+            self._remember(settings, _ParsedFile(stat, sha256, adapter, write.content))
 
     def _get_path(self, type: StorageType, path: str | None = None):
         if path is not None or type == StorageType.Plugin and path is not None:
             settings = pathlib.Path(path)
         elif type == StorageType.Setting:
             settings = self.SETTINGS_PATH
+        elif type == StorageType.Instance:
+            settings = self.INSTANCES_PATH
         else:
             raise NotImplementedError(
                 f"StorageType {type} is not implemented in path finding"
@@ -69,11 +415,95 @@ class StorageService:
         return settings
 
     def get_storage_content_json(
-        self, content: Any, type: StorageType, adapter: TypeAdapter[Any] | None = None
+        self,
+        content: Any,
+        type: StorageType | None,
+        adapter: TypeAdapter[Any] | None = None,
     ):
         if type == StorageType.Plugin and adapter is not None:
             return adapter.dump_json(content, indent=4)
         elif type == StorageType.Plugin and adapter is None:
             raise ValueError("No adapter provided")
 
+        if type is None:
+            raise ValueError("No storage type provided")
+
         return self.DEFAULT_STORAGE_ADAPTER[type].dump_json(content, indent=4)
+
+
+def copy_parsed(value: Any) -> Any:
+    """Copies the models and containers of a parsed file.
+
+    The leaves (strings, numbers, enums, ...) are immutable and shared, which
+    makes this a lot faster than ``copy.deepcopy``.
+    """
+    if isinstance(value, BaseModel):
+        copied = value.__copy__()
+        for key in _container_fields(type(value)):
+            if key in value.__dict__:
+                copied.__dict__[key] = copy_parsed(value.__dict__[key])
+        return copied
+    if isinstance(value, list):
+        return [copy_parsed(item) for item in value]  # pyright: ignore[reportUnknownVariableType]
+    if isinstance(value, dict):
+        return {key: copy_parsed(item) for key, item in value.items()}  # pyright: ignore[reportUnknownVariableType]
+    if isinstance(value, set):
+        return set(value)  # pyright: ignore[reportUnknownArgumentType]
+    return value
+
+
+@functools.cache
+def _container_fields(model: type[BaseModel]) -> tuple[str, ...]:
+    """Returns the fields of the model which might hold mutable values"""
+    return tuple(
+        name
+        for name, info in model.model_fields.items()
+        if _is_container(info.annotation)
+    )
+
+
+def _is_container(annotation: Any) -> bool:
+    origin = typing.get_origin(annotation)
+    if origin is None:
+        return isinstance(annotation, type) and issubclass(
+            annotation, (BaseModel, list, dict, set)
+        )
+    if origin in (list, dict, set):
+        return True
+    return any(_is_container(arg) for arg in typing.get_args(annotation))
+
+
+def append_lines(path: pathlib.Path, lines: list[bytes]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as fp:
+        fp.write(b"".join(lines))
+        fp.flush()
+        os.fsync(fp.fileno())
+
+
+def atomic_write(path: pathlib.Path, content: bytes):
+    """Writes the content to a temporary file and renames it to ``path``"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        if path.exists():
+            os.chmod(tmp_path, stat.S_IMODE(path.stat().st_mode))
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(content)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    if sys.platform != "win32":
+        # persist the rename itself
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
@@ -0,0 +1,191 @@
+import contextlib
+import enum
+import os
+import sqlite3
+import threading
+from collections.abc import Iterable
+from typing import Any
+
+from loguru import logger
+from pydantic.fields import FieldInfo
+
+from d2rloader.models.account import Account
+
+DATABASE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+
+def is_database(path: str | os.PathLike[str] | None) -> bool:
+    return path is not None and os.fspath(path).lower().endswith(DATABASE_EXTENSIONS)
+
+
+class AccountDatabase:
+    """SQLite backend for the accounts.
+
+    Every account field is stored in its own column so that single fields can
+    be updated without rewriting the other accounts. The list order of the
+    accounts is kept in ``position``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock: threading.RLock = threading.RLock()
+        # depth of the nested transactions - only the outermost one commits
+        self._transactions: int = 0
+        self._connection: sqlite3.Connection = sqlite3.connect(
+            path, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self.fields: list[str] = list(Account.model_fields.keys())
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS accounts ("
+                "position INTEGER NOT NULL, "
+                "account_id TEXT NOT NULL, "
+                "profile_normalized TEXT NOT NULL)"
+            )
+            existing = {
+                row[1]
+                for row in self._connection.execute("PRAGMA table_info(accounts)")
+            }
+            # new model fields are added as columns
+            for field in self.fields:
+                if field not in existing:
+                    self._connection.execute(
+                        f'ALTER TABLE accounts ADD COLUMN "{field}"'
+                    )
+
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS accounts_position ON accounts(position)"
+            )
+            # the names and uids are looked up in the in-memory indexes of the
+            # AccountService - all queries are keyed by position
+            self._connection.execute("DROP INDEX IF EXISTS accounts_profile_normalized")
+            self._connection.execute("DROP INDEX IF EXISTS accounts_region")
+
+    def load(self) -> list[Account]:
+        """Loads all accounts without running the pydantic validation"""
+        columns = ", ".join(f'"{field}"' for field in self.fields)
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT position, {columns} FROM accounts ORDER BY position"
+            ).fetchall()
+
+        accounts = [self._to_account(row[1:]) for row in rows]
+        missing = [
+            (account.uid, row[0])
+            for account, row in zip(accounts, rows)
+            if row[1 + self.fields.index("uid")] is None
+        ]
+        if missing:
+            # rows written before the uid existed - keep the generated ones
+            with self._lock, self._connection:
+                self._connection.executemany(
+                    'UPDATE accounts SET "uid" = ? WHERE position = ?', missing
+                )
+        return accounts
+
+    def insert(self, position: int, account: Account):
+        values = self._to_row(account)
+        columns = ", ".join(f'"{column}"' for column in values)
+        placeholders = ", ".join("?" for _ in values)
+        with self.transaction():
+            self._connection.execute(
+                f"INSERT INTO accounts (position, {columns}) VALUES (?, {placeholders})",
+                (position, *values.values()),
+            )
+
+    def update(
+        self, position: int, account: Account, fields: Iterable[str] | None = None
+    ):
+        """Updates the given fields (or all of them) of the account at position"""
+        values = self._to_row(account, fields)
+        assignments = ", ".join(f'"{column}" = ?' for column in values)
+        with self.transaction():
+            cursor = self._connection.execute(
+                f"UPDATE accounts SET {assignments} WHERE position = ?",
+                (*values.values(), position),
+            )
+        if cursor.rowcount == 0:
+            logger.warning(f"No account at position {position} - inserting it")
+            self.insert(position, account)
+
+    def delete(self, position: int):
+        with self.transaction():
+            self._connection.execute(
+                "DELETE FROM accounts WHERE position = ?", (position,)
+            )
+            self._connection.execute(
+                "UPDATE accounts SET position = position - 1 WHERE position > ?",
+                (position,),
+            )
+
+    def replace(self, accounts: list[Account]):
+        rows = [self._to_row(account) for account in accounts]
+        with self.transaction():
+            self._connection.execute("DELETE FROM accounts")
+            if not rows:
+                return
+            columns = ", ".join(f'"{column}"' for column in rows[0])
+            placeholders = ", ".join("?" for _ in rows[0])
+            self._connection.executemany(
+                f"INSERT INTO accounts (position, {columns}) VALUES (?, {placeholders})",
+                [(position, *row.values()) for position, row in enumerate(rows)],
+            )
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Commits the writes made within at once, nested transactions join
+        the outer one"""
+        with self._lock:
+            self._transactions += 1
+            try:
+                if self._transactions > 1:
+                    yield
+                else:
+                    with self._connection:
+                        yield
+            finally:
+                self._transactions -= 1
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _to_row(
+        self, account: Account, fields: Iterable[str] | None = None
+    ) -> dict[str, Any]:
+        data = account.model_dump(
+            mode="json", include=set(fields) if fields is not None else None
+        )
+        row: dict[str, Any] = {
+            "account_id": account.id,
+            "profile_normalized": account.profile_normalized,
+        }
+        row.update(data)
+        return row
+
+    def _to_account(self, row: tuple[Any, ...]) -> Account:
+        values: dict[str, Any] = {}
+        for field, value in zip(self.fields, row):
+            if value is None and field in _DEFAULTS:
+                # column added after the row was written - use the model default
+                value = _DEFAULTS[field].get_default(call_default_factory=True)
+            annotation = Account.model_fields[field].annotation
+            if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+                value = annotation(value)
+            values[field] = value
+        return Account.model_construct(**values)
+
+
+_DEFAULTS: dict[str, FieldInfo] = {
+    field: info
+    for field, info in Account.model_fields.items()
+    if info.default_factory is not None
+    or not info.is_required()
+    and info.default is not None
+}
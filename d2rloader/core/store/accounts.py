@@ -1,19 +1,71 @@
-from typing import Any, cast
+import contextlib
+import hashlib
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, NamedTuple, cast
+
+from loguru import logger
+from pydantic import ValidationError
 
 from d2rloader.core.storage import StorageService, StorageType
+from d2rloader.core.store.search import AccountSearchIndex
 from d2rloader.core.store.settings import SettingService
-from d2rloader.models.account import Account
+from d2rloader.models.account import Account, new_uid
 from d2rloader.models.setting import get_default_accounts_path
 
+# the snapshot is rewritten once the journal grows larger than this
+JOURNAL_COMPACT_SIZE = 256 * 1024
+
+_suffix_re = re.compile(r"\d*$")
+
+
+class AccountChange(NamedTuple):
+    """A change of the account list - applied in order they keep the indexes"""
+
+    op: str  # "insert", "update" or "remove"
+    index: int
+    account: Account | None = None
+
+
+class _Commit(NamedTuple):
+    op: str  # "add", "update" or "delete"
+    account: Account
+    fields: dict[str, Any] | None
+    index: int | None
+
 
 class AccountService:
     _current_accounts: list[Account] | None = []
+    _journal_size: int = 0
+    # commits of the current batch, None outside of a batch
+    _batched: list[_Commit] | None = None
 
     def __init__(self, storage: StorageService, setting: SettingService):
         self._storage: StorageService = storage
         self._setting: SettingService = setting
+        # uid -> index and the number of accounts per profile name, both kept up
+        # to date by add/update/delete
+        self._uid_index: dict[str, int] = {}
+        self._names: Counter[str | None] = Counter()
+        # uid -> profile name as it was indexed - the account dialog renames the
+        # account in place
+        self._indexed_names: dict[str, str | None] = {}
+        # next free suffix per generated name
+        self._name_suffixes: dict[str, int] = {}
+        # words of the accounts for the search box
+        self.search_index: AccountSearchIndex = AccountSearchIndex()
         self.load()
 
+    @property
+    def journal_path(self):
+        return f"{self._setting.data.accounts_path}.journal"
+
+    @property
+    def _database(self):
+        return self._storage.database(self._setting.data.accounts_path)
+
     @property
     def data(self) -> list[Account]:
         return self._current_accounts or []
@@ -22,11 +74,16 @@ class AccountService:
         # Unpack[T] not possible - see: https://github.com/python/typing/issues/1399
         item = self.data[index]
 
+        changed: list[str] = []
         for key, value in fields.items():
             if key in item.model_fields.keys():
                 setattr(item, key, value)
+                changed.append(key)
 
-        self.add(item, index)
+        self.add(item, index, commit=False)
+        self._commit(
+            "update", item, item.model_dump(mode="json", include=set(changed)), index
+        )
 
     def get(self, index: int):
         try:
@@ -34,10 +91,41 @@ class AccountService:
         except IndexError:
             return None
 
+    def index_of(self, uid: str):
+        """Returns the index of the account with the uid (or the legacy id)"""
+        idx = self._uid_index.get(uid)
+        if idx is not None:
+            return idx
+        # launch groups saved before the accounts had a uid
+        for idx, account in enumerate(self.data):
+            if account.id == uid:
+                return idx
+        return None
+
+    def get_group(self, name: str):
+        """Returns the indexes of the accounts in the saved launch group"""
+        indexes: list[int] = []
+        for uid in self._setting.data.launch_groups.get(name, []):
+            idx = self.index_of(uid)
+            if idx is not None:
+                indexes.append(idx)
+        return indexes
+
+    def save_group(self, name: str, indexes: list[int]):
+        groups = dict(self._setting.data.launch_groups)
+        groups[name] = [self.data[idx].uid for idx in indexes]
+        self._setting.set(launch_groups=groups)
+
+    def delete_group(self, name: str):
+        groups = dict(self._setting.data.launch_groups)
+        groups.pop(name, None)
+        self._setting.set(launch_groups=groups)
+
     def clone(self, index: int):
         try:
             account = self.data[index]
             cloned = account.model_copy(deep=True)
+            cloned.uid = new_uid()
             cloned.profile_name = self._generate_name(cloned.profile_name)
             return self.add(cloned)
         except IndexError:
@@ -51,27 +139,66 @@ class AccountService:
             self._current_accounts = []
 
         if index is not None:
+            previous = self._current_accounts[index]
+            # an edited account keeps its identity
+            item.uid = previous.uid
+            self._unindex(previous)
             self._current_accounts[index] = item
+            op, fields = "update", _changed_fields(previous, item)
         else:
+            if item.uid in self._uid_index:
+                item.uid = new_uid()
             self._current_accounts.append(item)
             index = len(self._current_accounts) - 1
+            op, fields = "add", item.model_dump(mode="json")
 
+        self._index(index, item)
         if commit:
-            self._storage.save(
-                self._current_accounts,
-                StorageType.Account,
-                path=self._setting.data.accounts_path,
-            )
+            self._commit(op, item, fields, index)
         return index
 
     def delete(self, index: int):
         # Unpack[T] not possible - see: https://github.com/python/typing/issues/1399
-        self.data.pop(index)
-        self._storage.save(
-            self._current_accounts,
-            StorageType.Account,
-            path=self._setting.data.accounts_path,
-        )
+        account = self.data.pop(index)
+        self._unindex(account)
+        for item in self.data[index:]:
+            self._uid_index[item.uid] -= 1
+        self._commit("delete", account, index=index)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Applies the changes made within in memory and saves them at once.
+
+        Nested batches are saved by the outermost one.
+        """
+        if self._batched is not None:
+            yield self
+            return
+
+        self._batched = []
+        try:
+            yield self
+        finally:
+            commits, self._batched = self._batched, None
+            if commits:
+                self._persist(commits)
+
+    def replace(self, accounts: list[Account]):
+        """Replaces all accounts, e.g. with the ones of an imported file"""
+        self._current_accounts = list(accounts)
+        self._reindex()
+        self.compact()
+
+    def reload(self) -> list[AccountChange]:
+        """Loads the accounts again and returns the changes to the current ones.
+
+        Unchanged accounts keep their current instance.
+        """
+        previous = self.data
+        self.load()
+        changes, self._current_accounts = diff_accounts(previous, self.data)
+        self._reindex()
+        return changes
 
     def load(self):
         if not self._setting.data.accounts_path:
@@ -84,23 +211,283 @@ class AccountService:
             ),
         )
 
+        if self._database is not None:
+            # the database is updated in place and needs no journal
+            self._reindex()
+            return
+
+        # a journal is replayed even if the journal mode got disabled since
+        records = self._storage.load_lines(self.journal_path)
+        self._journal_size = _file_size(self.journal_path)
+        if not records:
+            if self._reindex():
+                self.compact()
+            return
+
+        header, *records = records
+        snapshot = self._storage.digest(self._setting.data.accounts_path)
+        if header.get("op") != "snapshot" or header.get("sha256") != snapshot:
+            # crashed after writing the snapshot but before starting a new journal
+            # or the accounts file got replaced - the journal doesn't apply to it
+            logger.warning("Accounts journal doesn't match the accounts file")
+            self._storage.truncate(self.journal_path, rotate=True)
+            self._journal_size = 0
+            if self._reindex():
+                self.compact()
+            return
+
+        logger.debug(f"Replaying {len(records)} journal record(s)")
+        self._current_accounts = replay_journal(self.data, records)
+        if (
+            self._reindex()
+            or not self._setting.data.accounts_journal
+            or self._journal_size > JOURNAL_COMPACT_SIZE
+        ):
+            self.compact()
+
+    def compact(self):
+        """Rewrites the snapshot and starts a new journal.
+
+        The previous journal is kept as ``<journal>.1``.
+        """
+        if self._database is not None:
+            self._database.replace(self.data)
+            return
+
+        if not self._setting.data.accounts_journal:
+            self._storage.save(
+                self._current_accounts,
+                StorageType.Account,
+                path=self._setting.data.accounts_path,
+            )
+            if self._journal_size > 0:
+                self._storage.truncate(self.journal_path, rotate=True)
+                self._journal_size = 0
+            return
+
+        content = self._storage.get_storage_content_json(
+            self._current_accounts, StorageType.Account
+        )
+        self._storage.save(
+            content, StorageType.Account, path=self._setting.data.accounts_path
+        )
+        self._storage.truncate(self.journal_path, rotate=True)
+        self._journal_size = self._append_header(hashlib.sha256(content).hexdigest())
+
+    def _commit(
+        self,
+        op: str,
+        account: Account,
+        fields: dict[str, Any] | None = None,
+        index: int | None = None,
+    ):
+        commit = _Commit(op, account, fields, index)
+        if self._batched is not None:
+            self._batched.append(commit)
+        else:
+            self._persist([commit])
+
+    def _persist(self, commits: list[_Commit]):
+        database = self._database
+        if database is not None:
+            # only the changed rows are written
+            with database.transaction():
+                for op, account, fields, index in commits:
+                    if index is None:
+                        continue
+                    if op == "add":
+                        database.insert(index, account)
+                    elif op == "update" and fields:
+                        database.update(index, account, fields.keys())
+                    elif op == "delete":
+                        database.delete(index)
+            return
+
+        if not self._setting.data.accounts_journal:
+            self.compact()
+            return
+
+        ts = datetime.now().isoformat(timespec="seconds")
+        records: list[dict[str, Any]] = []
+        for op, account, fields, _ in commits:
+            if op == "update" and not fields:
+                continue
+            record: dict[str, Any] = {"ts": ts, "op": op, "uid": account.uid}
+            if fields:
+                record["fields"] = fields
+            records.append(record)
+        if not records:
+            return
+
+        if self._journal_size == 0:
+            self._journal_size = self._append_header(
+                self._storage.digest(self._setting.data.accounts_path)
+            )
+        self._journal_size += self._storage.append(self.journal_path, *records)
+
+        if self._journal_size > JOURNAL_COMPACT_SIZE:
+            logger.debug("Compacting the accounts journal")
+            self.compact()
+
+    def _append_header(self, snapshot: str | None):
+        # the journal only applies to the snapshot with this digest
+        return self._storage.append(
+            self.journal_path,
+            {
+                "ts": datetime.now().isoformat(timespec="seconds"),
+                "op": "snapshot",
+                "sha256": snapshot,
+            },
+        )
+
     def _generate_name(self, name: str | None):
-        name_suffix: str = "1"
         if name is None:
             name = "Generated Profile"
-        elif name[-1].isdigit():
-            name_suffix = str(int(name[-1]) + 1)
-            name = name[:-1]
-        name = f"{name}{name_suffix}"
+        match = _suffix_re.search(name)
+        assert match is not None
+        base = name[: match.start()]
+        suffix = int(match.group()) + 1 if match.group() else 1
+        suffix = max(suffix, self._name_suffixes.get(base, 0))
 
-        while self.validate_name(name) > 0:
-            name = self._generate_name(name)
+        while self.validate_name(f"{base}{suffix}") > 0:
+            suffix += 1
 
-        return name
+        self._name_suffixes[base] = suffix + 1
+        return f"{base}{suffix}"
 
     def validate_name(self, name: str):
-        found_names = 0
-        for account in self._current_accounts or []:
-            if account.profile_name == name:
-                found_names += 1
-        return found_names
+        """Returns the number of accounts with the profile name"""
+        return self._names[name]
+
+    def _index(self, index: int, account: Account):
+        self._uid_index[account.uid] = index
+        self._names[account.profile_name] += 1
+        self._indexed_names[account.uid] = account.profile_name
+        self.search_index.add(account)
+
+    def _unindex(self, account: Account):
+        self._uid_index.pop(account.uid, None)
+        self.search_index.remove(account.uid)
+        name = self._indexed_names.pop(account.uid, account.profile_name)
+        self._names[name] -= 1
+        if self._names[name] <= 0:
+            del self._names[name]
+
+    def _reindex(self):
+        """Rebuilds the indexes and returns True if any uid had to be assigned"""
+        self._uid_index.clear()
+        self._names.clear()
+        self._indexed_names.clear()
+        self._name_suffixes.clear()
+        self.search_index.clear()
+
+        changed = False
+        for index, account in enumerate(self.data):
+            if "uid" not in account.model_fields_set or account.uid in self._uid_index:
+                # saved before the accounts had a uid or a duplicated entry
+                account.uid = new_uid()
+                changed = True
+            self._index(index, account)
+        return changed
+
+
+def replay_journal(
+    accounts: list[Account], records: list[dict[str, Any]]
+) -> list[Account]:
+    """Applies the journal records on top of the snapshot.
+
+    Records are matched by the account uid (or the id of the account for
+    records written before the uid existed) which makes replaying them on a
+    snapshot that already contains them a no-op.
+    """
+    accounts = list(accounts)
+    positions: dict[str, int] | None = None
+    for record in records:
+        op = record.get("op")
+        account_id = record.get("uid") or record.get("id")
+        fields: dict[str, Any] = record.get("fields") or {}
+        if "uid" in record:
+            if positions is None:
+                positions = {item.uid: idx for idx, item in enumerate(accounts)}
+            index = positions.get(account_id)
+        else:
+            index = next(
+                (idx for idx, item in enumerate(accounts) if item.id == account_id),
+                None,
+            )
+
+        try:
+            if op == "add":
+                account = Account.model_validate(fields)
+                if index is None:
+                    accounts.append(account)
+                    if positions is not None:
+                        positions[account.uid] = len(accounts) - 1
+                else:
+                    accounts[index] = account
+            elif op == "update" and index is not None:
+                accounts[index] = Account.model_validate(
+                    accounts[index].model_dump()
+                    | Account.model_validate(
+                        accounts[index].model_dump(mode="json") | fields
+                    ).model_dump(include=set(fields))
+                )
+            elif op == "delete" and index is not None:
+                accounts.pop(index)
+                positions = None
+        except ValidationError as e:
+            logger.warning(f"Skipping invalid journal record for {account_id}: {e}")
+    return accounts
+
+
+def diff_accounts(
+    previous: list[Account], current: list[Account]
+) -> tuple[list[AccountChange], list[Account]]:
+    """Diffs the account lists by uid.
+
+    Returns the changes which turn ``previous`` into ``current`` and the new list
+    which reuses the unchanged accounts of ``previous``.
+    """
+    current_uids = {account.uid for account in current}
+    changes: list[AccountChange] = []
+    accounts = list(previous)
+    for index in range(len(accounts) - 1, -1, -1):
+        if accounts[index].uid not in current_uids:
+            changes.append(AccountChange("remove", index))
+            del accounts[index]
+
+    remaining = {account.uid for account in accounts}
+    for index, account in enumerate(current):
+        if index < len(accounts) and accounts[index].uid == account.uid:
+            if accounts[index] != account:
+                changes.append(AccountChange("update", index, account))
+                accounts[index] = account
+            continue
+
+        if account.uid in remaining:
+            # moved - rare enough to be handled as remove and insert
+            position = next(
+                idx
+                for idx in range(index, len(accounts))
+                if accounts[idx].uid == account.uid
+            )
+            changes.append(AccountChange("remove", position))
+            if accounts[position] == account:
+                account = accounts[position]
+            del accounts[position]
+        changes.append(AccountChange("insert", index, account))
+        accounts.insert(index, account)
+    return changes, accounts
+
+
+def _changed_fields(previous: Account, current: Account) -> dict[str, Any]:
+    before = previous.model_dump(mode="json")
+    after = current.model_dump(mode="json")
+    return {key: value for key, value in after.items() if before.get(key) != value}
+
+
+def _file_size(path: str):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
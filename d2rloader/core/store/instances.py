@@ -0,0 +1,113 @@
+from typing import cast
+
+import psutil
+from loguru import logger
+
+from d2rloader.core.storage import StorageService, StorageType
+from d2rloader.models.account import Account
+from d2rloader.models.instance import Instance
+
+
+class InstanceService:
+    """Registry of the running instances keyed by the account uid.
+
+    The pid and the creation time of the process are stored so that a restarted
+    loader can reattach to its instances without looking for their windows.
+    """
+
+    _current_instances: dict[str, Instance] | None = None
+
+    def __init__(self, storage: StorageService):
+        self._storage: StorageService = storage
+        self.load()
+
+    @property
+    def data(self) -> dict[str, Instance]:
+        return self._current_instances or {}
+
+    def add(
+        self,
+        uid: str,
+        pid: int,
+        wineprefix: str | None = None,
+        commit: bool = True,
+    ):
+        try:
+            create_time = psutil.Process(pid).create_time()
+        except psutil.Error as e:
+            logger.debug(f"Not registering pid {pid}: {e}")
+            return False
+
+        if self._current_instances is None:
+            self._current_instances = {}
+        self._current_instances[uid] = Instance(
+            pid=pid, create_time=create_time, wineprefix=wineprefix
+        )
+
+        if commit:
+            self.save()
+        return True
+
+    def remove(self, uid: str, pid: int | None = None):
+        instance = self.data.get(uid)
+        if instance is None or pid is not None and instance.pid != pid:
+            return
+        del self.data[uid]
+        self.save()
+
+    def verify(
+        self, accounts: list[Account]
+    ) -> tuple[dict[int, Account], list[Account]]:
+        """Checks the registered instances of the accounts.
+
+        Returns the instances which are still running and the accounts which
+        have to be looked for: the ones without a registered instance (started
+        outside of the loader or never registered) and the ones whose registered
+        instance is gone (or whose pid got reused in the meantime).
+        """
+        running: dict[int, Account] = {}
+        unregistered: list[Account] = []
+        stale: list[Account] = []
+        for account in accounts:
+            instance = self.data.get(account.uid)
+            if instance is None and account.id in self.data:
+                # registered before the accounts had a uid
+                instance = self.data[account.uid] = self.data.pop(account.id)
+            if instance is None:
+                unregistered.append(account)
+                continue
+
+            if _is_running(instance):
+                logger.info(f"Registered instance found: {account.displayname}")
+                running[instance.pid] = account
+            else:
+                stale.append(account)
+                del self.data[account.uid]
+
+        if stale:
+            self.save()
+        return running, stale + unregistered
+
+    def running_wineprefixes(self) -> set[str]:
+        """The wineprefixes of the registered instances which are still running"""
+        return {
+            instance.wineprefix
+            for instance in self.data.values()
+            if instance.wineprefix is not None and _is_running(instance)
+        }
+
+    def save(self):
+        self._storage.save(self.data, StorageType.Instance)
+
+    def load(self):
+        self._current_instances = cast(
+            dict[str, Instance] | None, self._storage.load(StorageType.Instance)
+        )
+
+
+def _is_running(instance: Instance):
+    try:
+        create_time = psutil.Process(instance.pid).create_time()
+    except psutil.Error:
+        return False
+    return abs(create_time - instance.create_time) < 0.01
@@ -0,0 +1,111 @@
+import bisect
+import functools
+import re
+
+import unidecode
+
+from d2rloader.models.account import Account
+
+_token_re = re.compile(r"[a-z0-9]+")
+
+
+@functools.lru_cache(maxsize=4096)
+def tokenize(text: str) -> tuple[str, ...]:
+    """Splits the text into lower case ascii words"""
+    return tuple(_token_re.findall(unidecode.unidecode(text).lower()))
+
+
+def account_tokens(account: Account) -> set[str]:
+    tokens: set[str] = set()
+    for text in (
+        account.profile_name,
+        account.email,
+        account.params,
+        account.region.name,
+        account.auth_method.name,
+    ):
+        if text:
+            tokens.update(tokenize(text))
+    return tokens
+
+
+class AccountSearchIndex:
+    """Inverted index of the words of the accounts for the search as you type.
+
+    Every search term matches the words it is a prefix of - an account matches
+    if all terms match one of its words (profile name, email, launch parameters,
+    region or auth method).
+    """
+
+    def __init__(self) -> None:
+        # word -> uids of the accounts containing it
+        self._postings: dict[str, set[str]] = {}
+        # all words in sorted order for the prefix lookups
+        self._words: list[str] = []
+        # uid -> indexed words of the account
+        self._tokens: dict[str, set[str]] = {}
+        self._prefixes: dict[str, frozenset[str]] = {}
+        # incremented on every change so that search results can be re-checked
+        self.version: int = 0
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def add(self, account: Account):
+        tokens = account_tokens(account)
+        self._tokens[account.uid] = tokens
+        for token in tokens:
+            uids = self._postings.get(token)
+            if uids is None:
+                uids = self._postings[token] = set()
+                bisect.insort(self._words, token)
+            uids.add(account.uid)
+        self._changed()
+
+    def remove(self, uid: str):
+        for token in self._tokens.pop(uid, ()):
+            uids = self._postings[token]
+            uids.discard(uid)
+            if not uids:
+                del self._postings[token]
+                del self._words[bisect.bisect_left(self._words, token)]
+        self._changed()
+
+    def clear(self):
+        self._postings.clear()
+        self._words.clear()
+        self._tokens.clear()
+        self._changed()
+
+    def search(self, query: str) -> frozenset[str] | None:
+        """Returns the uids of the matching accounts or None for an empty query"""
+        terms = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not terms:
+            return None
+
+        # the longest terms are the most selective ones
+        result = self._prefix(terms[0])
+        for term in terms[1:]:
+            if not result:
+                break
+            result = result & self._prefix(term)
+        return result
+
+    def _prefix(self, prefix: str) -> frozenset[str]:
+        cached = self._prefixes.get(prefix)
+        if cached is not None:
+            return cached
+
+        uids: set[str] = set()
+        for idx in range(bisect.bisect_left(self._words, prefix), len(self._words)):
+            word = self._words[idx]
+            if not word.startswith(prefix):
+                break
+            uids.update(self._postings[word])
+
+        result = self._prefixes[prefix] = frozenset(uids)
+        return result
+
+    def _changed(self):
+        self._prefixes.clear()
+        self.version += 1
@@ -37,6 +37,24 @@ class SettingService:
         self._current_setting = setting
         self._storage.save(self._current_setting, type=StorageType.Setting)
 
+    def reload(self) -> list[str]:
+        """Loads the settings again and returns the names of the changed fields.
+
+        The current settings are updated in place, so that everything holding a
+        reference to them sees the changes.
+        """
+        setting = cast(Setting | None, self._storage.load(StorageType.Setting))
+        if setting is None:
+            return []
+
+        changed: list[str] = []
+        for key in Setting.model_fields.keys():
+            value = getattr(setting, key)
+            if getattr(self._current_setting, key) != value:
+                setattr(self._current_setting, key, value)
+                changed.append(key)
+        return changed
+
     def load(self, path: str | None = None):
         self._current_setting = cast(
             Setting, self._storage.load(StorageType.Setting, path=path)
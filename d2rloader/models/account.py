@@ -1,6 +1,10 @@
 import enum
+import functools
 import re
+import uuid
+from collections.abc import Mapping
 from pathlib import Path
+from typing import Any, Self
 
 import unidecode
 from pydantic import BaseModel, Field
@@ -8,6 +12,9 @@ from pydantic import BaseModel, Field
 from d2rloader.models.setting import Setting
 
 _punct_re = re.compile(r'[\t !"#$%&\'()*\-/<=>?@\[\\\]^_`{|},.+]+')
+# fields the normalized names are derived from and the cached properties
+_NORMALIZED_FIELDS = frozenset(("profile_name", "email"))
+_NORMALIZED_PROPERTIES = ("id", "email_normalized", "profile_normalized")
 
 
 class Region(enum.Enum):
@@ -37,7 +44,13 @@ class AuthMethod(enum.Enum):
         return None
 
 
+def new_uid() -> str:
+    return uuid.uuid4().hex
+
+
 class Account(BaseModel):
+    # stable id which doesn't change if the account is renamed or moved
+    uid: str = Field(default_factory=new_uid)
     profile_name: str | None = Field(default=None, frozen=False)
     email: str = Field(default="", repr=False)
     auth_method: AuthMethod
@@ -49,7 +62,25 @@ class Account(BaseModel):
     game_settings: str | None = Field(default=None)
     protonpath: str | None = Field(default=None)
 
-    @property
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in _NORMALIZED_FIELDS:
+            self._clear_normalized()
+        super().__setattr__(name, value)
+
+    def model_copy(
+        self, *, update: Mapping[str, Any] | None = None, deep: bool = False
+    ) -> Self:
+        copied = super().model_copy(update=update, deep=deep)
+        if update and not _NORMALIZED_FIELDS.isdisjoint(update):
+            copied._clear_normalized()
+        return copied
+
+    def _clear_normalized(self):
+        # the normalized names are cached in the instance dict by cached_property
+        for key in _NORMALIZED_PROPERTIES:
+            self.__dict__.pop(key, None)
+
+    @functools.cached_property
     def id(self):
         if self.profile_name is not None:
             return self.profile_normalized
@@ -61,11 +92,11 @@ class Account(BaseModel):
             return self.email
         return self.profile_name
 
-    @property
+    @functools.cached_property
     def email_normalized(self):
         return _normalize_str(self.email)
 
-    @property
+    @functools.cached_property
     def profile_normalized(self):
         if self.profile_name:
             return _normalize_str(self.profile_name)
@@ -99,6 +130,7 @@ class Account(BaseModel):
         )
 
 
+@functools.lru_cache(maxsize=4096)
 def _normalize_str(s: str, delim: str = "-"):
     text = unidecode.unidecode(s)
     result: list[str] = []
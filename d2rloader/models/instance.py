@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class Instance(BaseModel):
+    pid: int
+    create_time: float
+    wineprefix: str | None = Field(default=None)
@@ -38,3 +38,11 @@ class Setting(BaseModel):
     token_username: str | None = Field(default=None)
     d2rinfo: bool = Field(default=True)
     rotw: bool = Field(default=True)
+    max_concurrent_launches: int = Field(default=4)
+    launch_stagger: float = Field(default=2.0)
+    launch_groups: dict[str, list[str]] = Field(default_factory=dict)
+    sample_interval: float = Field(default=1.0)
+    accounts_journal: bool = Field(default=False)
+    prefix_template: bool = Field(default=True)
+    shared_shader_cache: bool = Field(default=True)
+    max_concurrent_prefix_inits: int = Field(default=2)
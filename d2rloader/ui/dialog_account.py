@@ -157,6 +157,7 @@ class AccountDialogWidget(QDialog):
     @property
     def data(self):
         return Account(
+            uid=self.account.uid,
             profile_name=self.profile_name.text(),
             email=self.email.text(),
             auth_method=cast(
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import sys
+from typing import Any, Final
+
+from PySide6.QtCore import Slot
+from PySide6.QtWidgets import (
+    QCheckBox,
+    QComboBox,
+    QDialog,
+    QDialogButtonBox,
+    QFormLayout,
+    QGroupBox,
+    QLineEdit,
+    QVBoxLayout,
+    QWidget,
+)
+
+from d2rloader.models.account import Account, AuthMethod, Region
+
+
+class BulkEditDialog(QDialog):
+    """A dialog to change the same fields of several accounts at once.
+
+    Only the checked fields are changed, the other fields keep the value of
+    every account.
+    """
+
+    def __init__(self, parent: QWidget, accounts: list[Account]):
+        super().__init__(parent)
+        self.accounts: list[Account] = accounts
+        self.setFixedWidth(500)
+
+        self.button_box: QDialogButtonBox = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+
+        self.auth_combobox: Final = QComboBox()
+        for method in AuthMethod:
+            self.auth_combobox.addItem(method.name, method)
+        self.region_combobox: Final = QComboBox()
+        for region in Region:
+            self.region_combobox.addItem(region.name, region)
+        self.params: Final = QLineEdit()
+        self.protonpath: Final = QLineEdit()
+
+        # field -> checkbox and the widget with the new value
+        self._fields: dict[str, tuple[QCheckBox, QWidget]] = {}
+        form_layout = QFormLayout()
+        self._add_field(form_layout, "auth_method", "Auth Method:", self.auth_combobox)
+        self._add_field(form_layout, "region", "Region:", self.region_combobox)
+        self._add_field(form_layout, "params", "Start Parameters:", self.params)
+        if sys.platform == "linux":
+            self._add_field(form_layout, "protonpath", "PROTONPATH: ", self.protonpath)
+
+        # start with the value the accounts have in common
+        self.auth_combobox.setCurrentIndex(
+            max(self.auth_combobox.findData(self._common("auth_method")), 0)
+        )
+        self.region_combobox.setCurrentIndex(
+            max(self.region_combobox.findData(self._common("region")), 0)
+        )
+        self.params.setText(self._common("params") or "")
+        self.protonpath.setText(self._common("protonpath") or "")
+
+        options_group_box = QGroupBox("Change")
+        options_group_box.setLayout(form_layout)
+
+        layout = QVBoxLayout()
+        layout.addWidget(options_group_box)
+        layout.addWidget(self.button_box)
+        self.setLayout(layout)
+
+        self.setWindowTitle(f"Edit {len(accounts)} Accounts")
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+        self.update_fields()
+
+    def _add_field(self, layout: QFormLayout, field: str, label: str, widget: QWidget):
+        checkbox = QCheckBox(label, self)
+        checkbox.toggled.connect(self.update_fields)
+        layout.addRow(checkbox, widget)
+        self._fields[field] = (checkbox, widget)
+
+    def _common(self, field: str):
+        values = {getattr(account, field) for account in self.accounts}
+        return values.pop() if len(values) == 1 else None
+
+    @property
+    def data(self) -> dict[str, Any]:
+        """The checked fields and their new value"""
+        values: dict[str, Any] = {
+            "auth_method": self.auth_combobox.currentData(),
+            "region": self.region_combobox.currentData(),
+            "params": self.params.text(),
+            "protonpath": self.protonpath.text(),
+        }
+        return {
+            field: values[field]
+            for field, (checkbox, _) in self._fields.items()
+            if checkbox.isChecked()
+        }
+
+    @Slot()
+    def update_fields(self):
+        for checkbox, widget in self._fields.values():
+            widget.setEnabled(checkbox.isChecked())
+        self.button_box.button(QDialogButtonBox.StandardButton.Ok).setEnabled(
+            any(checkbox.isChecked() for checkbox, _ in self._fields.values())
+        )
@@ -18,6 +18,7 @@ from PySide6.QtWidgets import (
     QCheckBox,
     QComboBox,
     QDialog,
+    QDoubleSpinBox,
     QFileDialog,
     QFormLayout,
     QFrame,
@@ -28,6 +29,7 @@ from PySide6.QtWidgets import (
     QLineEdit,
     QMessageBox,
     QPushButton,
+    QSpinBox,
     QStyleFactory,
     QVBoxLayout,
     QWidget,
@@ -132,9 +134,58 @@ class SettingDialogWidget(QDialog):
         self.protonpath_default: Final = QLineEdit()
         self.protonpath_default.setText(setting.protonpath)
 
+        max_concurrent_launches_label: Final = QLabel("Concurrent Launches: ", self)
+        self.max_concurrent_launches: Final = QSpinBox()
+        self.max_concurrent_launches.setRange(1, 16)
+        self.max_concurrent_launches.setValue(setting.max_concurrent_launches)
+
+        prefix_template_label: Final = QLabel("Clone Prefixes From Template: ", self)
+        self.prefix_template: Final = QCheckBox()
+        self.prefix_template.setToolTip(
+            "Build one template prefix and clone the prefixes of new accounts "
+            "from it instead of creating every prefix from scratch"
+        )
+        self.prefix_template.setChecked(setting.prefix_template)
+
+        shared_shader_cache_label: Final = QLabel("Shared Shader Cache: ", self)
+        self.shared_shader_cache: Final = QCheckBox()
+        self.shared_shader_cache.setToolTip(
+            "Share the shader caches between all prefixes so that shaders are "
+            "only compiled once"
+        )
+        self.shared_shader_cache.setChecked(setting.shared_shader_cache)
+
+        max_concurrent_prefix_inits_label: Final = QLabel(
+            "Concurrent Prefix Setups: ", self
+        )
+        self.max_concurrent_prefix_inits: Final = QSpinBox()
+        self.max_concurrent_prefix_inits.setRange(1, 8)
+        self.max_concurrent_prefix_inits.setToolTip(
+            "Number of wineprefixes of new accounts which are prepared in the "
+            "background at the same time"
+        )
+        self.max_concurrent_prefix_inits.setValue(setting.max_concurrent_prefix_inits)
+
         if sys.platform == "linux":
             advanced_form.addRow(wineprefix_path_label, self.wineprefix_path_button)
             advanced_form.addRow(protonpath_default_label, self.protonpath_default)
+            advanced_form.addRow(
+                max_concurrent_launches_label, self.max_concurrent_launches
+            )
+            advanced_form.addRow(prefix_template_label, self.prefix_template)
+            advanced_form.addRow(shared_shader_cache_label, self.shared_shader_cache)
+            advanced_form.addRow(
+                max_concurrent_prefix_inits_label, self.max_concurrent_prefix_inits
+            )
+
+        sample_interval_label: Final = QLabel("Resource Sample Interval: ", self)
+        self.sample_interval: Final = QDoubleSpinBox()
+        self.sample_interval.setRange(0, 60)
+        self.sample_interval.setSingleStep(0.5)
+        self.sample_interval.setSuffix(" s")
+        self.sample_interval.setSpecialValueText("Off")
+        self.sample_interval.setValue(setting.sample_interval)
+        advanced_form.addRow(sample_interval_label, self.sample_interval)
 
         plugins_path_label: Final = QLabel("Plugins: ", self)
         self.plugins_path_button: Final = QPushButton(
@@ -159,6 +210,15 @@ class SettingDialogWidget(QDialog):
         self.log_file.setChecked(setting.log_file or False)
         advanced_form.addRow(log_file_label, self.log_file)
 
+        accounts_journal_label: Final = QLabel("Accounts Journal: ", self)
+        self.accounts_journal: Final = QCheckBox()
+        self.accounts_journal.setToolTip(
+            "Append changes to <accounts file>.journal instead of rewriting the "
+            "accounts file on every change"
+        )
+        self.accounts_journal.setChecked(setting.accounts_journal)
+        advanced_form.addRow(accounts_journal_label, self.accounts_journal)
+
         check_update_label: Final = QLabel("Check Updates: ", self)
         self.check_update: Final = QCheckBox()
         self.check_update.setChecked(setting.check_update or True)
@@ -213,6 +273,14 @@ class SettingDialogWidget(QDialog):
             self.log_level_combobox.currentIndex()
         )
         self.setting.protonpath = self.protonpath_default.text()
+        self.setting.max_concurrent_launches = self.max_concurrent_launches.value()
+        self.setting.sample_interval = self.sample_interval.value()
+        self.setting.accounts_journal = self.accounts_journal.isChecked()
+        self.setting.prefix_template = self.prefix_template.isChecked()
+        self.setting.shared_shader_cache = self.shared_shader_cache.isChecked()
+        self.setting.max_concurrent_prefix_inits = (
+            self.max_concurrent_prefix_inits.value()
+        )
         return self.setting
 
     def show_advanced_settings(self):
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import functools
 import importlib.metadata
 import signal
 import sys
@@ -25,6 +26,7 @@ from PySide6.QtWidgets import (
     QFileDialog,
     QGridLayout,
     QMainWindow,
+    QMenu,
     QMessageBox,
     QStyleFactory,
     QVBoxLayout,
@@ -38,6 +40,9 @@ from d2rloader.core.storage import StorageType
 from .dialog_setting import SettingDialogWidget
 from .widget_info import InfoTabsWidget
 
+if sys.platform == "linux":
+    from .prefix_maintenance import PrefixMaintenance
+
 
 class MainWidget(QWidget):
     def __init__(self, d2rloader: D2RLoaderState):
@@ -85,6 +90,7 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.d2rloader: D2RLoaderState = d2rloader
         self.d2rloader.register_process_manager(self)
+        self.d2rloader.register_config_watcher(self)
 
         self.main_widget: MainWidget = MainWidget(d2rloader)
         self.setWindowTitle("D2RLoader")
@@ -107,24 +113,88 @@ class MainWindow(QMainWindow):
         file_menu.addAction(
             create_action(self, "&Save Account Settings As...", self.save_file)
         )
+        file_menu.addAction(
+            create_action(self, "&Import Accounts...", self.import_file)
+        )
+        if sys.platform == "linux":
+            self.prefix_maintenance: PrefixMaintenance = PrefixMaintenance(
+                self, d2rloader
+            )
+            prefix_menu = file_menu.addMenu("&Wineprefixes")
+            prefix_menu.addAction(
+                create_action(
+                    self,
+                    "&Deduplicate Files...",
+                    self.prefix_maintenance.deduplicate,
+                )
+            )
+            prefix_menu.addAction(
+                create_action(
+                    self,
+                    "&Warm Shader Caches",
+                    self.prefix_maintenance.warm_shader_cache,
+                )
+            )
+            prefix_menu.addAction(
+                create_action(
+                    self,
+                    "&Remove Unused Prefixes...",
+                    self.prefix_maintenance.collect_orphans,
+                )
+            )
         file_menu.addSeparator()
         file_menu.addAction(create_action(self, "&About", self.open_about))
         file_menu.addSeparator()
         file_menu.addAction(create_action(self, "E&xit", self.close))
 
         # Populate the Tools menu
+        table = self.main_widget.main_tab_widget.d2rloader_table
+        account_menu.addAction(create_action(self, "&Add Account...", table.add_entry))
+        account_menu.addAction(
+            create_action(self, "&Edit Selected Accounts...", table.bulk_edit_entries)
+        )
+        account_menu.addSeparator()
+        account_menu.addAction(
+            create_action(self, "&Start Selected", table.start_selected)
+        )
+        self.launch_group_menu: QMenu = account_menu.addMenu("&Launch Group")
         account_menu.addAction(
             create_action(
                 self,
-                "&Add Account...",
-                self.main_widget.main_tab_widget.d2rloader_table.add_entry,
+                "Save Selection as Launch &Group...",
+                table.save_selection_as_group,
             )
         )
+        self.delete_group_menu: QMenu = account_menu.addMenu("&Delete Launch Group")
+        account_menu.aboutToShow.connect(self.populate_launch_groups)
+        account_menu.addAction(
+            create_action(self, "&Cancel Queued Launches", table.cancel_all_queued)
+        )
 
         self.d2rloader.plugins.hook.d2rloader_mainwindow_plugin_menu(
             d2rloader=d2rloader, parent=self, menu=self.menuBar()
         )
 
+    @Slot()
+    def populate_launch_groups(self):
+        table = self.main_widget.main_tab_widget.d2rloader_table
+        self.launch_group_menu.clear()
+        self.delete_group_menu.clear()
+        for name in self.d2rloader.settings.data.launch_groups.keys():
+            self.launch_group_menu.addAction(
+                create_action(self, name, functools.partial(table.start_group, name))
+            )
+            self.delete_group_menu.addAction(
+                create_action(
+                    self,
+                    name,
+                    functools.partial(self.d2rloader.accounts.delete_group, name),
+                )
+            )
+
+        self.launch_group_menu.setDisabled(self.launch_group_menu.isEmpty())
+        self.delete_group_menu.setDisabled(self.delete_group_menu.isEmpty())
+
     @Slot()
     def open_about(self):
         version_string = importlib.metadata.version("d2rloader")
@@ -157,6 +227,7 @@ class MainWindow(QMainWindow):
             if prev_accounts_path != settings_dialog.data.accounts_path:
                 self.d2rloader.accounts.load()
                 self.main_widget.main_tab_widget.d2rloader_table.reload_table()
+                self.update_watched_paths()
 
     @Slot()
     def open_file(self):
@@ -166,6 +237,23 @@ class MainWindow(QMainWindow):
         self.d2rloader.settings.set(accounts_path=filename)
         self.d2rloader.accounts.load()
         self.main_widget.main_tab_widget.d2rloader_table.reload_table()
+        self.update_watched_paths()
+
+    def update_watched_paths(self):
+        if self.d2rloader.config_watcher is not None:
+            self.d2rloader.config_watcher.update_paths()
+
+    @Slot()
+    def import_file(self):
+        filename, _ = QFileDialog.getOpenFileName(
+            self,
+            filter="Accounts (*.json *.db *.sqlite *.sqlite3);;All Files (*)",
+        )
+        if not filename:
+            return
+        accounts = self.d2rloader.storage.load(StorageType.Account, path=filename)
+        self.d2rloader.accounts.replace(accounts or [])
+        self.main_widget.main_tab_widget.d2rloader_table.reload_table()
 
     @Slot()
     def save_file(self):
@@ -173,7 +261,7 @@ class MainWindow(QMainWindow):
         if not filename:
             return
         self.d2rloader.storage.save(
-            self.d2rloader.accounts.data, StorageType.Account, path=filename
+            self.d2rloader.accounts.data, StorageType.Account, path=filename, sync=True
         )
 
 
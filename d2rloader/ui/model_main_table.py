@@ -0,0 +1,450 @@
+from __future__ import annotations
+
+import enum
+import functools
+from typing import Any, Final
+
+from PySide6.QtCore import (
+    QAbstractItemModel,
+    QAbstractTableModel,
+    QEvent,
+    QModelIndex,
+    QPersistentModelIndex,
+    QSortFilterProxyModel,
+    Qt,
+    QTimer,
+    Signal,
+)
+from PySide6.QtGui import QMouseEvent, QPainter
+from PySide6.QtWidgets import (
+    QApplication,
+    QComboBox,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionButton,
+    QStyleOptionViewItem,
+    QWidget,
+)
+
+from d2rloader.core.store.accounts import AccountChange, AccountService
+from d2rloader.core.store.search import AccountSearchIndex
+from d2rloader.models.account import Account, AuthMethod, Region
+
+COLUMNS: Final = [
+    "Account",
+    "Auth Method",
+    "Region",
+    "Launch Parameters",
+    "Run Time",
+    "Actions",
+    "Resources",
+]
+(
+    ACCOUNT_COLUMN,
+    AUTH_COLUMN,
+    REGION_COLUMN,
+    PARAMS_COLUMN,
+    RUNTIME_COLUMN,
+    ACTIONS_COLUMN,
+    RESOURCES_COLUMN,
+) = range(len(COLUMNS))
+
+# the value the proxy model sorts the rows by
+SORT_ROLE: Final = Qt.ItemDataRole.UserRole + 1
+# rows whose search match changed are filtered one by one up to this many,
+# above all rows are filtered again
+REFILTER_MAX_ROWS: Final = 256
+
+_Index = QModelIndex | QPersistentModelIndex
+
+
+class AccountStatus(enum.Enum):
+    Start = "Start"
+    Queued = "Queued"
+    Preparing = "Preparing..."
+    Starting = "Starting..."
+    Running = "Running"
+
+
+class AccountTableModel(QAbstractTableModel):
+    """Table model of the accounts.
+
+    Changes of the rows go through the model so that the views are notified:
+    the model keeps a copy of the account list which is only changed between
+    the begin/end calls of the model.
+    """
+
+    def __init__(self, accounts: AccountService, parent: QWidget | None = None):
+        super().__init__(parent)
+        self._service: AccountService = accounts
+        self._accounts: list[Account] = list(accounts.data)
+        # uid -> status of the start/stop button and resource usage
+        self._status: dict[str, AccountStatus] = {}
+        self._resources: dict[str, str] = {}
+
+    def rowCount(self, parent: _Index = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._accounts)
+
+    def columnCount(self, parent: _Index = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role: int = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        if (
+            orientation == Qt.Orientation.Horizontal
+            and role == Qt.ItemDataRole.DisplayRole
+        ):
+            return COLUMNS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index: _Index, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+
+        account = self._accounts[index.row()]
+        column = index.column()
+        if role in (Qt.ItemDataRole.DisplayRole, SORT_ROLE):
+            if column == ACCOUNT_COLUMN:
+                return account.displayname
+            if column == AUTH_COLUMN:
+                return account.auth_method.name
+            if column == REGION_COLUMN:
+                return account.region.name
+            if column == PARAMS_COLUMN:
+                return account.params or ""
+            if column == RUNTIME_COLUMN:
+                runtime = account.runtime or 0.0
+                return runtime if role == SORT_ROLE else f"{runtime:.2f}"
+            if column == ACTIONS_COLUMN:
+                return self.status(account.uid).value
+            if column == RESOURCES_COLUMN:
+                return self._resources.get(account.uid, "")
+        elif role == Qt.ItemDataRole.EditRole:
+            if column == AUTH_COLUMN:
+                return account.auth_method
+            if column == REGION_COLUMN:
+                return account.region
+        elif role == Qt.ItemDataRole.UserRole:
+            return account
+        return None
+
+    def flags(self, index: _Index) -> Qt.ItemFlag:
+        flags = super().flags(index)
+        if index.column() in (AUTH_COLUMN, REGION_COLUMN):
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(
+        self, index: _Index, value: Any, role: int = Qt.ItemDataRole.EditRole
+    ) -> bool:
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+
+        row = index.row()
+        account = self._accounts[row]
+        if index.column() == AUTH_COLUMN and isinstance(value, AuthMethod):
+            if value != account.auth_method:
+                self._service.update(row, auth_method=value)
+        elif index.column() == REGION_COLUMN and isinstance(value, Region):
+            if value != account.region:
+                self._service.update(row, region=value)
+        else:
+            return False
+
+        self._accounts[row] = self._service.data[row]
+        self.dataChanged.emit(index, index)
+        return True
+
+    def account(self, row: int) -> Account | None:
+        if 0 <= row < len(self._accounts):
+            return self._accounts[row]
+        return None
+
+    def add_account(self, account: Account):
+        row = len(self._accounts)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._service.add(account)
+        self._accounts.append(account)
+        self.endInsertRows()
+        return row
+
+    def clone_account(self, row: int):
+        if self.account(row) is None:
+            return None
+
+        cloned_row = len(self._accounts)
+        self.beginInsertRows(QModelIndex(), cloned_row, cloned_row)
+        cloned_idx = self._service.clone(row)
+        if cloned_idx is not None:
+            self._accounts.append(self._service.data[cloned_idx])
+        self.endInsertRows()
+        return cloned_idx
+
+    def replace_account(self, row: int, account: Account):
+        self._service.add(account, row)
+        self._accounts[row] = self._service.data[row]
+        self.emit_rows_changed(row, row)
+
+    def update_accounts(self, rows: list[int], **fields: Any):
+        """Changes the fields of the accounts in rows, saved at once"""
+        if not rows:
+            return
+
+        with self._service.batch():
+            for row in rows:
+                self._service.update(row, **fields)
+                self._accounts[row] = self._service.data[row]
+        self.emit_rows_changed(min(rows), max(rows))
+
+    def remove_account(self, row: int):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._service.delete(row)
+        account = self._accounts.pop(row)
+        self._resources.pop(account.uid, None)
+        self.endRemoveRows()
+
+    def reset(self):
+        """Reloads all rows from the account service"""
+        self.beginResetModel()
+        self._accounts = list(self._service.data)
+        self.endResetModel()
+
+    def apply_changes(self, changes: list[AccountChange]):
+        """Applies changes which were already made to the account service"""
+        for change in changes:
+            if change.op == "remove":
+                self.beginRemoveRows(QModelIndex(), change.index, change.index)
+                del self._accounts[change.index]
+                self.endRemoveRows()
+            elif change.op == "insert" and change.account is not None:
+                self.beginInsertRows(QModelIndex(), change.index, change.index)
+                self._accounts.insert(change.index, change.account)
+                self.endInsertRows()
+            elif change.account is not None:
+                self._accounts[change.index] = change.account
+                self.emit_rows_changed(change.index, change.index)
+
+    def status(self, uid: str) -> AccountStatus:
+        return self._status.get(uid, AccountStatus.Start)
+
+    def set_status(self, uid: str, status: AccountStatus):
+        if self.status(uid) == status:
+            return
+        if status == AccountStatus.Start:
+            del self._status[uid]
+        else:
+            self._status[uid] = status
+        self._emit_cell_changed(uid, ACTIONS_COLUMN)
+
+    def set_resources(self, uid: str, text: str):
+        if self._resources.get(uid, "") == text:
+            return
+        if text:
+            self._resources[uid] = text
+        else:
+            self._resources.pop(uid, None)
+        self._emit_cell_changed(uid, RESOURCES_COLUMN)
+
+    def row_of(self, uid: str) -> int | None:
+        row = self._service.index_of(uid)
+        if row is None or row >= len(self._accounts):
+            return None
+        return row
+
+    def uids(self):
+        return [account.uid for account in self._accounts]
+
+    def emit_rows_changed(self, first: int, last: int):
+        self.dataChanged.emit(self.index(first, 0), self.index(last, len(COLUMNS) - 1))
+
+    def _emit_cell_changed(self, uid: str, column: int):
+        row = self.row_of(uid)
+        if row is None:
+            return
+        index = self.index(row, column)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+
+
+class AccountFilterProxyModel(QSortFilterProxyModel):
+    """Sorts the accounts and filters them by the search index of the service.
+
+    The matching uids are looked up once per query and again only if the index
+    changed since. While typing, only the rows whose match changed are filtered
+    again instead of all rows.
+    """
+
+    def __init__(
+        self,
+        model: AccountTableModel,
+        index: AccountSearchIndex,
+        parent: QWidget | None = None,
+    ):
+        super().__init__(parent)
+        self._model: AccountTableModel = model
+        self._index: AccountSearchIndex = index
+        self._query: str = ""
+        # uids of the matching accounts (None if all match) and the query and
+        # index version they were searched for
+        self._matches: frozenset[str] | None = None
+        self._searched: tuple[str, int] = ("", index.version)
+        self.setSourceModel(model)
+        self.setSortRole(SORT_ROLE)
+
+    @property
+    def query(self) -> str:
+        return self._query
+
+    def set_query(self, query: str):
+        if query == self._query:
+            return
+
+        previous = self._current_matches()
+        self._query = query
+        changed = self._changed_uids(previous, self._current_matches())
+        if changed is None:
+            self.beginFilterChange()
+            self.endFilterChange(QSortFilterProxyModel.Direction.Rows)
+            return
+
+        # the proxy filters the changed rows again
+        rows = sorted(
+            row for row in map(self._model.row_of, changed) if row is not None
+        )
+        for first, last in _row_ranges(rows):
+            self._model.emit_rows_changed(first, last)
+
+    def filterAcceptsRow(self, source_row: int, source_parent: _Index) -> bool:
+        matches = self._current_matches()
+        if matches is None:
+            return True
+        account = self._model.account(source_row)
+        return account is not None and account.uid in matches
+
+    def _current_matches(self) -> frozenset[str] | None:
+        searched = (self._query, self._index.version)
+        if searched != self._searched:
+            self._searched = searched
+            self._matches = self._index.search(self._query)
+        return self._matches
+
+    def _changed_uids(
+        self, previous: frozenset[str] | None, matches: frozenset[str] | None
+    ) -> set[str] | None:
+        """Returns the uids whose match changed or None if all rows should be
+        filtered again"""
+        if previous is not None and matches is not None:
+            changed = previous ^ matches
+        elif previous is None and matches is None:
+            changed = set()
+        else:
+            subset = matches if previous is None else previous
+            assert subset is not None
+            if self._model.rowCount() - len(subset) > REFILTER_MAX_ROWS:
+                return None
+            changed = {uid for uid in self._model.uids() if uid not in subset}
+        return changed if len(changed) <= REFILTER_MAX_ROWS else None
+
+
+def _row_ranges(rows: list[int]):
+    """Yields the first and last row of the consecutive runs of sorted rows"""
+    if not rows:
+        return
+    first = last = rows[0]
+    for row in rows[1:]:
+        if row != last + 1:
+            yield first, last
+            first = row
+        last = row
+    yield first, last
+
+
+class ComboBoxDelegate(QStyledItemDelegate):
+    """Edits an enum column with a combo box that only exists while editing"""
+
+    def __init__(self, items: list[tuple[str, Any]], parent: QWidget | None = None):
+        super().__init__(parent)
+        self._items: list[tuple[str, Any]] = items
+
+    def createEditor(
+        self, parent: QWidget, option: QStyleOptionViewItem, index: _Index
+    ) -> QWidget:
+        editor = QComboBox(parent)
+        for name, value in self._items:
+            editor.addItem(name, value)
+        editor.activated.connect(functools.partial(self._commit, editor))
+        QTimer.singleShot(0, editor.showPopup)
+        return editor
+
+    def setEditorData(self, editor: QWidget, index: _Index):
+        assert isinstance(editor, QComboBox)
+        editor.setCurrentIndex(editor.findData(index.data(Qt.ItemDataRole.EditRole)))
+
+    def setModelData(self, editor: QWidget, model: QAbstractItemModel, index: _Index):
+        assert isinstance(editor, QComboBox)
+        model.setData(index, editor.currentData(), Qt.ItemDataRole.EditRole)
+
+    def _commit(self, editor: QComboBox, _: int):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Paints the start/stop button of a row without creating a widget"""
+
+    clicked: Signal = Signal(QModelIndex)
+
+    def __init__(self, parent: QWidget | None = None):
+        super().__init__(parent)
+        self._pressed: QPersistentModelIndex | None = None
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: _Index):
+        widget = option.widget  # pyright: ignore[reportAttributeAccessIssue]
+        style = widget.style() if widget is not None else QApplication.style()
+
+        # background and selection of the cell
+        item = QStyleOptionViewItem(option)
+        self.initStyleOption(item, index)
+        text = item.text  # pyright: ignore[reportAttributeAccessIssue]
+        item.text = ""  # pyright: ignore[reportAttributeAccessIssue]
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, item, painter, widget)
+
+        button = QStyleOptionButton()
+        button.rect = option.rect  # pyright: ignore[reportAttributeAccessIssue]
+        button.text = text  # pyright: ignore[reportAttributeAccessIssue]
+        button.features = QStyleOptionButton.ButtonFeature.Flat  # pyright: ignore[reportAttributeAccessIssue]
+        button.state = QStyle.StateFlag.State_Raised  # pyright: ignore[reportAttributeAccessIssue]
+        if text not in (AccountStatus.Starting.value, AccountStatus.Preparing.value):
+            button.state |= QStyle.StateFlag.State_Enabled  # pyright: ignore[reportAttributeAccessIssue]
+        if self._pressed is not None and self._pressed == index:
+            button.state |= QStyle.StateFlag.State_Sunken  # pyright: ignore[reportAttributeAccessIssue]
+        style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, widget)
+
+    def editorEvent(
+        self,
+        event: QEvent,
+        model: QAbstractItemModel,
+        option: QStyleOptionViewItem,
+        index: _Index,
+    ) -> bool:
+        if not isinstance(event, QMouseEvent):
+            return super().editorEvent(event, model, option, index)
+        if event.button() != Qt.MouseButton.LeftButton:
+            return False
+
+        if event.type() == QEvent.Type.MouseButtonPress:
+            self._pressed = QPersistentModelIndex(index)
+            return True
+        if event.type() == QEvent.Type.MouseButtonRelease:
+            pressed, self._pressed = self._pressed, None
+            if (
+                pressed is not None
+                and pressed == index
+                and option.rect.contains(event.position().toPoint())  # pyright: ignore[reportAttributeAccessIssue]
+            ):
+                self.clicked.emit(QModelIndex(index))
+            return True
+        return False
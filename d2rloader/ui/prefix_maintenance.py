@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+from PySide6.QtCore import QObject, QThreadPool, Slot
+from PySide6.QtWidgets import QMessageBox, QWidget
+
+from d2rloader.core.platform_linux.dedup import DedupReport, PrefixDeduplicator
+from d2rloader.core.platform_linux.prefix_gc import Orphan, PrefixCollector
+from d2rloader.core.platform_linux.procscan import normalize_prefix
+from d2rloader.core.platform_linux.shadercache import ShaderCache
+from d2rloader.core.state import D2RLoaderState
+from d2rloader.core.worker import Worker, WorkerSignals
+from d2rloader.models.account import Account, AuthMethod
+from d2rloader.ui.utils import show_error_dialog
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+class PrefixMaintenance(QObject):
+    """Maintenance tasks of the wineprefixes, run in the background"""
+
+    def __init__(self, parent: QWidget, d2rloader: D2RLoaderState) -> None:
+        super().__init__(parent)
+        self.d2rloader: D2RLoaderState = d2rloader
+        self._parent: QWidget = parent
+        self._threadpool: QThreadPool = QThreadPool(self)
+        # keep the worker signals alive until the result has been delivered
+        self._signals: set[WorkerSignals] = set()
+
+    def run(self, fn: Callable[..., Any], on_success: Callable[[Any], None]):
+        worker = Worker(fn)
+        self._signals.add(worker.signals)
+        worker.signals.success.connect(on_success)
+        worker.signals.error.connect(self._handle_error)
+        worker.signals.finished.connect(
+            lambda signals=worker.signals: self._signals.discard(signals)
+        )
+        self._threadpool.start(worker)
+
+    @Slot()
+    def deduplicate(self):
+        deduplicator = PrefixDeduplicator(self.d2rloader.settings.data.wineprefix)
+        logger.info("Looking for duplicate files in the wineprefixes...")
+
+        def confirm(report: DedupReport):
+            logger.info(
+                f"{report.duplicate_files} duplicate file(s) "
+                f"({format_size(report.duplicate_bytes)}) in {report.files} "
+                f"file(s), {report.linkable_files} of them linkable "
+                f"({format_size(report.linkable_bytes)}), {report.hashed} file(s) "
+                "hashed"
+            )
+            if report.duplicate_files == 0:
+                QMessageBox.information(
+                    self._parent,
+                    "Deduplicate Wineprefixes",
+                    "No duplicate files found.",
+                )
+                return
+
+            no_reflink = (
+                ""
+                if report.reflink
+                else "<br />The filesystem doesn't support reflinks, only files "
+                "which are read-only already can be hardlinked."
+            )
+            if report.linkable_files == 0:
+                QMessageBox.information(
+                    self._parent,
+                    "Deduplicate Wineprefixes",
+                    f"{report.duplicate_files} identical files found in the "
+                    f"wineprefixes, but none of them can be linked.{no_reflink}",
+                )
+                return
+
+            ret = QMessageBox.question(
+                self._parent,
+                "Deduplicate Wineprefixes",
+                f"{report.linkable_files} of {report.duplicate_files} identical "
+                f"files ({format_size(report.linkable_bytes)}) in the wineprefixes "
+                f"can be replaced with links.{no_reflink}"
+                "<br />Do you want to replace them with links?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            )
+            if ret == QMessageBox.StandardButton.Yes:
+                self.run(deduplicator.deduplicate, finished)
+
+        def finished(report: DedupReport):
+            QMessageBox.information(
+                self._parent,
+                "Deduplicate Wineprefixes",
+                f"Replaced {report.linked_files} files with links, "
+                f"{format_size(report.linked_bytes)} reclaimed.",
+            )
+
+        self.run(deduplicator.scan, confirm)
+
+    @Slot()
+    def warm_shader_cache(self):
+        settings = self.d2rloader.settings.data
+        # the state caches of running instances are still being written
+        running = {
+            normalize_prefix(prefix)
+            for prefix in self.d2rloader.instances.running_wineprefixes()
+        }
+        prefixes = [
+            prefix
+            for account in self.d2rloader.accounts.data
+            if account.auth_method != AuthMethod.Steam
+            and normalize_prefix(
+                prefix := Account.wineprefix_account(settings, account)
+            )
+            not in running
+        ]
+        shader_cache = ShaderCache(settings.wineprefix)
+        logger.info(f"Warming the shader caches of {len(prefixes)} prefix(es)...")
+
+        def finished(warmed: int):
+            logger.info(f"Warmed the shader caches of {warmed} prefix(es)")
+            QMessageBox.information(
+                self._parent,
+                "Warm Shader Caches",
+                f"Copied the shared shader caches into {warmed} wineprefixes."
+                if warmed
+                else "The shader caches of all wineprefixes are up to date.",
+            )
+
+        self.run(lambda: shader_cache.warm_all(prefixes), finished)
+
+    @Slot()
+    def collect_orphans(self):
+        settings = self.d2rloader.settings.data
+        keep = {
+            Account.wineprefix_account(settings, account)
+            for account in self.d2rloader.accounts.data
+        }
+        keep.update(
+            Path(prefix) for prefix in self.d2rloader.instances.running_wineprefixes()
+        )
+        collector = PrefixCollector(settings.wineprefix)
+        logger.info("Looking for wineprefixes without an account...")
+
+        def confirm(orphans: list[Orphan]):
+            total = sum(orphan.size for orphan in orphans)
+            logger.info(
+                f"{len(orphans)} wineprefix(es) without an account "
+                f"({format_size(total)})"
+            )
+            if not orphans:
+                QMessageBox.information(
+                    self._parent,
+                    "Remove Unused Wineprefixes",
+                    "All wineprefixes belong to an account.",
+                )
+                return
+
+            dialog = QMessageBox(
+                QMessageBox.Icon.Question,
+                "Remove Unused Wineprefixes",
+                f"{len(orphans)} wineprefixes ({format_size(total)}) don't belong "
+                "to an account anymore.<br />Do you want to archive them into "
+                f"'{collector.archive_path}' or delete them?",
+                QMessageBox.StandardButton.Cancel,
+                self._parent,
+            )
+            dialog.setDetailedText(
+                "\n".join(
+                    f"{orphan.path.name}: {format_size(orphan.size)}"
+                    for orphan in orphans
+                )
+            )
+            archive = dialog.addButton("Archive", QMessageBox.ButtonRole.AcceptRole)
+            delete = dialog.addButton("Delete", QMessageBox.ButtonRole.DestructiveRole)
+            dialog.exec()
+
+            paths = [orphan.path for orphan in orphans]
+            if dialog.clickedButton() == archive:
+                self.run(lambda: collector.archive(paths), finished("Archived"))
+            elif dialog.clickedButton() == delete:
+                self.run(lambda: collector.delete(paths), finished("Deleted"))
+
+        def finished(action: str):
+            def show(count: int):
+                QMessageBox.information(
+                    self._parent,
+                    "Remove Unused Wineprefixes",
+                    f"{action} {count} wineprefixes.",
+                )
+
+            return show
+
+        self.run(lambda: collector.orphans(keep), confirm)
+
+    @Slot()
+    def _handle_error(self, err: tuple[Exception, str]):
+        logger.error(err[1])
+        show_error_dialog(self._parent, str(err[0]))
@@ -1,69 +1,132 @@
 from __future__ import annotations
 
-import functools
-import warnings
-from typing import Final, cast
+from typing import Final
 
 from loguru import logger
-from PySide6.QtCore import QProcess, Qt, Slot
+from PySide6.QtCore import QModelIndex, QProcess, Qt, Slot
 from PySide6.QtWidgets import (
-    QComboBox,
+    QAbstractItemView,
     QHBoxLayout,
     QHeaderView,
+    QInputDialog,
+    QLineEdit,
     QPushButton,
     QSizePolicy,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QVBoxLayout,
     QWidget,
 )
 
+from d2rloader.core.scheduler import LaunchEntry, LaunchStatus
 from d2rloader.core.state import D2RLoaderState
+from d2rloader.core.store.accounts import AccountChange
 from d2rloader.models.account import Account, AuthMethod, Region
 from d2rloader.ui.dialog_account import AccountDialogWidget
+from d2rloader.ui.dialog_bulk_edit import BulkEditDialog
+from d2rloader.ui.model_main_table import (
+    ACTIONS_COLUMN,
+    AUTH_COLUMN,
+    COLUMNS,
+    REGION_COLUMN,
+    RUNTIME_COLUMN,
+    AccountFilterProxyModel,
+    AccountStatus,
+    AccountTableModel,
+    ButtonDelegate,
+    ComboBoxDelegate,
+)
 from d2rloader.ui.utils import create_margins, show_error_dialog
 
 
 class D2RLoaderTableWidget(QWidget):
-    _columns: Final = [
-        "Account",
-        "Auth Method",
-        "Region",
-        "Launch Parameters",
-        "Run Time",
-        "Actions",
-    ]
-    _items: int = 0
+    _columns: Final = COLUMNS
     _process: QProcess | None = None
     _processes: dict[str, tuple[bool, int]] = {}
 
     def __init__(self, d2rloader: D2RLoaderState):
         super().__init__()
         self.d2rloader: D2RLoaderState = d2rloader
+        # launch id -> uid of the account which got launched
+        self._launches: dict[int, str] = {}
+        # launch scheduler entry id -> uid of the queued account
+        self._queued: dict[int, str] = {}
+
+        self.model: AccountTableModel = AccountTableModel(d2rloader.accounts, self)
+        self.proxy: AccountFilterProxyModel = AccountFilterProxyModel(
+            self.model, d2rloader.accounts.search_index, self
+        )
 
-        self.table: QTableWidget = self.create_table()
+        self.search: QLineEdit = self.create_search()
+        self.table: QTableView = self.create_table()
         self.toolbar: QWidget = self.create_toolbar()
 
         layout = QVBoxLayout()
+        layout.addWidget(self.search)
         layout.addWidget(self.table)
         layout.addWidget(self.toolbar)
         layout.setContentsMargins(create_margins(2, 2, 5, 5))
         self.setLayout(layout)
 
-        self.create_table_entries()
         self.find_active_instances()
 
+        if self.d2rloader.process_manager is not None:
+            self.d2rloader.process_manager.process_finished.connect(
+                self.process_finished
+            )
+            self.d2rloader.process_manager.process_error.connect(self.process_error)
+            self.d2rloader.process_manager.instance_exited.connect(self.instance_exited)
+
+        if self.d2rloader.resource_sampler is not None:
+            self.d2rloader.resource_sampler.sampled.connect(self.update_resources)
+
+        if self.d2rloader.launch_scheduler is not None:
+            self.d2rloader.launch_scheduler.entry_started.connect(self.launch_started)
+            self.d2rloader.launch_scheduler.entry_finished.connect(self.launch_finished)
+
+        if self.d2rloader.config_watcher is not None:
+            self.d2rloader.config_watcher.accounts_changed.connect(self.apply_changes)
+
+        if self.d2rloader.prefix_init_queue is not None:
+            self.d2rloader.prefix_init_queue.progress.connect(self.prepare_progress)
+            self.d2rloader.prefix_init_queue.finished.connect(self.prepare_finished)
+
+    def create_search(self):
+        search = QLineEdit()
+        search.setPlaceholderText("Search profile, email, region or parameters...")
+        search.setClearButtonEnabled(True)
+        search.textChanged.connect(self.proxy.set_query)
+        return search
+
     def create_table(self):
-        table = QTableWidget()
-        table.setColumnCount(len(self._columns))
-        table.setHorizontalHeaderLabels(self._columns)
+        table = QTableView()
+        table.setModel(self.proxy)
         table.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Expanding)
         table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        table.hideColumn(4)
-        table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        table.itemChanged.connect(self.change_parameters)
-        table.itemDoubleClicked.connect(self.double_clicked_row)
+        table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        table.hideColumn(RUNTIME_COLUMN)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        # the combo boxes are opened on click, a double click edits the account
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+
+        self._auth_delegate: ComboBoxDelegate = ComboBoxDelegate(
+            [(method.name, method) for method in AuthMethod], table
+        )
+        self._region_delegate: ComboBoxDelegate = ComboBoxDelegate(
+            [(region.name, region) for region in Region], table
+        )
+        self._button_delegate: ButtonDelegate = ButtonDelegate(table)
+        self._button_delegate.clicked.connect(self.clicked_start_stop_button)
+        table.setItemDelegateForColumn(AUTH_COLUMN, self._auth_delegate)
+        table.setItemDelegateForColumn(REGION_COLUMN, self._region_delegate)
+        table.setItemDelegateForColumn(ACTIONS_COLUMN, self._button_delegate)
+
+        # keep the order of the accounts until a column header is clicked
+        table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        table.setSortingEnabled(True)
+
+        table.clicked.connect(self.clicked_cell)
+        table.doubleClicked.connect(self.double_clicked_row)
         return table
 
     def create_toolbar(self):
@@ -71,6 +134,8 @@ class D2RLoaderTableWidget(QWidget):
         toolbar_layout = QHBoxLayout()
         toolbar_layout.setContentsMargins(create_margins(0, 0, 0, 0))
 
+        start_selected_button = QPushButton("Start Selected")
+        start_selected_button.clicked.connect(self.start_selected)
         add_button = QPushButton("Add")
         add_button.clicked.connect(self.add_entry)
         clone_button = QPushButton("Clone")
@@ -79,6 +144,7 @@ class D2RLoaderTableWidget(QWidget):
         edit_button.clicked.connect(self.edit_entry)
         delete_button = QPushButton("Delete")
         delete_button.clicked.connect(self.delete_entry)
+        toolbar_layout.addWidget(start_selected_button)
         toolbar_layout.addStretch(1)
         toolbar_layout.addWidget(add_button)
         toolbar_layout.addWidget(clone_button)
@@ -88,188 +154,235 @@ class D2RLoaderTableWidget(QWidget):
         toolbar_widget.setLayout(toolbar_layout)
         return toolbar_widget
 
+    def selected_rows(self):
+        """Returns the selected rows of the account list (not of the view)"""
+        return sorted(
+            {
+                self.proxy.mapToSource(index).row()
+                for index in self.table.selectionModel().selectedRows()
+            }
+        )
+
+    def selected_row(self):
+        rows = self.selected_rows()
+        current = self.proxy.mapToSource(self.table.currentIndex()).row()
+        if current in rows:
+            return current
+        return rows[0] if rows else None
+
+    def select_row(self, row: int):
+        index = self.proxy.mapFromSource(self.model.index(row, 0))
+        if index.isValid():
+            self.table.selectRow(index.row())
+
     @Slot()
     def edit_entry(self) -> None:
-        if len(self.table.selectedIndexes()) == 0:
+        if len(self.selected_rows()) > 1:
+            self.bulk_edit_entries()
             return
 
-        row_index = self.table.selectedIndexes()[0].row()
+        row_index = self.selected_row()
+        if row_index is None:
+            return
+
+        previous = self.d2rloader.accounts.get(row_index)
+        # the dialog changes the account it edits while typing
         edit_dialog = AccountDialogWidget(
-            self, self.d2rloader, self.d2rloader.accounts.get(row_index)
+            self, self.d2rloader, previous.model_copy() if previous else None
         )
 
         if edit_dialog.exec():
-            self.table.removeRow(row_index)
-            self.create_row(row_index, edit_dialog.data)
-            self.d2rloader.accounts.add(edit_dialog.data, row_index)
-            self.table.selectRow(row_index)
+            account = edit_dialog.data
+            # keep the prefix of a renamed account
+            if previous is not None and self.d2rloader.process_manager is not None:
+                self.d2rloader.process_manager.move_wineprefix(previous, account)
+            self.model.replace_account(row_index, account)
+            self.select_row(row_index)
+
+    @Slot()
+    def bulk_edit_entries(self):
+        rows = self.selected_rows()
+        accounts = [self.d2rloader.accounts.data[row] for row in rows]
+        if not accounts:
+            return
+
+        bulk_dialog = BulkEditDialog(self, accounts)
+        if bulk_dialog.exec() and bulk_dialog.data:
+            self.model.update_accounts(rows, **bulk_dialog.data)
+            logger.info(
+                f"Changed {', '.join(bulk_dialog.data)} of {len(rows)} account(s)"
+            )
 
     @Slot()
     def add_entry(self):
         add_dialog = AccountDialogWidget(self, self.d2rloader)
 
         if add_dialog.exec():
-            self.add_row(add_dialog.data)
-            self.d2rloader.accounts.add(add_dialog.data)
+            row = self.model.add_account(add_dialog.data)
+            self.prepare_rows([row])
 
     @Slot()
     def clone_entry(self):
-        if len(self.table.selectedIndexes()) == 0:
+        row_index = self.selected_row()
+        if row_index is None:
             return
 
-        row_index = self.table.selectedIndexes()[0].row()
-
-        cloned_idx = self.d2rloader.accounts.clone(row_index)
+        cloned_idx = self.model.clone_account(row_index)
         if cloned_idx is None:
             logger.error(f"Couldn't clone account with row_index {row_index}")
             return
+        self.prepare_rows([cloned_idx])
+
+    def prepare_rows(self, rows: list[int]):
+        """Prepares the prefixes of the accounts in the background"""
+        if self.d2rloader.prefix_init_queue is None:
+            return
+
+        accounts = [
+            account
+            for row in rows
+            if (account := self.model.account(row)) is not None
+            and self.model.status(account.uid) == AccountStatus.Start
+        ]
+        for account in self.d2rloader.prefix_init_queue.enqueue(accounts):
+            self.model.set_status(account.uid, AccountStatus.Preparing)
 
-        self.add_row(self.d2rloader.accounts.get(cloned_idx))
+    def is_preparing(self, uid: str):
+        queue = self.d2rloader.prefix_init_queue
+        return queue is not None and queue.is_pending(uid)
+
+    @Slot()
+    def prepare_progress(self, uid: str, description: str, step: int, steps: int):
+        if self.model.row_of(uid) is not None:
+            self.model.set_status(uid, AccountStatus.Preparing)
+
+    @Slot()
+    def prepare_finished(self, uid: str, ready: bool):
+        if self.model.status(uid) == AccountStatus.Preparing:
+            self.model.set_status(uid, AccountStatus.Start)
 
     @Slot()
     def delete_entry(self):
-        if len(self.table.selectedIndexes()) == 0:
+        row_index = self.selected_row()
+        if row_index is None:
             return
 
-        row_index = self.table.selectedIndexes()[0].row()
-        self.table.removeRow(row_index)
-        self._items -= 1
-        self.d2rloader.accounts.delete(row_index)
+        self.model.remove_account(row_index)
 
-    def double_clicked_row(self, _: QTableWidgetItem):
-        self.edit_entry()
+    @Slot()
+    def clicked_cell(self, index: QModelIndex):
+        if index.column() in (AUTH_COLUMN, REGION_COLUMN):
+            self.table.edit(index)
 
-    def create_table_entries(self, data: list[Account] | None = None):
-        data = self.d2rloader.accounts.data if not data else data
+    @Slot()
+    def double_clicked_row(self, index: QModelIndex):
+        if index.column() not in (AUTH_COLUMN, REGION_COLUMN, ACTIONS_COLUMN):
+            self.edit_entry()
 
-        for item in data:
-            self.add_row(item)
+    def reload_table(self):
+        self.model.reset()
 
-    def create_row(self, row: int, item: Account | None = None):
-        if item is None:
+    @Slot()
+    def apply_changes(self, changes: list[AccountChange]):
+        """Applies the changes of the accounts without rebuilding the table"""
+        self.model.apply_changes(changes)
+
+    @Slot()
+    def clicked_start_stop_button(self, index: QModelIndex):
+        row_index = self.proxy.mapToSource(index).row()
+        account = self.model.account(row_index)
+        if account is None:
+            logger.error(f"Accout not found for row_index {row_index}")
             return
 
-        account_item = QTableWidgetItem(item.displayname)
-        account_item.setFlags(account_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-
-        auth_item = QTableWidgetItem()
-        auth_item.setFlags(auth_item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
-        auth_combobox = QComboBox()
-        auth_combobox.addItem(AuthMethod.Token.name, AuthMethod.Token)
-        auth_combobox.addItem(AuthMethod.Password.name, AuthMethod.Password)
-        auth_combobox.addItem(AuthMethod.Steam.name, AuthMethod.Steam)
-        idx = auth_combobox.findData(item.auth_method)
-        auth_combobox.setCurrentIndex(idx)
-        auth_combobox.currentTextChanged.connect(self.change_auth_method)
-
-        region_item = QTableWidgetItem()
-        region_item.setFlags(region_item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
-        region_combobox = QComboBox()
-        region_combobox.setFrame(True)
-        region_combobox.addItem(Region.Europe.name, Region.Europe)
-        region_combobox.addItem(Region.Americas.name, Region.Americas)
-        region_combobox.addItem(Region.Asia.name, Region.Asia)
-        region_combobox.addItem(Region.China.name, Region.China)
-        idx = region_combobox.findData(item.region)
-        region_combobox.setCurrentIndex(idx)
-        region_combobox.currentTextChanged.connect(self.change_region)
-
-        parameters_item = QTableWidgetItem(item.params if item.params else "")
-        parameters_item.setFlags(
-            parameters_item.flags()
-            & ~Qt.ItemFlag.ItemIsEditable
-            & ~Qt.ItemFlag.ItemIsSelectable
-        )
+        status = self.model.status(account.uid)
+        if self.is_preparing(account.uid):
+            return
+        if status == AccountStatus.Queued:
+            self.cancel_queued(account.uid)
+        elif status == AccountStatus.Start:
+            self.process_start(account)
+        elif status == AccountStatus.Running:
+            self.process_kill(account)
 
-        runtime_item = QTableWidgetItem(f"{item.runtime:.2f}")
-        runtime_item.setFlags(runtime_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+        self.table.selectRow(index.row())
 
-        action_item = QTableWidgetItem()
-        action_item.setFlags(action_item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
-        start_stop_btn = QPushButton("Start")
-        start_stop_btn.setCheckable(True)
-        start_stop_btn.setFlat(True)
-        start_stop_btn.clicked.connect(
-            functools.partial(self.clicked_start_stop_button, row, start_stop_btn)
-        )
+    @Slot()
+    def start_selected(self):
+        self.start_rows(self.selected_rows())
 
-        self.table.insertRow(row)
+    def start_group(self, name: str):
+        self.start_rows(self.d2rloader.accounts.get_group(name))
 
-        self.table.setItem(row, 0, account_item)
-        self.table.setItem(row, 1, auth_item)
-        self.table.setCellWidget(row, 1, auth_combobox)
-        self.table.setItem(row, 2, region_item)
-        self.table.setCellWidget(row, 2, region_combobox)
-        self.table.setItem(row, 3, parameters_item)
-        self.table.setItem(row, 4, runtime_item)
-        self.table.setItem(row, 5, action_item)
-        self.table.setCellWidget(row, 5, start_stop_btn)
+    @Slot()
+    def save_selection_as_group(self):
+        rows = self.selected_rows()
+        if not rows:
+            return
 
-    def add_row(self, item: Account | None = None):
-        self.create_row(self._items, item)
-        self._items += 1
+        name, ok = QInputDialog.getText(self, "Save Launch Group", "Group Name:")
+        if not ok or not name:
+            return
 
-    def reload_table(self):
-        self.table.setRowCount(0)
-        self._items = 0
-        self.create_table_entries()
+        self.d2rloader.accounts.save_group(name, rows)
+        logger.info(f"Saved launch group '{name}' with {len(rows)} account(s)")
 
-    def clicked_start_stop_button(self, row_index: int, button: QPushButton | None):
-        account = self.d2rloader.accounts.get(row_index)
-        if account is None:
-            logger.error(f"Accout not found for row_index {row_index}")
+    def start_rows(self, rows: list[int]):
+        if self.d2rloader.launch_scheduler is None:
+            logger.error("LaunchScheduler not registered!")
             return
 
-        if button is not None:
-            if button.text() != "Running":
-                self.process_start(account, button)
-            else:
-                self.process_kill(account, button)
+        accounts: list[Account] = []
+        for row in rows:
+            account = self.model.account(row)
+            # skip rows which are being prepared, queued, starting or running
+            if (
+                account is None
+                or self.model.status(account.uid) != AccountStatus.Start
+                or self.is_preparing(account.uid)
+            ):
+                continue
+            accounts.append(account)
 
-        self.table.selectRow(row_index)
+        if not accounts:
+            return
 
-    def change_buttons_state(self, activeButton: QPushButton, new_state: str = "start"):
-        if new_state == "start":
-            activeButton.setDisabled(False)
-            activeButton.setChecked(False)
-            activeButton.setText("Start")
-        else:
-            activeButton.setDisabled(True)
+        entries = self.d2rloader.launch_scheduler.enqueue(accounts)
+        for entry in entries:
+            # the first entries might have been started already
+            if entry.status == LaunchStatus.Queued:
+                self.model.set_status(entry.account.uid, AccountStatus.Queued)
+                self._queued[entry.id] = entry.account.uid
 
-        for row in range(self.table.rowCount()):
-            button = cast(QPushButton, self.table.cellWidget(row, 5))
-            if button == activeButton or button.text() == "Running":
-                continue
+    def cancel_queued(self, uid: str):
+        if self.d2rloader.launch_scheduler is None:
+            return
 
-            if new_state == "stop":
-                button.setDisabled(True)
-            else:
-                button.setDisabled(False)
-                button.setChecked(False)
+        for entry_id, queued_uid in list(self._queued.items()):
+            if queued_uid == uid:
+                self.d2rloader.launch_scheduler.cancel(entry_id)
+                return
 
     @Slot()
-    def change_auth_method(self, activated: str | None = None):
-        method = AuthMethod.from_name(activated or "")
-        if activated is None or method is None:
-            return
-
-        row_index = self.table.selectedIndexes()[0].row()
-        self.d2rloader.accounts.update(row_index, auth_method=method)
+    def cancel_all_queued(self):
+        if self.d2rloader.launch_scheduler is not None:
+            self.d2rloader.launch_scheduler.cancel_all()
 
     @Slot()
-    def change_region(self, activated: str | None = None):
-        reg = Region.from_name(activated or "")
-        if activated is None or reg is None:
+    def launch_started(self, entry: LaunchEntry):
+        self._queued.pop(entry.id, None)
+        if entry.launch_id is None:
             return
 
-        row_index = self.table.selectedIndexes()[0].row()
-        self.d2rloader.accounts.update(row_index, region=reg)
+        self.model.set_status(entry.account.uid, AccountStatus.Starting)
+        self._launches[entry.launch_id] = entry.account.uid
 
-    def change_parameters(self, item: QTableWidgetItem):
-        if self._columns[item.column()] == "Launch Parameters":
-            account = self.d2rloader.accounts.get(item.row())
-            if account is not None and account.params != item.text():
-                self.d2rloader.accounts.update(item.row(), params=item.text())
+    @Slot()
+    def launch_finished(self, entry: LaunchEntry):
+        uid = self._queued.pop(entry.id, None)
+        if uid is not None and entry.status == LaunchStatus.Cancelled:
+            logger.info(f"Cancelled queued launch of {entry.account.displayname}")
+            self.model.set_status(uid, AccountStatus.Start)
 
     def find_active_instances(self):
         if self.d2rloader.process_manager is None:
@@ -279,49 +392,27 @@ class D2RLoaderTableWidget(QWidget):
         instances = self.d2rloader.process_manager.find_active_instances(
             self.d2rloader.accounts.data
         )
-        for i in instances.items():
-            self._processes[i[1].id] = (True, i[0])
-
-        for idx, account in enumerate(self.d2rloader.accounts.data):
-            if account.id in self._processes.keys():
-                button = cast(QPushButton, self.table.cellWidget(idx, 5))
-                if button.text() == "Running":
-                    continue
-                button.setText("Running")
+        for pid, account in instances.items():
+            self._processes[account.uid] = (True, pid)
+            self.model.set_status(account.uid, AccountStatus.Running)
 
-    def process_start(self, account: Account, button: QPushButton):
+    def process_start(self, account: Account):
         if self.d2rloader.process_manager is None:
             logger.error("ProcessManager not registered!")
             return
 
-        # try to disconnect previous signals before adding a new one
-        try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                self.d2rloader.process_manager.process_finished.disconnect()
-                self.d2rloader.process_manager.process_error.disconnect()
-        except Exception:
-            pass
-
-        self.change_buttons_state(button, "stop")
-        button.setText("Starting...")
-        button.setDisabled(True)
+        self.model.set_status(account.uid, AccountStatus.Starting)
 
         logger.info(
             f"Starting D2R.exe - {account.displayname} ({account.region.value})"
         )
-        self.d2rloader.process_manager.process_finished.connect(
-            functools.partial(self.process_finished, button)
-        )
-        self.d2rloader.process_manager.process_error.connect(
-            functools.partial(self.process_error, button)
-        )
-        self.d2rloader.process_manager.start(account)
+        launch_id = self.d2rloader.process_manager.start(account)
+        self._launches[launch_id] = account.uid
 
-    def process_kill(self, account: Account, button: QPushButton):
+    def process_kill(self, account: Account):
         pid = None
         try:
-            pid = self._processes[account.id][1]
+            pid = self._processes[account.uid][1]
         except KeyError:
             pass
 
@@ -329,34 +420,65 @@ class D2RLoaderTableWidget(QWidget):
             logger.error("Stopping D2R.exe failed - PID not found!")
         else:
             logger.info(
-                f"Stopping D2R.exe with PID {self._processes[account.id][1]} - {account.displayname} ({account.region})"
+                f"Stopping D2R.exe with PID {pid} - {account.displayname} ({account.region})"
             )
             try:
                 self.d2rloader.process_manager.kill(pid)
             except Exception:
                 logger.error(f"Couldn't kill pid {pid}")
 
-        del self._processes[account.id]
-        self.change_buttons_state(button, "start")
+        self._processes.pop(account.uid, None)
+        self.model.set_status(account.uid, AccountStatus.Start)
+        self.model.set_resources(account.uid, "")
 
     @Slot()
     def process_finished(
-        self, button: QPushButton, logged_in: bool, account: Account | None, pid: int
+        self, launch_id: int, logged_in: bool, account: Account | None, pid: int
     ):
+        uid = self._launches.pop(launch_id, None)
+        if uid is None:
+            return
+
         if not account:
-            button.setText("Start")
-            button.setDisabled(False)
-            self.change_buttons_state(button, "start")
+            self.model.set_status(uid, AccountStatus.Start)
             return
 
         logger.info(f"Started profile {account.displayname} with pid {pid}")
-        self.change_buttons_state(button, "start")
-        button.setText("Running")
-        button.setDisabled(False)
-
-        self._processes[account.id] = (logged_in, pid)
+        self.model.set_status(uid, AccountStatus.Running)
+        self._processes[account.uid] = (logged_in, pid)
 
     @Slot()
-    def process_error(self, button: QPushButton, account: Account, msg: str):
+    def process_error(self, launch_id: int, account: Account | None, msg: str):
+        uid = self._launches.pop(launch_id, None)
+        if uid is not None:
+            self.model.set_status(uid, AccountStatus.Start)
         show_error_dialog(self, msg)
-        self.change_buttons_state(button, "start")
+
+    @Slot()
+    def instance_exited(
+        self, account: Account, pid: int, exit_code: int, runtime: float
+    ):
+        process = self._processes.get(account.uid)
+        # the instance might have been stopped by the user already
+        if process is None or process[1] != pid:
+            return
+
+        del self._processes[account.uid]
+        if self.model.status(account.uid) == AccountStatus.Running:
+            self.model.set_status(account.uid, AccountStatus.Start)
+        self.model.set_resources(account.uid, "")
+
+    @Slot()
+    def update_resources(self):
+        if self.d2rloader.resource_sampler is None:
+            return
+
+        for uid, (_, pid) in self._processes.items():
+            sample = self.d2rloader.resource_sampler.latest(pid)
+            if sample is None:
+                continue
+            self.model.set_resources(
+                uid,
+                f"{sample.cpu_percent:.0f}% CPU, {sample.rss / 1024**3:.2f} GiB, "
+                f"{sample.threads} threads",
+            )
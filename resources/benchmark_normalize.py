@@ -0,0 +1,77 @@
+"""Benchmarks the normalized account names used on every launch.
+
+Compares the memoized ``Account.id`` / ``profile_normalized`` /
+``email_normalized`` with normalizing the names on every access, which is what
+the properties did before they were cached.
+
+Usage: python resources/benchmark_normalize.py [--accounts N] [--launches N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from d2rloader.models.account import Account, _normalize_str  # noqa: E402
+from d2rloader.models.setting import Setting  # noqa: E402
+
+# accesses of the normalized names during one launch: the prefix path is
+# resolved by the process manager, the umu helpers (log, start script, env,
+# prefix creation) and the game settings - the id by the registry and the table
+PREFIX_LOOKUPS = 8
+ID_LOOKUPS = 4
+
+
+def uncached_launch(account: Account, settings: Setting):
+    normalize = _normalize_str.__wrapped__
+    for _ in range(PREFIX_LOOKUPS):
+        name = normalize(account.profile_name) if account.profile_name else ""
+        Path(settings.wineprefix, name or normalize(account.email))
+    for _ in range(ID_LOOKUPS):
+        if account.profile_name is not None:
+            normalize(account.profile_name)
+        else:
+            normalize(account.email)
+
+
+def cached_launch(account: Account, settings: Setting):
+    for _ in range(PREFIX_LOOKUPS):
+        Account.wineprefix_account(settings, account)
+    for _ in range(ID_LOOKUPS):
+        account.id  # noqa: B018
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--launches", type=int, default=10)
+    args = parser.parse_args()
+
+    settings = Setting(theme="", handle_path="", game_path="")
+    accounts: list[Account] = []
+    for idx in range(args.accounts):
+        account = Account.default_account()
+        account.profile_name = f"Sörceress Nº{idx} (Ladder)"
+        account.email = f"player.{idx}@example.com"
+        accounts.append(account)
+
+    def run(launch):
+        for _ in range(args.launches):
+            for account in accounts:
+                launch(account, settings)
+
+    launches = args.accounts * args.launches
+    uncached = min(timeit.repeat(lambda: run(uncached_launch), number=1, repeat=3))
+    cached = min(timeit.repeat(lambda: run(cached_launch), number=1, repeat=3))
+
+    print(f"{launches} launches of {args.accounts} accounts")
+    print(f"uncached: {uncached * 1e6 / launches:8.2f} us per launch")
+    print(f"cached:   {cached * 1e6 / launches:8.2f} us per launch")
+    print(f"speedup:  {uncached / cached:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
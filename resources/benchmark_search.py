@@ -0,0 +1,85 @@
+"""Benchmarks the account search index used by the search box.
+
+Measures building the index and the lookup of every prefix typed into the
+search box, compared with scanning the fields of all accounts on every
+keystroke.
+
+Usage: python resources/benchmark_search.py [--accounts N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from d2rloader.core.store.search import AccountSearchIndex  # noqa: E402
+from d2rloader.models.account import Account, Region  # noqa: E402
+
+QUERY = "player 123 europe"
+
+
+def scan(accounts: list[Account], query: str):
+    terms = query.lower().split()
+    return [
+        account.uid
+        for account in accounts
+        if all(
+            any(
+                term in (text or "").lower()
+                for text in (
+                    account.profile_name,
+                    account.email,
+                    account.params,
+                    account.region.name,
+                )
+            )
+            for term in terms
+        )
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=5000)
+    args = parser.parse_args()
+
+    accounts: list[Account] = []
+    for idx in range(args.accounts):
+        account = Account.default_account()
+        account.profile_name = f"Sörceress Nº{idx} (Ladder)"
+        account.email = f"player.{idx}@example.com"
+        account.params = "-mod sorc -txt" if idx % 2 else None
+        account.region = list(Region)[idx % len(Region)]
+        accounts.append(account)
+
+    index = AccountSearchIndex()
+
+    def build():
+        index.clear()
+        for account in accounts:
+            index.add(account)
+
+    keystrokes = [QUERY[:end] for end in range(1, len(QUERY) + 1)]
+
+    def type_query(search):
+        for text in keystrokes:
+            search(text)
+
+    built = min(timeit.repeat(build, number=1, repeat=3))
+    scanned = min(
+        timeit.repeat(lambda: type_query(lambda t: scan(accounts, t)), number=1)
+    )
+    # the prefixes of the first terms are looked up again for the later ones
+    searched = min(timeit.repeat(lambda: type_query(index.search), number=1))
+
+    print(f"{args.accounts} accounts, {len(keystrokes)} keystrokes")
+    print(f"build index: {built * 1e3:8.2f} ms")
+    print(f"scan:        {scanned * 1e3 / len(keystrokes):8.3f} ms per keystroke")
+    print(f"index:       {searched * 1e3 / len(keystrokes):8.3f} ms per keystroke")
+    print(f"speedup:     {scanned / searched:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()